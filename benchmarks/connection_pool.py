@@ -0,0 +1,106 @@
+"""Per-segment request setup latency with and without the shared connection pool.
+
+Serves small "segments" from a local stand-in server and measures the time until the
+response headers arrive (connection setup + request) for
+
+- one bare ``requests.get`` per segment (the previous behaviour), and
+- the pooled keep-alive session created by ``create_http_session``.
+
+Usage:
+
+    python benchmarks/connection_pool.py [--requests 200] [--certfile cert.pem --keyfile key.pem]
+
+Pass a certificate and key to serve over HTTPS - this includes the TLS handshake in the
+measurement, which is what dominates against a real console.
+"""
+
+import argparse
+import ssl
+import statistics
+import sys
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from os import path
+from typing import Callable
+from typing import List
+
+import requests
+import urllib3
+
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), ".."))
+
+from protect_archiver.client.http_session import create_http_session  # noqa: E402
+
+
+SEGMENT = b"\0" * 64 * 1024
+
+
+class SegmentHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep connections open between requests
+
+    def do_GET(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(len(SEGMENT)))
+        self.end_headers()
+        self.wfile.write(SEGMENT)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+def measure(get: Callable[[str], requests.Response], uri: str, count: int) -> List[float]:
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        response = get(uri)
+        timings.append(time.perf_counter() - start)
+        response.content  # drain the body so the connection can be reused
+    return timings
+
+
+def report(label: str, timings: List[float]) -> None:
+    print(
+        f"{label:<10} mean {statistics.mean(timings) * 1e3:7.3f} ms  "
+        f"median {statistics.median(timings) * 1e3:7.3f} ms  "
+        f"p95 {sorted(timings)[int(len(timings) * 0.95)] * 1e3:7.3f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--certfile")
+    parser.add_argument("--keyfile")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SegmentHandler)
+    scheme = "http"
+    if args.certfile:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(args.certfile, args.keyfile)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        scheme = "https"
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    uri = f"{scheme}://127.0.0.1:{server.server_address[1]}/video/export"
+    session = create_http_session()
+
+    bare = measure(lambda u: requests.get(u, verify=False, stream=True), uri, args.requests)
+    pooled = measure(lambda u: session.get(u, verify=False, stream=True), uri, args.requests)
+
+    print(f"{args.requests} segments via {scheme}, time until response headers:")
+    report("bare", bare)
+    report("pooled", pooled)
+    print(f"speedup    {statistics.mean(bare) / statistics.mean(pooled):.1f}x")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Time and peak memory to parse a large ``/events`` response, at once and streamed.
+
+Generates a synthetic response body with ``--events`` events on the fly (so that the body itself
+is never held in memory by the benchmark) and turns it into ``MotionEvent`` objects
+
+- with ``response.json()`` and a list of events (the previous behaviour), and
+- with ``iter_motion_events``, which parses the events while the body is read.
+
+Usage:
+
+    python benchmarks/event_list.py [--events 500000]
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+from datetime import datetime
+from os import path
+from typing import Any
+from typing import Callable
+from typing import Tuple
+
+import requests
+
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), ".."))
+
+from protect_archiver.dataclasses import MotionEvent  # noqa: E402
+from protect_archiver.downloader.get_motion_event_list import (  # noqa: E402
+    iter_motion_events,
+)
+
+
+START = 1578524400000
+
+
+class SyntheticEvents:
+    """File-like response body: a JSON array of events in the shape the console returns."""
+
+    def __init__(self, count: int) -> None:
+        self.count = count
+        self.index = -1
+        self.pending = b""
+
+    def event(self, index: int) -> bytes:
+        start = START + index * 5000
+        event = {
+            "id": f"{index:024x}",
+            "type": "motion",
+            "start": start,
+            "end": start + 4000,
+            "score": index % 100,
+            "camera": f"{index % 40:024x}",
+            "thumbnail": f"e-{index:024x}",
+            "heatmap": f"e-{index:024x}",
+            "smartDetectTypes": [],
+            "smartDetectEvents": [],
+            "modelKey": "event",
+        }
+        return ("[" if index == 0 else ",").encode() + json.dumps(event).encode()
+
+    def read(self, size: int = -1, **kwargs: Any) -> bytes:
+        while len(self.pending) < size and self.index < self.count:
+            self.index += 1
+            if self.index < self.count:
+                self.pending += self.event(self.index)
+            else:
+                self.pending += b"]" if self.count else b"[]"
+        data, self.pending = self.pending[:size], self.pending[size:]
+        return data
+
+
+class Session:
+    authority = "https://unifi"
+    base_path = "/proxy/protect/api"
+
+    def __init__(self, count: int) -> None:
+        self.count = count
+
+    def get(self, uri: str, **kwargs: Any) -> requests.Response:
+        response = requests.Response()
+        response.status_code = 200
+        response.raw = SyntheticEvents(self.count)
+        return response
+
+
+def parse_at_once(session: Session) -> int:
+    events = [
+        MotionEvent(
+            id=event["id"],
+            start=datetime.fromtimestamp(event["start"] / 1000),
+            end=datetime.fromtimestamp(event["end"] / 1000),
+            camera_id=event["camera"],
+            score=event["score"],
+            thumbnail_id=event["thumbnail"],
+            heatmap_id=event["heatmap"],
+        )
+        for event in session.get("/events").json()
+        if event["end"]
+    ]
+    return len(events)
+
+
+def parse_streamed(session: Session) -> int:
+    return sum(1 for _ in iter_motion_events(session, START, START))
+
+
+# tracemalloc slows down allocations, so time and memory are measured in separate runs
+def measure(parse: Callable[[Session], int], session: Session) -> Tuple[int, float, int]:
+    start = time.perf_counter()
+    count = parse(session)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        parse(session)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return count, elapsed, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=500_000)
+    args = parser.parse_args()
+
+    session = Session(args.events)
+    print(f"{args.events} events:")
+    for name, parse in (("response.json()", parse_at_once), ("streamed", parse_streamed)):
+        count, elapsed, peak = measure(parse, session)
+        print(
+            f"{name:>16} {elapsed:7.2f} s  {count / elapsed:9.0f} events/s"
+            f"  peak {peak / 1024 / 1024:8.1f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
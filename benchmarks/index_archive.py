@@ -0,0 +1,82 @@
+"""Time to index an archive tree into the catalog, with one and with several scan workers.
+
+Builds a synthetic tree in the layout of ``build_download_dir`` - one directory per day and
+camera with an empty file per hour - and indexes it with ``index_archive``.
+
+Usage:
+
+    python benchmarks/index_archive.py [--days 365] [--cameras 10] [--workers 16] [--dir DIR]
+
+Pass ``--dir`` to build the tree on the storage to measure (e.g. a network mount) - listing
+directories there is latency bound, which is where parallel workers help most. An existing
+tree in that directory is reused.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from datetime import datetime
+from datetime import timedelta
+from os import path
+
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), ".."))
+
+from protect_archiver.catalog import Catalog  # noqa: E402
+from protect_archiver.indexer import index_archive  # noqa: E402
+
+
+def build_tree(root: str, days: int, cameras: int) -> int:
+    marker = path.join(root, f".tree-{days}-{cameras}")
+    if path.exists(marker):
+        return days * cameras * 24
+
+    first_day = datetime(2020, 1, 1)
+    for day in range(days):
+        date = first_day + timedelta(days=day)
+        for camera in range(cameras):
+            camera_name = f"Camera {camera} ({camera:04x})"
+            directory = path.join(root, date.strftime("%Y/%m/%d"), camera_name)
+            os.makedirs(directory, exist_ok=True)
+            for hour in range(24):
+                timestamp = date.replace(hour=hour).strftime("%Y-%m-%d - %H.%M.%S")
+                open(path.join(directory, f"{camera_name} - {timestamp}+0000.mp4"), "w").close()
+    open(marker, "w").close()
+    return days * cameras * 24
+
+
+def measure(root: str, workers: int) -> float:
+    catalog_file = path.join(root, "catalog.sqlite3")
+    if path.exists(catalog_file):
+        os.remove(catalog_file)
+    catalog = Catalog(catalog_file, root)
+    start = time.perf_counter()
+    index_archive(catalog, workers)
+    elapsed = time.perf_counter() - start
+    catalog.close()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--cameras", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--dir")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmpdir:
+        root = args.dir or tmpdir
+        files = build_tree(root, args.days, args.cameras)
+
+        print(f"{files} files in {args.days * args.cameras} directories:")
+        for workers in (1, args.workers):
+            elapsed = measure(root, workers)
+            print(f"{workers:>3} worker(s) {elapsed:7.2f} s  {files / elapsed:10.0f} files/s")
+
+
+if __name__ == "__main__":
+    main()
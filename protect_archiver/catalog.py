@@ -0,0 +1,220 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    camera_id TEXT NOT NULL,
+    camera_name TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT,
+    download_duration REAL,
+    downloaded_at REAL,
+    event_clip INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS files_by_camera ON files (camera_id, start);
+CREATE TABLE IF NOT EXISTS file_events (
+    path TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    PRIMARY KEY (path, event_id)
+);
+CREATE INDEX IF NOT EXISTS file_events_by_event ON file_events (event_id);
+"""
+
+# path, camera id, camera name, start, end, size, sha256, download duration, downloaded at,
+# whether the file is an event clip
+CatalogRow = Tuple[
+    str, str, str, int, int, int, Optional[str], Optional[float], Optional[float], bool
+]
+
+
+class Catalog:
+    """SQLite catalog of the files archived in a destination directory.
+
+    Every completed download is recorded with its camera, the time range it covers (as epoch
+    milliseconds with an inclusive end, like the export queries), its size, SHA-256 hash and
+    how long it took to download. Paths are stored relative to ``root``, so that the archive
+    can be moved or mounted somewhere else.
+
+    Event clips are told apart from the footage of 'download' and 'sync', and are also recorded
+    with the ids of the motion events they cover, which are several for clips merged from
+    overlapping events.
+
+    Files indexed from an existing archive tree are only known by the last four characters of
+    their camera id, which is all the file names contain - lookups by camera id match those too.
+
+    The connection is shared by all download workers and guarded by a lock. The default
+    rollback journal is used on purpose: SQLite's WAL mode does not work on network file
+    systems, which is where archives are often kept.
+    """
+
+    def __init__(self, filename: str, root: str) -> None:
+        self.filename = filename
+        self.root = os.path.abspath(root)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(filename, check_same_thread=False)
+        # every row is committed on its own, losing the last ones on power loss is acceptable
+        self._db.execute("PRAGMA synchronous = NORMAL")
+        self._db.executescript(SCHEMA)
+        # catalogs created before event clips were told apart
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(files)")}
+        if "event_clip" not in columns:
+            with self._db:
+                self._db.execute(
+                    "ALTER TABLE files ADD COLUMN event_clip INTEGER NOT NULL DEFAULT 0"
+                )
+                self._db.execute(
+                    "UPDATE files SET event_clip = 1 WHERE path IN (SELECT path FROM file_events)"
+                )
+
+    def relpath(self, filename: str) -> str:
+        return os.path.relpath(os.path.abspath(filename), self.root)
+
+    def __contains__(self, filename: str) -> bool:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM files WHERE path = ?", (self.relpath(filename),)
+            ).fetchone()
+        return row is not None
+
+    # whether the file is recorded as footage archived by 'download' or 'sync'
+    def is_footage(self, filename: str) -> bool:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM files WHERE path = ? AND NOT event_clip", (self.relpath(filename),)
+            ).fetchone()
+        return row is not None
+
+    def add(
+        self,
+        filename: str,
+        camera_id: str,
+        start: int,
+        end: int,
+        size: int,
+        sha256: Optional[str] = None,
+        download_duration: Optional[float] = None,
+        event_ids: Sequence[str] = (),
+    ) -> None:
+        # file names start with the file system safe camera name, e.g. "Front Door (a1b2) - ..."
+        camera_name = os.path.basename(filename).split(" - ", 1)[0]
+        row = (
+            self.relpath(filename),
+            camera_id,
+            camera_name,
+            start,
+            end,
+            size,
+            sha256,
+            download_duration,
+            time.time(),
+            bool(event_ids),
+        )
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row
+            )
+            self._db.execute("DELETE FROM file_events WHERE path = ?", (row[0],))
+            self._db.executemany(
+                "INSERT OR IGNORE INTO file_events VALUES (?, ?)",
+                ((row[0], event_id) for event_id in event_ids),
+            )
+
+    # insert many rows in a single transaction, keeping the rows of files that are already
+    # known (which may have been recorded with their hash when they were downloaded);
+    # with rebuild set, all rows are replaced by the new ones
+    def load(self, rows: Iterable[CatalogRow], rebuild: bool = False) -> int:
+        with self._lock, self._db:
+            if rebuild:
+                self._db.execute("DELETE FROM files")
+                self._db.execute("DELETE FROM file_events")
+            cursor = self._db.executemany(
+                "INSERT OR IGNORE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+        return cursor.rowcount
+
+    # full camera ids of the cameras with downloaded files, by file system safe camera name
+    def camera_ids(self) -> Dict[str, str]:
+        with self._lock:
+            return dict(
+                self._db.execute(
+                    "SELECT camera_name, camera_id FROM files"
+                    " WHERE length(camera_id) > 4 GROUP BY camera_name"
+                ).fetchall()
+            )
+
+    def remove(self, filename: str) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM files WHERE path = ?", (self.relpath(filename),))
+            self._db.execute("DELETE FROM file_events WHERE path = ?", (self.relpath(filename),))
+
+    # ids of the motion events covered by an event clip
+    def event_ids(self, filename: str) -> List[str]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT event_id FROM file_events WHERE path = ? ORDER BY event_id",
+                (self.relpath(filename),),
+            ).fetchall()
+        return [event_id for event_id, in rows]
+
+    # paths of the event clips that cover a motion event
+    def event_files(self, event_id: str) -> List[str]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT path FROM file_events WHERE event_id = ? ORDER BY path", (event_id,)
+            ).fetchall()
+        return [path for path, in rows]
+
+    # camera ids and file system safe names of all cameras with files
+    def cameras(self) -> List[Tuple[str, str]]:
+        with self._lock:
+            return self._db.execute(
+                "SELECT camera_id, camera_name FROM files"
+                " GROUP BY camera_id ORDER BY camera_name"
+            ).fetchall()
+
+    # end of the latest file of a camera, as epoch milliseconds
+    def last_end(self, camera_id: str) -> Optional[int]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT MAX(end) FROM files WHERE camera_id IN (?, ?)",
+                (camera_id, camera_id[-4:]),
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    # the files of a camera overlapping the given time range, ordered by start
+    def files(self, camera_id: str, start: int, end: int) -> List[Tuple[str, int, int, int]]:
+        with self._lock:
+            return self._db.execute(
+                "SELECT path, start, end, size FROM files"
+                " WHERE camera_id IN (?, ?) AND start <= ? AND end >= ? ORDER BY start",
+                (camera_id, camera_id[-4:], end, start),
+            ).fetchall()
+
+    # like files(), but without the event clips - the footage archived by 'download' and 'sync'
+    def footage(self, camera_id: str, start: int, end: int) -> List[Tuple[str, int, int, int]]:
+        with self._lock:
+            return self._db.execute(
+                "SELECT path, start, end, size FROM files"
+                " WHERE camera_id IN (?, ?) AND start <= ? AND end >= ?"
+                " AND NOT event_clip ORDER BY start",
+                (camera_id, camera_id[-4:], end, start),
+            ).fetchall()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+        logging.debug(f"Closed catalog {self.filename}")
@@ -1,5 +1,7 @@
 from .download import *  # NOQA
 from .events import *  # NOQA
+from .index import *  # NOQA
+from .report import *  # NOQA
 from .sync import *  # NOQA
 
 
@@ -219,6 +219,212 @@ from protect_archiver.utils import print_download_stats
     envvar="PROTECT_USE_UTC",
     show_envvar=True,
 )
+@click.option(
+    "--concurrency",
+    default=Config.CONCURRENCY,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help=(
+        "Number of video segments to download in parallel. "
+        "Segments of all selected cameras are interleaved and spread across the workers."
+    ),
+    envvar="PROTECT_CONCURRENCY",
+    show_envvar=True,
+)
+@click.option(
+    "--adaptive-concurrency",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    help=(
+        "Start with a single download and adapt the number of parallel downloads (up to"
+        " '--concurrency') to the response times and errors of the Protect console"
+    ),
+    envvar="PROTECT_ADAPTIVE_CONCURRENCY",
+    show_envvar=True,
+)
+@click.option(
+    "--prefetch-depth",
+    default=Config.PREFETCH_DEPTH,
+    show_default=True,
+    type=click.IntRange(min=0),
+    help=(
+        "Number of exports to request ahead of the segment that is being downloaded, so that"
+        " the Protect console prepares them in the meantime (0 disables)"
+    ),
+    envvar="PROTECT_PREFETCH_DEPTH",
+    show_envvar=True,
+)
+@click.option(
+    "--split-exports",
+    default=Config.SPLIT_EXPORTS,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help=(
+        "Split every video segment into this many shorter exports, download them at the same"
+        " time and join them into one file - speeds up downloading a single hour when the"
+        " console is slower to export than the connection"
+    ),
+    envvar="PROTECT_SPLIT_EXPORTS",
+    show_envvar=True,
+)
+@click.option(
+    "--adaptive-segments",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    help=(
+        "Split video segments that fail to download into shorter ones and use longer segments"
+        " while the Protect console keeps up, remembering the lengths per camera between runs"
+    ),
+    envvar="PROTECT_ADAPTIVE_SEGMENTS",
+    show_envvar=True,
+)
+@click.option(
+    "--max-segment-length",
+    default=Config.MAX_SEGMENT_LENGTH,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help=(
+        "Longest video segment in seconds that '--adaptive-segments' grows to - segments longer"
+        " than an hour make the Protect console build very large exports"
+    ),
+    envvar="PROTECT_MAX_SEGMENT_LENGTH",
+    show_envvar=True,
+)
+@click.option(
+    "--skip-motion-gaps",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    help=(
+        "For cameras that only record on motion, skip video segments without any motion events"
+        " instead of requesting an export for them"
+    ),
+    envvar="PROTECT_SKIP_MOTION_GAPS",
+    show_envvar=True,
+)
+@click.option(
+    "--empty-segment-ttl",
+    default=Config.EMPTY_SEGMENT_TTL,
+    show_default=True,
+    type=click.IntRange(min=0),
+    help=(
+        "Seconds to remember video segments without footage, which are not requested again"
+        " in the meantime (0 disables)"
+    ),
+    envvar="PROTECT_EMPTY_SEGMENT_TTL",
+    show_envvar=True,
+)
+@click.option(
+    "--catalog",
+    "use_catalog",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    help=(
+        "Record every downloaded file in a SQLite catalog in the destination, which"
+        " '--skip-existing-files' then checks instead of the disk"
+    ),
+    envvar="PROTECT_USE_CATALOG",
+    show_envvar=True,
+)
+@click.option(
+    "--camera-cache-ttl",
+    default=Config.CAMERA_CACHE_TTL,
+    show_default=True,
+    type=click.IntRange(min=0),
+    help=(
+        "Seconds to reuse the camera list of a previous run instead of requesting it from the"
+        " Protect console again, e.g. for frequent runs from cron (0 disables)"
+    ),
+    envvar="PROTECT_CAMERA_CACHE_TTL",
+    show_envvar=True,
+)
+@click.option(
+    "--refresh-camera-cache",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    help="Request the camera list from the Protect console even if a cached one is still valid",
+    envvar="PROTECT_REFRESH_CAMERA_CACHE",
+    show_envvar=True,
+)
+@click.option(
+    "--persist-auth-token",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    help=(
+        "Keep the API token in the cache directory (readable only by the current user) and"
+        " reuse it in later runs until it expires, instead of logging in every time"
+    ),
+    envvar="PROTECT_PERSIST_AUTH_TOKEN",
+    show_envvar=True,
+)
+@click.option(
+    "--circuit-breaker-threshold",
+    type=int,
+    default=Config.CIRCUIT_BREAKER_THRESHOLD,
+    show_default=True,
+    help=(
+        "Pause all downloads for a while after this many failed requests in a row (server errors"
+        " and timeouts), until the Protect console responds again. 0 disables the pause"
+    ),
+    envvar="PROTECT_CIRCUIT_BREAKER_THRESHOLD",
+    show_envvar=True,
+)
+@click.option(
+    "--download-chunk-size",
+    default=Config.DOWNLOAD_CHUNK_SIZE,
+    show_default=True,
+    type=click.IntRange(min=1024),
+    help="Size of the chunks in which downloads are read and written to disk, in bytes",
+    envvar="PROTECT_DOWNLOAD_CHUNK_SIZE",
+    show_envvar=True,
+)
+@click.option(
+    "--write-buffers",
+    default=Config.WRITE_BUFFERS,
+    show_default=True,
+    type=click.IntRange(min=0),
+    help=(
+        "Number of chunk buffers between reading from the network and writing to disk on a"
+        " separate thread, so that slow storage does not stall the download (0 disables)"
+    ),
+    envvar="PROTECT_WRITE_BUFFERS",
+    show_envvar=True,
+)
+@click.option(
+    "--fsync-interval",
+    default=Config.FSYNC_INTERVAL,
+    show_default=True,
+    type=click.IntRange(min=0),
+    help=(
+        "Sync downloaded data to disk every time this many bytes have been written"
+        " (requires '--write-buffers', 0 disables)"
+    ),
+    envvar="PROTECT_FSYNC_INTERVAL",
+    show_envvar=True,
+)
+@click.option(
+    "--preallocate-files",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    help="Reserve disk space for downloads of known size up front (requires '--write-buffers')",
+    envvar="PROTECT_PREALLOCATE_FILES",
+    show_envvar=True,
+)
+@click.option(
+    "--connection-pool-size",
+    "http_pool_size",
+    default=Config.HTTP_POOL_SIZE,
+    show_default=True,
+    help="Maximum number of keep-alive connections to the Protect console that are reused",
+    envvar="PROTECT_CONNECTION_POOL_SIZE",
+    show_envvar=True,
+)
 def download(
     dest: str,
     address: str,
@@ -240,6 +446,24 @@ def download(
     disable_splitting: bool,
     create_snapshot: bool,
     use_utc_filenames: bool,
+    concurrency: int,
+    adaptive_concurrency: bool,
+    prefetch_depth: int,
+    split_exports: int,
+    adaptive_segments: bool,
+    max_segment_length: int,
+    skip_motion_gaps: bool,
+    empty_segment_ttl: int,
+    use_catalog: bool,
+    camera_cache_ttl: int,
+    refresh_camera_cache: bool,
+    persist_auth_token: bool,
+    circuit_breaker_threshold: int,
+    download_chunk_size: int,
+    write_buffers: int,
+    fsync_interval: int,
+    preallocate_files: bool,
+    http_pool_size: int,
 ) -> None:
     # check the provided command line arguments
     # TODO(danielfernau): remove exit codes 1 (path invalid) and 6 (start/end/snapshot) from docs: no longer valid
@@ -251,6 +475,10 @@ def download(
             )
         start = datetime.now()
 
+    if prefetch_depth and split_exports > 1:
+        click.echo("The argument --prefetch-depth is ignored when using the --split-exports option")
+        prefetch_depth = 0
+
     client = ProtectClient(
         address=address,
         port=port,
@@ -266,6 +494,25 @@ def download(
         touch_files=touch_files,
         download_timeout=download_timeout,
         use_utc_filenames=use_utc_filenames,
+        skip_motion_gaps=skip_motion_gaps,
+        empty_segment_ttl=empty_segment_ttl,
+        use_catalog=use_catalog,
+        camera_cache_ttl=camera_cache_ttl,
+        refresh_camera_cache=refresh_camera_cache,
+        persist_auth_token=persist_auth_token,
+        circuit_breaker_threshold=circuit_breaker_threshold,
+        download_chunk_size=download_chunk_size,
+        write_buffers=write_buffers,
+        fsync_interval=fsync_interval,
+        preallocate_files=preallocate_files,
+        prefetch_depth=prefetch_depth,
+        split_exports=split_exports,
+        adaptive_segments=adaptive_segments,
+        max_segment_length=max_segment_length,
+        max_concurrent_exports=concurrency if adaptive_concurrency else 0,
+        adaptive_concurrency=adaptive_concurrency,
+        # every worker, part and prefetched export needs its own connection to the console
+        http_pool_size=max(http_pool_size, concurrency * split_exports + prefetch_depth),
     )
 
     try:
@@ -278,7 +525,17 @@ def download(
             camera_s = set(cameras.split(","))
             camera_list = [c for c in camera_list if c["id"] in camera_s]
 
-        if not create_snapshot:
+        if not create_snapshot and concurrency > 1:
+            click.echo(
+                f"Downloading video files between {start} and {end} from"
+                f" '{session.authority}{session.base_path}/video/export' for"
+                f" {len(camera_list)} camera(s) using {concurrency} parallel downloads"
+            )
+
+            Downloader.download_footage_concurrent(
+                client, start, end, camera_list, disable_alignment, disable_splitting, concurrency
+            )
+        elif not create_snapshot:
             for camera in camera_list:
                 # noinspection PyUnboundLocalVariable
                 click.echo(
@@ -7,6 +7,8 @@ from protect_archiver.client import ProtectClient
 from protect_archiver.config import Config
 from protect_archiver.downloader import Downloader
 from protect_archiver.errors import ProtectError
+from protect_archiver.event_filter import select_events
+from protect_archiver.event_merge import coalesce_events
 from protect_archiver.utils import print_download_stats
 
 
@@ -188,6 +190,210 @@ from protect_archiver.utils import print_download_stats
     envvar="PROTECT_USE_UTC",
     show_envvar=True,
 )
+@click.option(
+    "--min-score",
+    default=0,
+    show_default=True,
+    type=click.IntRange(min=0, max=100),
+    help="Only download events with at least this score",
+    envvar="PROTECT_MIN_SCORE",
+    show_envvar=True,
+)
+@click.option(
+    "--event-types",
+    default="all",
+    show_default=True,
+    help=(
+        "Comma-separated list of the event types to download, e.g. 'motion,smartDetectZone'. "
+        "Use '--event-types=all' to download events of all types."
+    ),
+    envvar="PROTECT_EVENT_TYPES",
+    show_envvar=True,
+)
+@click.option(
+    "--merge-events",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    help=(
+        "Merge overlapping events of a camera, and events at most '--merge-gap' seconds apart,"
+        " into a single clip, so that the same footage is not downloaded several times"
+    ),
+    envvar="PROTECT_MERGE_EVENTS",
+    show_envvar=True,
+)
+@click.option(
+    "--merge-gap",
+    default=Config.EVENT_MERGE_GAP,
+    show_default=True,
+    type=click.FloatRange(min=0),
+    help="Largest gap between two events of a camera that are merged, in seconds",
+    envvar="PROTECT_MERGE_GAP",
+    show_envvar=True,
+)
+@click.option(
+    "--pre-roll",
+    default=Config.EVENT_PRE_ROLL,
+    show_default=True,
+    type=click.FloatRange(min=0),
+    help="Also download this many seconds before each event",
+    envvar="PROTECT_PRE_ROLL",
+    show_envvar=True,
+)
+@click.option(
+    "--post-roll",
+    default=Config.EVENT_POST_ROLL,
+    show_default=True,
+    type=click.FloatRange(min=0),
+    help="Also download this many seconds after each event",
+    envvar="PROTECT_POST_ROLL",
+    show_envvar=True,
+)
+@click.option(
+    "--from-archive",
+    "events_from_archive",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    help=(
+        "Cut the event clips out of the footage already archived in the destination by"
+        " 'download' or 'sync' (as recorded in the catalog, see '--catalog' and 'index')"
+        " instead of downloading them again - only footage that is not archived is downloaded"
+    ),
+    envvar="PROTECT_EVENTS_FROM_ARCHIVE",
+    show_envvar=True,
+)
+@click.option(
+    "--event-list-window",
+    default=Config.EVENT_LIST_WINDOW,
+    show_default=True,
+    type=click.IntRange(min=0),
+    help=(
+        "Request the event list in windows of this many seconds, several at a time, and start"
+        " downloading while the later windows are still being requested (0 requests it at once)"
+    ),
+    envvar="PROTECT_EVENT_LIST_WINDOW",
+    show_envvar=True,
+)
+@click.option(
+    "--event-list-per-camera",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    help="Request the event list of every selected camera separately",
+    envvar="PROTECT_EVENT_LIST_PER_CAMERA",
+    show_envvar=True,
+)
+@click.option(
+    "--catalog",
+    "use_catalog",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    help=(
+        "Record every downloaded event clip, with the ids of the events it covers, in a SQLite"
+        " catalog in the destination, which '--skip-existing-files' then checks instead of the"
+        " disk (always on with '--from-archive')"
+    ),
+    envvar="PROTECT_USE_CATALOG",
+    show_envvar=True,
+)
+@click.option(
+    "--camera-cache-ttl",
+    default=Config.CAMERA_CACHE_TTL,
+    show_default=True,
+    type=click.IntRange(min=0),
+    help=(
+        "Seconds to reuse the camera list of a previous run instead of requesting it from the"
+        " Protect console again, e.g. for frequent runs from cron (0 disables)"
+    ),
+    envvar="PROTECT_CAMERA_CACHE_TTL",
+    show_envvar=True,
+)
+@click.option(
+    "--refresh-camera-cache",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    help="Request the camera list from the Protect console even if a cached one is still valid",
+    envvar="PROTECT_REFRESH_CAMERA_CACHE",
+    show_envvar=True,
+)
+@click.option(
+    "--persist-auth-token",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    help=(
+        "Keep the API token in the cache directory (readable only by the current user) and"
+        " reuse it in later runs until it expires, instead of logging in every time"
+    ),
+    envvar="PROTECT_PERSIST_AUTH_TOKEN",
+    show_envvar=True,
+)
+@click.option(
+    "--circuit-breaker-threshold",
+    type=int,
+    default=Config.CIRCUIT_BREAKER_THRESHOLD,
+    show_default=True,
+    help=(
+        "Pause all downloads for a while after this many failed requests in a row (server errors"
+        " and timeouts), until the Protect console responds again. 0 disables the pause"
+    ),
+    envvar="PROTECT_CIRCUIT_BREAKER_THRESHOLD",
+    show_envvar=True,
+)
+@click.option(
+    "--download-chunk-size",
+    default=Config.DOWNLOAD_CHUNK_SIZE,
+    show_default=True,
+    type=click.IntRange(min=1024),
+    help="Size of the chunks in which downloads are read and written to disk, in bytes",
+    envvar="PROTECT_DOWNLOAD_CHUNK_SIZE",
+    show_envvar=True,
+)
+@click.option(
+    "--write-buffers",
+    default=Config.WRITE_BUFFERS,
+    show_default=True,
+    type=click.IntRange(min=0),
+    help=(
+        "Number of chunk buffers between reading from the network and writing to disk on a"
+        " separate thread, so that slow storage does not stall the download (0 disables)"
+    ),
+    envvar="PROTECT_WRITE_BUFFERS",
+    show_envvar=True,
+)
+@click.option(
+    "--fsync-interval",
+    default=Config.FSYNC_INTERVAL,
+    show_default=True,
+    type=click.IntRange(min=0),
+    help=(
+        "Sync downloaded data to disk every time this many bytes have been written"
+        " (requires '--write-buffers', 0 disables)"
+    ),
+    envvar="PROTECT_FSYNC_INTERVAL",
+    show_envvar=True,
+)
+@click.option(
+    "--preallocate-files",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    help="Reserve disk space for downloads of known size up front (requires '--write-buffers')",
+    envvar="PROTECT_PREALLOCATE_FILES",
+    show_envvar=True,
+)
+@click.option(
+    "--connection-pool-size",
+    "http_pool_size",
+    default=Config.HTTP_POOL_SIZE,
+    show_default=True,
+    help="Maximum number of keep-alive connections to the Protect console that are reused",
+    envvar="PROTECT_CONNECTION_POOL_SIZE",
+    show_envvar=True,
+)
 def events(
     dest: str,
     address: str,
@@ -207,6 +413,25 @@ def events(
     end: datetime,
     download_motion_heatmaps: bool,
     use_utc_filenames: bool,
+    min_score: int,
+    event_types: str,
+    merge_events: bool,
+    merge_gap: float,
+    pre_roll: float,
+    post_roll: float,
+    events_from_archive: bool,
+    event_list_window: int,
+    event_list_per_camera: bool,
+    use_catalog: bool,
+    camera_cache_ttl: int,
+    refresh_camera_cache: bool,
+    persist_auth_token: bool,
+    circuit_breaker_threshold: int,
+    download_chunk_size: int,
+    write_buffers: int,
+    fsync_interval: int,
+    preallocate_files: bool,
+    http_pool_size: int,
 ) -> None:
     client = ProtectClient(
         address=address,
@@ -223,6 +448,19 @@ def events(
         touch_files=touch_files,
         download_timeout=download_timeout,
         use_utc_filenames=use_utc_filenames,
+        event_list_window=event_list_window,
+        event_list_per_camera=event_list_per_camera,
+        events_from_archive=events_from_archive,
+        use_catalog=use_catalog,
+        camera_cache_ttl=camera_cache_ttl,
+        refresh_camera_cache=refresh_camera_cache,
+        persist_auth_token=persist_auth_token,
+        circuit_breaker_threshold=circuit_breaker_threshold,
+        download_chunk_size=download_chunk_size,
+        write_buffers=write_buffers,
+        fsync_interval=fsync_interval,
+        preallocate_files=preallocate_files,
+        http_pool_size=http_pool_size,
     )
 
     try:
@@ -230,37 +468,42 @@ def events(
         click.echo("Getting camera list")
         camera_list = client.get_camera_list()
 
-        # get motion event list
+        camera_ids = set(cameras.split(",")) if cameras != "all" else None
+        if camera_ids is not None:
+            # keep only selected cameras in list
+            camera_list = [camera for camera in camera_list if camera.id in camera_ids]
+
+        # get motion event list, which is requested while the first events are downloaded
         click.echo("Getting motion event list")
         motion_event_list = client.get_motion_event_list(start, end, camera_list)
 
-        if cameras != "all":
-            camera_s = set(cameras.split(","))
-            # keep only selected cameras in list
-            camera_list = [camera for camera in camera_list if camera["id"] in camera_s]
-            # keep only events for selected cameras
-            motion_event_list = [event for event in motion_event_list if event.camera_id in cameras]
-
         click.echo(
             f"Downloading motion event video files between {start} and {end}"
             f" from '{client.session.authority}{client.session.base_path}/video/export'"
         )
 
-        for motion_event in motion_event_list:
-            # client.download_event(MotionEvent, Camera, bool)
-            if not ([camera for camera in camera_list if camera["id"] == motion_event.camera_id]):
+        # keep only events of the selected cameras, types and scores, each with its camera
+        selected_events = select_events(
+            motion_event_list,
+            camera_list,
+            camera_ids=camera_ids,
+            min_score=min_score or None,
+            types=set(event_types.split(",")) if event_types != "all" else None,
+        )
+        if merge_events or pre_roll or post_roll:
+            selected_events = coalesce_events(
+                selected_events, merge_gap if merge_events else None, pre_roll, post_roll
+            )
+
+        for motion_event, camera in selected_events:
+            if camera is None:
                 click.echo(
                     f"Unable to download event {motion_event.id[-4:]} at {motion_event.start}:"
                     " camera is not available"
                 )
                 continue
 
-            Downloader.download_motion_event(
-                client,
-                motion_event,
-                [camera for camera in camera_list if camera["id"] == motion_event.camera_id][0],
-                download_motion_heatmaps,
-            )
+            Downloader.download_motion_event(client, motion_event, camera, download_motion_heatmaps)
 
         print_download_stats(client)
 
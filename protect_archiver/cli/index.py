@@ -0,0 +1,49 @@
+from os import path
+
+import click
+
+from protect_archiver.catalog import Catalog
+from protect_archiver.cli.base import cli
+from protect_archiver.config import Config
+from protect_archiver.indexer import index_archive
+
+
+@cli.command(
+    "index", help="Build the catalog of an existing archive from the files in the destination"
+)
+@click.argument("dest", type=click.Path(exists=True, writable=True, resolve_path=True))
+@click.option(
+    "--workers",
+    default=Config.INDEX_WORKERS,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Number of directories that are listed at the same time",
+    envvar="PROTECT_INDEX_WORKERS",
+    show_envvar=True,
+)
+@click.option(
+    "--rebuild",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    help=(
+        "Replace all files in the catalog with the ones found on disk, instead of only adding"
+        " the ones it does not know yet"
+    ),
+    envvar="PROTECT_INDEX_REBUILD",
+    show_envvar=True,
+)
+def index(dest: str, workers: int, rebuild: bool) -> None:
+    # normalize path to destination directory and check if it exists
+    dest = path.abspath(dest)
+    if not path.isdir(dest):
+        click.echo(f"Video file destination directory '{dest} is invalid or does not exist!")
+        exit(1)
+
+    catalog = Catalog(path.join(dest, Config.CATALOG_FILE), dest)
+    try:
+        added = index_archive(catalog, workers, rebuild=rebuild)
+    finally:
+        catalog.close()
+
+    click.echo(f"{added} file(s) added to the catalog")
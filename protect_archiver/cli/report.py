@@ -0,0 +1,139 @@
+import json
+
+from datetime import datetime
+from os import path
+from typing import Optional
+
+import click
+
+from protect_archiver.catalog import Catalog
+from protect_archiver.cli.base import cli
+from protect_archiver.config import Config
+from protect_archiver.report import archive_report
+from protect_archiver.report import format_duration
+from protect_archiver.report import redownload_plan
+from protect_archiver.utils import json_encode
+
+
+@cli.command("report", help="Report the coverage, gaps and undersized files of an archive")
+@click.argument("dest", type=click.Path(exists=True, resolve_path=True))
+@click.option(
+    "--cameras",
+    default="all",
+    show_default=True,
+    help=(
+        "Comma-separated list of one or more camera IDs ('--cameras=\"id_1,id_2,id_3,...\"'). "
+        "Use '--cameras=all' to report on all cameras in the catalog."
+    ),
+    envvar="PROTECT_CAMERAS",
+    show_envvar=True,
+)
+@click.option(
+    "--start",
+    type=click.DateTime(
+        formats=[
+            "%Y-%m-%d",
+            "%Y-%m-%dT%H:%M:%S",
+            "%Y-%m-%d %H:%M:%S",
+            "%Y-%m-%d %H:%M:%S%z",
+        ]
+    ),
+    required=True,
+    help="Report range start time",
+    envvar="PROTECT_START_TIME",
+    show_envvar=True,
+)
+@click.option(
+    "--end",
+    type=click.DateTime(
+        formats=[
+            "%Y-%m-%d",
+            "%Y-%m-%dT%H:%M:%S",
+            "%Y-%m-%d %H:%M:%S",
+            "%Y-%m-%d %H:%M:%S%z",
+        ]
+    ),
+    required=True,
+    help="Report range end time",
+    envvar="PROTECT_END_TIME",
+    show_envvar=True,
+)
+@click.option(
+    "--undersized-ratio",
+    default=Config.UNDERSIZED_RATIO,
+    show_default=True,
+    type=click.FloatRange(min=0),
+    help=(
+        "Report files with fewer bytes per second of footage than this share of the median of"
+        " the camera as undersized - they do not count as archived"
+    ),
+    envvar="PROTECT_UNDERSIZED_RATIO",
+    show_envvar=True,
+)
+@click.option(
+    "--plan",
+    type=click.Path(dir_okay=False, writable=True),
+    required=False,
+    help="Write the segments to download again to fill the gaps to this file, as JSON",
+    envvar="PROTECT_REPORT_PLAN",
+    show_envvar=True,
+)
+@click.option(
+    "--show-files",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    help="List every gap and undersized file instead of only the totals",
+    envvar="PROTECT_REPORT_SHOW_FILES",
+    show_envvar=True,
+)
+def report(
+    dest: str,
+    cameras: str,
+    start: datetime,
+    end: datetime,
+    undersized_ratio: float,
+    plan: Optional[str],
+    show_files: bool,
+) -> None:
+    catalog_file = path.join(dest, Config.CATALOG_FILE)
+    if not path.isfile(catalog_file):
+        click.echo(
+            f"No catalog found in '{dest}' - download with '--catalog' or run"
+            " 'protect-archiver index' first"
+        )
+        exit(1)
+
+    catalog = Catalog(catalog_file, dest)
+    try:
+        result = archive_report(
+            catalog,
+            start,
+            end,
+            camera_ids=set(cameras.split(",")) if cameras != "all" else None,
+            undersized_ratio=undersized_ratio,
+        )
+    finally:
+        catalog.close()
+
+    for camera in result:
+        missing = sum(gap_end - gap_start for gap_start, gap_end in camera.gaps)
+        click.echo(
+            f"{camera.camera_name} ({camera.camera_id}): {camera.coverage:.2%} covered by"
+            f" {camera.files} file(s), {len(camera.gaps)} gap(s) ({format_duration(missing)}),"
+            f" {len(camera.undersized)} undersized file(s)"
+        )
+        if show_files:
+            for gap_start, gap_end in camera.gaps:
+                click.echo(
+                    f"  gap        {datetime.fromtimestamp(gap_start / 1000)}"
+                    f" - {datetime.fromtimestamp(gap_end / 1000)}"
+                )
+            for file_path, _, _, size in camera.undersized:
+                click.echo(f"  undersized {file_path} ({size} bytes)")
+
+    if plan:
+        segments = redownload_plan(result)
+        with open(plan, "w") as fp:
+            json.dump(segments, fp, default=json_encode, indent=2)
+        click.echo(f"{len(segments)} segment(s) to download again written to {plan}")
@@ -1,13 +1,27 @@
+import threading
+
 from datetime import datetime
 from os import path
 from typing import Any
+from typing import Iterator
 from typing import List
 from typing import Optional
 
+from protect_archiver.catalog import Catalog
+from protect_archiver.client.http_session import create_http_session
 from protect_archiver.client.legacy import LegacyClient
+from protect_archiver.client.token_store import TokenStore
 from protect_archiver.client.unifi_os import UniFiOSClient
 from protect_archiver.config import Config
+from protect_archiver.console_cache import ConsoleCache
 from protect_archiver.downloader import Downloader
+from protect_archiver.limiter import AdaptiveConcurrencyLimiter
+from protect_archiver.limiter import ConcurrencyLimiter
+from protect_archiver.planner import SegmentPlanner
+from protect_archiver.retry import CircuitBreaker
+from protect_archiver.retry import RetryBudget
+from protect_archiver.retry import RetryPolicy
+from protect_archiver.segment_cache import EmptySegmentCache
 
 
 class ProtectClient:
@@ -30,6 +44,30 @@ class ProtectClient:
         # aka read_timeout - time to wait until a socket read response happens
         download_timeout: float = Config.DOWNLOAD_TIMEOUT,
         use_utc_filenames: bool = Config.USE_UTC_FILENAMES,
+        download_chunk_size: int = Config.DOWNLOAD_CHUNK_SIZE,
+        write_buffers: int = Config.WRITE_BUFFERS,
+        fsync_interval: int = Config.FSYNC_INTERVAL,
+        preallocate_files: bool = Config.PREALLOCATE_FILES,
+        prefetch_depth: int = Config.PREFETCH_DEPTH,
+        split_exports: int = Config.SPLIT_EXPORTS,
+        empty_segment_ttl: int = Config.EMPTY_SEGMENT_TTL,
+        skip_motion_gaps: bool = Config.SKIP_MOTION_GAPS,
+        event_list_window: int = Config.EVENT_LIST_WINDOW,
+        event_list_per_camera: bool = Config.EVENT_LIST_PER_CAMERA,
+        events_from_archive: bool = Config.EVENTS_FROM_ARCHIVE,
+        use_catalog: bool = Config.USE_CATALOG,
+        camera_cache_ttl: int = Config.CAMERA_CACHE_TTL,
+        refresh_camera_cache: bool = False,
+        persist_auth_token: bool = Config.PERSIST_AUTH_TOKEN,
+        cache_dir: str = Config.CACHE_DIR,
+        adaptive_segments: bool = Config.ADAPTIVE_SEGMENTS,
+        max_segment_length: int = Config.MAX_SEGMENT_LENGTH,
+        http_pool_size: int = Config.HTTP_POOL_SIZE,
+        http_keepalive_idle: int = Config.HTTP_KEEPALIVE_IDLE,
+        max_concurrent_exports: int = Config.MAX_CONCURRENT_EXPORTS,
+        adaptive_concurrency: bool = Config.ADAPTIVE_CONCURRENCY,
+        circuit_breaker_threshold: int = Config.CIRCUIT_BREAKER_THRESHOLD,
+        retry_policy: Optional[RetryPolicy] = None,
     ) -> None:
         self.protocol = protocol
         self.address = address
@@ -42,6 +80,16 @@ class ProtectClient:
         self.ignore_failed_downloads = ignore_failed_downloads
         self.download_wait = download_wait
         self.download_timeout = download_timeout
+        self.download_chunk_size = download_chunk_size
+        self.write_buffers = write_buffers
+        self.fsync_interval = fsync_interval
+        self.preallocate_files = preallocate_files
+        self.prefetch_depth = prefetch_depth
+        self.split_exports = split_exports
+        self.skip_motion_gaps = skip_motion_gaps
+        self.event_list_window = event_list_window
+        self.event_list_per_camera = event_list_per_camera
+        self.events_from_archive = events_from_archive
         self.use_subfolders = use_subfolders
         self.skip_existing_files = skip_existing_files
         self.touch_files = touch_files
@@ -53,11 +101,66 @@ class ProtectClient:
         self.bytes_downloaded = 0
         self.files_skipped = 0
         self.files_failed = 0
-        self.max_retries = 3
+        self.requests_saved = 0
+        self.files_cut = 0
+        self.max_retries = Config.MAX_RETRIES
+        # backoff with jitter, and a retry budget shared by all workers using this client
+        self.retry_policy = retry_policy or RetryPolicy(
+            max_retries=self.max_retries,
+            base_delay=max(download_wait, Config.RETRY_BASE_DELAY),
+            budget=RetryBudget(),
+        )
+        # pauses all downloads while the console fails requests
+        self.circuit_breaker = CircuitBreaker(threshold=circuit_breaker_threshold)
+        # guards the counters above, which are updated by concurrent download workers
+        self._stats_lock = threading.Lock()
+        # global limit on simultaneous downloads, shared by all workers using this client;
+        # the adaptive limiter uses max_concurrent_exports as its upper bound
+        self.export_limiter = (
+            AdaptiveConcurrencyLimiter(max_limit=max_concurrent_exports)
+            if adaptive_concurrency and max_concurrent_exports
+            else ConcurrencyLimiter(max_concurrent_exports)
+        )
+
+        # learns per-camera segment lengths, kept next to the downloaded files between runs
+        self.segment_planner = (
+            SegmentPlanner(
+                path.join(self.destination_path, Config.SEGMENT_STATEFILE),
+                max_length=max_segment_length,
+            )
+            if adaptive_segments
+            else None
+        )
+
+        # segments without footage, which are not requested again until the entries expire
+        self.empty_segments = (
+            EmptySegmentCache(
+                path.join(self.destination_path, Config.EMPTY_SEGMENTS_STATEFILE),
+                ttl=empty_segment_ttl,
+            )
+            if empty_segment_ttl
+            else None
+        )
+
+        # record of the archived files, also used to skip existing files without touching the disk
+        # and to find the footage event clips are cut from
+        self.catalog = (
+            Catalog(path.join(self.destination_path, Config.CATALOG_FILE), self.destination_path)
+            if use_catalog or events_from_archive
+            else None
+        )
 
         self._access_key = None
         self._api_token = None
 
+        # single keep-alive connection pool shared by the login and all download requests
+        self.http_session = create_http_session(
+            pool_size=http_pool_size, keepalive_idle=http_keepalive_idle
+        )
+
+        # tokens of previous runs, so that frequent runs do not log in every time
+        token_store = TokenStore(cache_dir) if persist_auth_token else None
+
         if not_unifi_os:
             self.port = 7443
             self.base_path = "/api"
@@ -70,6 +173,8 @@ class ProtectClient:
                 self.username,
                 self.password,
                 self.verify_ssl,
+                self.http_session,
+                token_store,
             )
         else:
             self.port = 443
@@ -81,19 +186,44 @@ class ProtectClient:
                 self.username,
                 self.password,
                 self.verify_ssl,
+                self.http_session,
+                token_store,
             )
 
+        # camera list and console metadata of a previous run, reused for camera_cache_ttl seconds
+        self.refresh_camera_cache = refresh_camera_cache
+        self.console_cache = (
+            ConsoleCache(cache_dir, self.address, self.port, ttl=camera_cache_ttl)
+            if camera_cache_ttl
+            else None
+        )
+
     def get_camera_list(self) -> List[Any]:
-        return Downloader.get_camera_list(self.session)
+        return Downloader.get_camera_list(
+            self.session, self.console_cache, self.refresh_camera_cache
+        )
 
+    # yields the events as the requests for the time windows complete
     def get_motion_event_list(
         self, start: datetime, end: datetime, camera_list: List[Any]
-    ) -> List[Any]:
-        return Downloader.get_motion_event_list(self.session, start, end, camera_list)
+    ) -> Iterator[Any]:
+        return Downloader.get_motion_event_list(
+            self.session,
+            start,
+            end,
+            camera_list,
+            self.event_list_window,
+            self.event_list_per_camera,
+        )
 
     def get_session(self) -> Any:
         return self.session
 
+    # thread-safe update of one of the download statistics counters
+    def increment(self, counter: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
 
 # TODO
 # class ProtectError(object):
@@ -0,0 +1,98 @@
+import threading
+import time
+
+from abc import ABC
+from abc import abstractmethod
+from typing import Optional
+
+from protect_archiver.client.token_store import TokenStore
+from protect_archiver.client.token_store import token_expiry
+from protect_archiver.config import Config
+
+
+class TokenAuth(ABC):
+    """API token handling shared by the console clients, which implement ``fetch_token``.
+
+    All threads using a client share one token. Replacing it is single-flight: one thread
+    logs in while the others wait for the new token, and a thread that waited for the lock
+    because its token was rejected uses the token that replaced it instead of logging in
+    again. A token that tells its expiry (JWT) is replaced ``refresh_margin`` seconds ahead
+    of it, so that no request is sent with a token about to expire - the other threads keep
+    using the current token in the meantime.
+    """
+
+    authority: str
+    username: str
+
+    def __init__(
+        self,
+        token_store: Optional[TokenStore] = None,
+        refresh_margin: int = Config.TOKEN_EXPIRY_MARGIN,
+    ) -> None:
+        self.token_store = token_store
+        self.refresh_margin = refresh_margin
+        self._api_token: Optional[str] = None
+        self._token_expires: Optional[float] = None
+        self._token_lock = threading.Lock()
+        # the token each thread sent last, to tell which one the console rejected
+        self._sent_token = threading.local()
+
+    # log in and return a new API token
+    @abstractmethod
+    def fetch_token(self) -> str:
+        pass
+
+    # force replaces the given rejected token (or the current one) with a new one
+    def get_api_token(self, force: bool = False, rejected: Optional[str] = None) -> str:
+        token = self._api_token
+        if force:
+            stale = rejected if rejected is not None else token
+        elif token is None or self._expires_within(0):
+            stale = token
+        elif self._expires_within(self.refresh_margin):
+            # refresh ahead of the expiry, unless another thread is already doing that
+            if not self._token_lock.acquire(blocking=False):
+                return token
+            try:
+                return self._replace_token(token)
+            finally:
+                self._token_lock.release()
+        else:
+            return token
+
+        with self._token_lock:
+            return self._replace_token(stale, rejected=force)
+
+    # the token for a request, replacing the one this thread sent last if it was rejected
+    def request_token(self, force: bool = False) -> str:
+        rejected = getattr(self._sent_token, "value", None) if force else None
+        token = self.get_api_token(force=force, rejected=rejected)
+        self._sent_token.value = token
+        return token
+
+    def _expires_within(self, seconds: int) -> bool:
+        return self._token_expires is not None and self._token_expires - seconds <= time.time()
+
+    # called with the lock held
+    def _replace_token(self, stale: Optional[str], rejected: bool = False) -> str:
+        if self._api_token is not None and self._api_token != stale:
+            # replaced by another thread while this one waited for the lock
+            return self._api_token
+
+        token_key = TokenStore.key(self.authority, self.username)
+        token = None
+        if self.token_store is not None:
+            if rejected:
+                self.token_store.remove(token_key)
+            elif self._api_token is None:
+                # reuse the token of a previous run until it expires or is rejected
+                token = self.token_store.load(token_key)
+
+        if token is None:
+            token = self.fetch_token()
+            if self.token_store is not None:
+                self.token_store.store(token_key, token)
+
+        self._api_token = token
+        self._token_expires = token_expiry(token)
+        return token
@@ -0,0 +1,75 @@
+import socket
+
+from http.cookiejar import DefaultCookiePolicy
+from typing import Any
+from typing import List
+from typing import Tuple
+from typing import Union
+
+import requests
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+from protect_archiver.config import Config
+
+
+class KeepAliveHTTPAdapter(HTTPAdapter):
+    """HTTP adapter that enables TCP keep-alive probes on pooled connections.
+
+    Idle connections to the console are kept open between segment downloads. The probes
+    keep NAT/firewall state alive and detect dead peers, so a stale connection is dropped
+    instead of stalling the next request.
+    """
+
+    __attrs__ = HTTPAdapter.__attrs__ + ["keepalive_idle"]
+
+    def __init__(self, keepalive_idle: int = Config.HTTP_KEEPALIVE_IDLE, **kwargs: Any) -> None:
+        # must be set before HTTPAdapter.__init__, which initializes the pool manager
+        self.keepalive_idle = keepalive_idle
+        super().__init__(**kwargs)
+
+    def socket_options(self) -> List[Tuple[int, int, Union[int, bytes]]]:
+        options = list(HTTPConnection.default_socket_options)
+        if self.keepalive_idle > 0:
+            options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+            # not all platforms expose the fine-grained keep-alive timers
+            if hasattr(socket, "TCP_KEEPIDLE"):
+                options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, self.keepalive_idle))
+            if hasattr(socket, "TCP_KEEPINTVL"):
+                options.append(
+                    (socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, max(self.keepalive_idle // 4, 1))
+                )
+        return options
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        kwargs.setdefault("socket_options", self.socket_options())
+        super().init_poolmanager(*args, **kwargs)
+
+
+def create_http_session(
+    pool_size: int = Config.HTTP_POOL_SIZE,
+    keepalive_idle: int = Config.HTTP_KEEPALIVE_IDLE,
+) -> requests.Session:
+    """Create the connection-pooling HTTP session shared by all requests against the console.
+
+    Connections are reused across requests, so a long backfill pays for the TCP and TLS
+    handshakes only once per pooled connection instead of once per segment.
+    """
+    session = requests.Session()
+
+    # never store cookies set by the console - the auth clients pass their token explicitly
+    # with every request, and a stale login cookie in the jar would shadow a refreshed one
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+
+    # retries are handled by the downloader, so the adapter must not retry on its own
+    adapter = KeepAliveHTTPAdapter(
+        keepalive_idle=keepalive_idle,
+        pool_connections=1,
+        pool_maxsize=pool_size,
+        max_retries=0,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    return session
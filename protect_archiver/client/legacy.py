@@ -1,13 +1,17 @@
 import logging
 
+from typing import Any
 from typing import Optional
 
 import requests
 
+from protect_archiver.client.auth import TokenAuth
+from protect_archiver.client.http_session import create_http_session
+from protect_archiver.client.token_store import TokenStore
 from protect_archiver.errors import ProtectError
 
 
-class LegacyClient:
+class LegacyClient(TokenAuth):
     def __init__(
         self,
         protocol: str,
@@ -16,16 +20,19 @@ class LegacyClient:
         username: str,
         password: str,
         verify_ssl: bool,
+        http_session: Optional[requests.Session] = None,
+        token_store: Optional[TokenStore] = None,
     ) -> None:
+        super().__init__(token_store)
         self.protocol = protocol
         self.address = address
         self.port = port
         self.username = username
         self.password = password
         self.verify_ssl = verify_ssl
+        self.http_session = http_session if http_session is not None else create_http_session()
 
         self._access_key: Optional[str] = None
-        self._api_token: Optional[str] = None
 
         self.authority = f"{self.protocol}://{self.address}:{self.port}"
         self.base_path = "/api"
@@ -34,7 +41,7 @@ class LegacyClient:
     def fetch_api_token(self) -> str:
         auth_uri = f"{self.protocol}://{self.address}:{self.port}/api/auth"
 
-        response = requests.post(
+        response = self.http_session.post(
             auth_uri,
             json={"username": self.username, "password": self.password},
             verify=self.verify_ssl,
@@ -61,12 +68,12 @@ class LegacyClient:
         assert authorization_header
         return authorization_header
 
-    def get_api_token(self, force: bool = False) -> str:
-        if force:
-            self._api_token = None
+    def fetch_token(self) -> str:
+        # get new API auth bearer token
+        return self.fetch_api_token()
 
-        if self._api_token is None:
-            # get new API auth bearer token and access key
-            self._api_token = self.fetch_api_token()
-
-        return self._api_token
+    # authenticated GET request against the console using the shared connection pool
+    def get(self, uri: str, force_token: bool = False, **kwargs: Any) -> requests.Response:
+        headers = dict(kwargs.pop("headers", None) or {})
+        headers["Authorization"] = f"Bearer {self.request_token(force=force_token)}"
+        return self.http_session.get(uri, headers=headers, verify=self.verify_ssl, **kwargs)
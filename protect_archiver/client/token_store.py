@@ -0,0 +1,98 @@
+import base64
+import json
+import logging
+import os
+import threading
+import time
+
+from typing import Any
+from typing import Dict
+from typing import Optional
+
+from protect_archiver.config import Config
+
+
+class TokenStore:
+    """API tokens of previous runs, so that a new process does not have to log in again.
+
+    Tokens are kept in ``<cache_dir>/tokens.json`` by console and user, with the time they
+    expire - taken from the ``exp`` claim if the token is a JWT, otherwise ``default_ttl``
+    seconds after it was stored. A token is no longer handed out ``margin`` seconds before it
+    expires. The file is only readable by the current user (0600) and replaced atomically.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        default_ttl: int = Config.TOKEN_TTL,
+        margin: int = Config.TOKEN_EXPIRY_MARGIN,
+    ) -> None:
+        self.filename = os.path.join(cache_dir, "tokens.json")
+        self.default_ttl = default_ttl
+        self.margin = margin
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(authority: str, username: str) -> str:
+        return f"{username}@{authority}"
+
+    def load(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._read().get(key)
+        if not isinstance(entry, dict) or not isinstance(entry.get("token"), str):
+            return None
+        try:
+            expires = float(entry.get("expires", 0))
+        except (TypeError, ValueError):
+            return None  # written by something else, treated as expired
+        if expires - self.margin <= time.time():
+            return None
+        logging.debug(f"Reusing the API token of a previous login as {key}")
+        return entry["token"]
+
+    def store(self, key: str, token: str) -> None:
+        expires = token_expiry(token) or time.time() + self.default_ttl
+        with self._lock:
+            tokens = self._read()
+            tokens[key] = {"token": token, "expires": expires}
+            self._write(tokens)
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            tokens = self._read()
+            if tokens.pop(key, None) is not None:
+                self._write(tokens)
+
+    def _read(self) -> Dict[str, Any]:
+        try:
+            with open(self.filename) as fp:
+                tokens = json.load(fp)
+        except (OSError, ValueError):
+            return {}
+        return tokens if isinstance(tokens, dict) else {}
+
+    def _write(self, tokens: Dict[str, Any]) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.filename), mode=0o700, exist_ok=True)
+            tmpfile = f"{self.filename}.{os.getpid()}.tmp"
+            fd = os.open(tmpfile, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as fp:
+                # the file may have existed with other permissions
+                os.fchmod(fp.fileno(), 0o600)
+                json.dump(tokens, fp)
+            os.replace(tmpfile, self.filename)
+        except OSError as error:
+            # without a stored token, the next run logs in again
+            logging.warning(f"Could not store the API token in {self.filename}: {error}")
+
+
+# expiry time of a JWT from its "exp" claim, or None if the token is not a JWT
+def token_expiry(token: str) -> Optional[float]:
+    parts = token.split(".")
+    if len(parts) != 3:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(parts[1] + "=" * (-len(parts[1]) % 4)))
+        return float(payload["exp"])
+    except (ValueError, KeyError, TypeError):
+        return None
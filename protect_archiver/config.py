@@ -1,4 +1,7 @@
+import os
+
 from typing import Optional
+from typing import Tuple
 
 
 class Config:
@@ -24,4 +27,58 @@ class Config:
         60.0  # aka read_timeout - time to wait until a socket read response happens
     )
     MAX_RETRIES: int = 3
+    RETRY_BASE_DELAY: float = 3.0  # seconds before the first retry, doubled for each one after
+    RETRY_MAX_DELAY: float = 60.0  # upper bound of the delay between retries, in seconds
+    RETRY_BUDGET_RATIO: float = 0.2  # retries allowed per download, across all downloads
+    RETRY_BUDGET_MAX: int = 10  # retries that can be saved up while downloads succeed
+    CIRCUIT_BREAKER_THRESHOLD: int = 5  # failed requests in a row that pause downloads, 0 disables
+    CIRCUIT_BREAKER_COOLDOWN: float = 30.0  # seconds downloads are paused before a probe
+    CIRCUIT_BREAKER_MAX_COOLDOWN: float = 300.0  # upper bound of the pause after failed probes
+    DOWNLOAD_CHUNK_SIZE: int = 1024 * 1024  # bytes read from the network and written at once
+    WRITE_BUFFERS: int = 0  # chunk buffers between network reads and disk writes, 0 disables
+    FSYNC_INTERVAL: int = 0  # bytes written before the file is synced to disk, 0 disables
+    PREALLOCATE_FILES: bool = False
+    CONCURRENCY: int = 1  # number of segments downloaded in parallel
+    ADAPTIVE_SEGMENTS: bool = False
+    SEGMENT_LENGTH: int = 3600  # seconds per segment, and the base of adaptive segment lengths
+    MIN_SEGMENT_LENGTH: int = 60  # failing segments are not split below this many seconds
+    MAX_SEGMENT_LENGTH: int = 3600  # upper bound of adaptive segments, in seconds
+    SEGMENT_GROW_AFTER: int = 4  # fast segments in a row before the length is doubled
+    SEGMENT_FAST_RATIO: float = 0.05  # download time per recorded time counted as "fast"
+    SEGMENT_STATEFILE: str = "segments.state"  # learned segment lengths, in the destination
+    SKIP_MOTION_GAPS: bool = False
+    # recording modes of cameras that only record around motion events
+    MOTION_RECORDING_MODES: Tuple[str, ...] = ("motion", "detections", "smartDetect")
+    EMPTY_SEGMENT_TTL: int = 0  # seconds to remember segments without footage, 0 disables
+    EMPTY_SEGMENTS_STATEFILE: str = "empty-segments.state"  # in the destination
+    USE_CATALOG: bool = False
+    CATALOG_FILE: str = "catalog.sqlite3"  # catalog of the archived files, in the destination
+    INDEX_WORKERS: int = 16  # directories listed at the same time when indexing an archive
+    UNDERSIZED_RATIO: float = 0.25  # files below this share of a camera's median bitrate
+    # per-user directory for data cached between runs
+    CACHE_DIR: str = os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "protect-archiver"
+    )
+    PERSIST_AUTH_TOKEN: bool = False
+    TOKEN_TTL: int = 3600  # seconds a stored token is reused if it does not tell its expiry
+    TOKEN_EXPIRY_MARGIN: int = 60  # seconds before its expiry a token is no longer used
+    CAMERA_CACHE_TTL: int = 0  # seconds to reuse the camera list of a previous run, 0 disables
+    SPLIT_EXPORTS: int = 1  # exports a segment is split into and downloaded in parallel
+    PREFETCH_DEPTH: int = 0  # exports requested ahead of the one being downloaded, 0 disables
+    EVENT_LIST_WINDOW: int = 24 * 3600  # seconds of events per /events request, 0 disables
+    EVENT_LIST_PER_CAMERA: bool = False  # request the events of every camera separately
+    EVENT_LIST_WORKERS: int = 4  # /events requests sent at the same time
+    JSON_CHUNK_SIZE: int = 64 * 1024  # bytes of a JSON response parsed at once
+    EVENT_MERGE_GAP: float = 5.0  # seconds between events of a camera merged into one clip
+    EVENT_PRE_ROLL: float = 0  # seconds exported before each event
+    EVENT_POST_ROLL: float = 0  # seconds exported after each event
+    EVENTS_FROM_ARCHIVE: bool = False  # cut event clips out of the archived footage
+    MAX_CONCURRENT_EXPORTS: int = 0  # max. number of simultaneous downloads, 0 for no limit
+    SYNC_MAX_CONCURRENT_EXPORTS: int = 2  # default of 'sync', which exports all cameras at once
+    ADAPTIVE_CONCURRENCY: bool = False
+    ADAPTIVE_LATENCY_TOLERANCE: float = 3.0  # time-to-first-byte in multiples of the best one
+    ADAPTIVE_BACKOFF_FACTOR: float = 0.5  # limit is multiplied by this on timeouts and errors
+    HTTP_POOL_SIZE: int = 10  # max. number of pooled keep-alive connections to the console
+    HTTP_KEEPALIVE_IDLE: int = 60  # idle seconds before TCP keep-alive probes start, 0 disables
     USE_UTC_FILENAMES: bool = False
+    SYNC_COMPACT_INTERVAL: int = 24  # sync checkpoints to collect before rewriting the statefile
@@ -0,0 +1,50 @@
+import json
+import logging
+import os
+import re
+import time
+
+from typing import Any
+from typing import Dict
+from typing import Optional
+
+
+class ConsoleCache:
+    """Camera list and console metadata of one console, kept on disk between runs.
+
+    The data of ``/bootstrap`` (the cameras and the ``nvr`` section describing the console) is
+    stored in ``<cache_dir>/<address>-<port>.json`` together with the time it was fetched, and
+    considered fresh for ``ttl`` seconds. The file is replaced atomically, so that concurrent
+    runs (e.g. overlapping cron jobs) never read a partially written one.
+    """
+
+    def __init__(self, cache_dir: str, address: str, port: int, ttl: int) -> None:
+        name = re.sub(r"[^A-Za-z0-9.-]", "_", f"{address}-{port}")
+        self.filename = os.path.join(cache_dir, f"{name}.json")
+        self.ttl = ttl
+
+    # the cached data and its age in seconds, or None if there is no fresh cached data
+    def load(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.filename) as fp:
+                data = json.load(fp)
+            age = time.time() - float(data["fetched"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if not 0 <= age < self.ttl:
+            return None
+        logging.debug(f"Using console data cached {int(age)}s ago in {self.filename}")
+        data["age"] = age
+        return data
+
+    def store(self, cameras: Any, nvr: Optional[Dict[str, Any]]) -> None:
+        data = {"fetched": time.time(), "cameras": cameras, "nvr": nvr}
+        try:
+            os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+            tmpfile = f"{self.filename}.{os.getpid()}.tmp"
+            with open(tmpfile, "w") as fp:
+                json.dump(data, fp)
+            os.replace(tmpfile, self.filename)
+        except OSError as error:
+            # the cache only saves requests, it is not worth failing a download for
+            logging.warning(f"Could not write console cache {self.filename}: {error}")
@@ -1,6 +1,8 @@
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Any
+from typing import Optional
+from typing import Tuple
 
 
 @dataclass
@@ -11,6 +13,10 @@ class Camera:
     id: str
     name: str
     recording_start: datetime
+    recording_end: Optional[datetime] = None
+    recording_mode: Optional[str] = None
+    # seconds recorded before and after motion events
+    recording_padding: Tuple[int, int] = (0, 0)
 
 
 @dataclass
@@ -22,3 +28,6 @@ class MotionEvent:
     score: int
     thumbnail_id: str
     heatmap_id: str
+    type: Optional[str] = None
+    # ids of the events covered by a clip merged from several events
+    event_ids: Tuple[str, ...] = ()
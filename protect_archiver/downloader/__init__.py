@@ -1,10 +1,14 @@
 from datetime import datetime
 from typing import Any
+from typing import Iterator
 from typing import List
 
 from protect_archiver.config import Config
 from protect_archiver.downloader.download_file import download_file
 from protect_archiver.downloader.download_footage import download_footage
+from protect_archiver.downloader.download_footage_concurrent import (
+    download_footage_concurrent,
+)
 from protect_archiver.downloader.download_motion_event import download_motion_event
 from protect_archiver.downloader.download_snapshot import download_snapshot
 from protect_archiver.downloader.get_camera_list import get_camera_list
@@ -29,14 +33,19 @@ class Downloader:
         self.download_wait = download_wait
 
     @staticmethod
-    def get_camera_list(session: Any) -> List[Any]:
-        return get_camera_list(session)
+    def get_camera_list(session: Any, cache: Any = None, refresh: bool = False) -> List[Any]:
+        return get_camera_list(session, cache, refresh)
 
     @staticmethod
     def get_motion_event_list(
-        session: Any, start: datetime, end: datetime, camera_list: List[Any]
-    ) -> List[Any]:
-        return get_motion_event_list(session, start, end, camera_list)
+        session: Any,
+        start: datetime,
+        end: datetime,
+        camera_list: List[Any],
+        window: int = Config.EVENT_LIST_WINDOW,
+        per_camera: bool = Config.EVENT_LIST_PER_CAMERA,
+    ) -> Iterator[Any]:
+        return get_motion_event_list(session, start, end, camera_list, window, per_camera)
 
     @staticmethod
     def download_file(client: Any, video_export_query: str, filename: str) -> Any:
@@ -50,8 +59,25 @@ class Downloader:
         camera: Any,
         disable_alignment: bool = Config.DISABLE_ALIGNMENT,
         disable_splitting: bool = Config.DISABLE_SPLITTING,
+        timeline: Any = None,
+    ) -> Any:
+        return download_footage(
+            client, start, end, camera, disable_alignment, disable_splitting, timeline
+        )
+
+    @staticmethod
+    def download_footage_concurrent(
+        client: Any,
+        start: datetime,
+        end: datetime,
+        camera_list: List[Any],
+        disable_alignment: bool = Config.DISABLE_ALIGNMENT,
+        disable_splitting: bool = Config.DISABLE_SPLITTING,
+        concurrency: int = Config.CONCURRENCY,
     ) -> Any:
-        return download_footage(client, start, end, camera, disable_alignment, disable_splitting)
+        return download_footage_concurrent(
+            client, start, end, camera_list, disable_alignment, disable_splitting, concurrency
+        )
 
     @staticmethod
     def download_snapshot(client: Any, start: datetime, camera: Any) -> Any:
@@ -0,0 +1,161 @@
+import hashlib
+import logging
+import math
+import os
+import time
+
+from typing import Any
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from protect_archiver.dataclasses import Camera
+from protect_archiver.downloader.download_file import download_file
+from protect_archiver.downloader.download_file import hash_file
+from protect_archiver.downloader.download_file import is_archived
+from protect_archiver.errors import Mp4Error
+from protect_archiver.mp4 import concatenate
+from protect_archiver.mp4 import cut
+
+
+# the pieces of the time range from start to end (epoch milliseconds with inclusive ends, like
+# the export queries) as (path, start, end), in order - the path is the archived file covering
+# the piece, or None for pieces that are not archived; files are (path, start, end) ordered by
+# start, as returned by the catalog
+def plan_clip(
+    files: Sequence[Tuple[str, int, int]], start: int, end: int
+) -> List[Tuple[Optional[str], int, int]]:
+    pieces: List[Tuple[Optional[str], int, int]] = []
+    position = start
+    for path, file_start, file_end in files:
+        if file_end < position:
+            continue  # overlaps a file that is used already
+        if file_start > end:
+            break
+        if file_start > position:
+            pieces.append((None, position, file_start - 1))
+            position = file_start
+        pieces.append((path, position, min(file_end, end)))
+        position = min(file_end, end) + 1
+        if position > end:
+            break
+    if position <= end:
+        pieces.append((None, position, end))
+    return pieces
+
+
+# cut the clip of a motion event out of the footage archived in the destination (e.g. the hourly
+# files of 'download' and 'sync', as recorded in the catalog) and download only the parts of it
+# that are not archived - returns False if nothing of it is archived or the clip cannot be put
+# together, so that it is downloaded as a whole instead
+#
+# The archived files are expected to begin at the start recorded in the catalog, a file that
+# ends before the end recorded for it only provides the part it has. The clip begins at the last
+# keyframe before its start, so it can be a few seconds longer than the export.
+def cut_motion_event(
+    client: Any,
+    camera: Camera,
+    filename: str,
+    start: int,
+    end: int,
+    event_ids: Sequence[str] = (),
+) -> bool:
+    if bool(client.skip_existing_files) and is_archived(client, filename):
+        return False  # let download_file log and count the skipped file
+
+    catalog = client.catalog
+    files = [
+        (os.path.join(catalog.root, path), file_start, file_end)
+        for path, file_start, file_end, _ in catalog.footage(camera.id, start, end)
+        if os.path.join(catalog.root, path) != os.path.abspath(filename)
+    ]
+    pieces = plan_clip(files, start, end)
+    if all(path is None for path, _, _ in pieces):
+        return False
+
+    file_starts = {path: file_start for path, file_start, _ in files}
+    part_filenames: List[str] = []
+    downloaded_files = downloaded_bytes = 0
+    joined = False
+    started_at = time.monotonic()
+    try:
+        for path, piece_start, piece_end in pieces:
+            if path is not None:
+                part_filename = f"{filename}.{len(part_filenames) + 1}"
+                try:
+                    piece_start = cut_archived_piece(
+                        path, file_starts[path], piece_start, piece_end, part_filename
+                    )
+                except Mp4Error as error:
+                    logging.warning(f"Cannot cut the clip out of {path} ({error})")
+                else:
+                    part_filenames.append(part_filename)
+                if piece_start > piece_end:
+                    continue
+
+            # the part of the clip that is not archived
+            part_filename = f"{filename}.{len(part_filenames) + 1}"
+            logging.info(
+                f"Downloading {(piece_end + 1 - piece_start) // 1000}s of the clip"
+                " that are not archived"
+            )
+            if not download_file(
+                client,
+                f"/video/export?camera={camera.id}&start={piece_start}&end={piece_end}",
+                part_filename,
+            ):
+                return False
+            part_filenames.append(part_filename)
+            downloaded_files += 1
+            downloaded_bytes += os.path.getsize(part_filename)
+
+        if len(part_filenames) > 1:
+            concatenate(part_filenames, f"{filename}.part")
+        else:
+            os.replace(part_filenames[0], f"{filename}.part")
+        os.replace(f"{filename}.part", filename)
+        joined = True
+    except (Mp4Error, OSError) as error:
+        logging.warning(f"Cutting the clip out of archived footage failed ({error})")
+        return False
+    finally:
+        # every downloaded part was counted as a file of its own - and if the clip is downloaded
+        # as a whole instead, that download counts the bytes once more
+        client.increment("files_downloaded", -downloaded_files)
+        if not joined:
+            client.increment("bytes_downloaded", -downloaded_bytes)
+        for part_filename in part_filenames + [f"{filename}.part"]:
+            if os.path.exists(part_filename):
+                os.remove(part_filename)
+
+    client.increment("files_cut")
+    hasher = hashlib.sha256()
+    hash_file(hasher, filename, client.download_chunk_size)
+    catalog.add(
+        filename,
+        camera.id,
+        start,
+        end,
+        os.path.getsize(filename),
+        hasher.hexdigest(),
+        time.monotonic() - started_at,
+        event_ids,
+    )
+    return True
+
+
+# cut the piece from piece_start to piece_end (epoch milliseconds, inclusive) out of an archived
+# file that begins at file_start; returns where the rest of the piece, which the file does not
+# have, begins - after piece_end if the file has all of it
+def cut_archived_piece(
+    path: str, file_start: int, piece_start: int, piece_end: int, part_filename: str
+) -> int:
+    logging.info(f"Cutting the clip out of archived footage {path}")
+    _, cut_end = cut(
+        path,
+        part_filename,
+        (piece_start - file_start) / 1000,
+        (piece_end + 1 - file_start) / 1000,
+    )
+    return file_start + math.ceil(cut_end * 1000)
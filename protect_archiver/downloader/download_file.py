@@ -1,162 +1,211 @@
 # file downloader
+import hashlib
 import json
 import logging
 import os
 import time
 
+from concurrent.futures import Executor
+from concurrent.futures import Future
 from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
 
 import requests
 
+from protect_archiver.downloader.write_behind import write_behind
 from protect_archiver.errors import DownloadFailed
 from protect_archiver.errors import ProtectError
+from protect_archiver.errors import SegmentFailed
 from protect_archiver.utils import format_bytes
 from protect_archiver.utils import print_download_stats
 
 
-def download_file(client: Any, query: str, filename: str) -> None:
+def download_file(
+    client: Any,
+    query: str,
+    filename: str,
+    prefetched: Optional["Future[requests.Response]"] = None,
+    raise_on_failure: bool = False,
+    on_empty: Optional[Callable[[], None]] = None,
+    segment: Optional[Tuple[str, int, int]] = None,
+    event_ids: Sequence[str] = (),
+) -> bool:
     exit_code = 1
-    retry_delay = max(client.download_wait, 3)
     uri = f"{client.session.authority}{client.session.base_path}{query}"
 
     # skip downloading files that already exist on disk if argument --skip-existing-files is present
     # TODO(dcramer): sanity check on filesize would be valuable here
-    if bool(client.skip_existing_files) and os.path.exists(filename):
+    if bool(client.skip_existing_files) and is_archived(client, filename):
         logging.info(
             f"File {filename} already exists on disk and argument '--skip-existing-files' "
             "is present - skipping download \n"
         )
-        client.files_skipped += 1
-        return  # skip the download
+        client.increment("files_skipped")
+        discard_prefetched(client, prefetched)
+        return False  # skip the download
+
+    # download to a temporary file first and only move it to its final name once it is complete,
+    # so that an interrupted download never leaves a truncated file behind
+    part_filename = f"{filename}.part"
+    if os.path.exists(part_filename):
+        # left over from a previous run - the export is not guaranteed to be identical
+        os.remove(part_filename)
+
+    client.retry_policy.record_download()
+    attempts = 0
+    server_error = False
+    while True:
+        wait_for_slot(client, prefetched)
 
-    for retry_num in range(client.max_retries):
         # make the GET request to retrieve the video file or snapshot
+        healthy: Optional[bool] = None
+        start = time.monotonic()
         try:
-            start = time.monotonic()
-            response = (
-                requests.get(
-                    uri,
-                    cookies={"TOKEN": client.session.get_api_token()},
-                    verify=client.verify_ssl,
-                    timeout=client.download_timeout,
-                    stream=True,
-                )
-                if client.session.__class__.__name__ == "UniFiOSClient"
-                else requests.get(
-                    uri,
-                    headers={"Authorization": f"Bearer {client.session.get_api_token()}"},
-                    verify=client.verify_ssl,
-                    timeout=client.download_timeout,
-                    stream=True,
-                )
-            )
+            # continue an interrupted download where it left off
+            offset = os.path.getsize(part_filename) if os.path.exists(part_filename) else 0
+            headers = {"Range": f"bytes={offset}-"} if offset else {}
 
-            if response.status_code == 401:
-                # invalid current api token - we special case this
-                # as we dont want to retry on consecutive auth failures
-                # TODO: refactor this
-                start = time.monotonic()
-                response = (
-                    requests.get(
-                        uri,
-                        cookies={"TOKEN": client.session.get_api_token(force=True)},
-                        verify=client.verify_ssl,
-                        timeout=client.download_timeout,
-                        stream=True,
-                    )
-                    if client.session.__class__.__name__ == "UniFiOSClient"
-                    else requests.get(
-                        uri,
-                        headers={
-                            "Authorization": f"Bearer {client.session.get_api_token(force=True)}"
-                        },
-                        verify=client.verify_ssl,
-                        timeout=client.download_timeout,
-                        stream=True,
-                    )
-                )
+            if prefetched is not None:
+                # the request was sent ahead of time, only the first attempt can use it
+                response, prefetched = prefetched.result(), None
+            else:
+                response = request_file(client, uri, headers)
 
-            # write file to disk if response.status_code is 200,
-            # otherwise log error and then either exit or skip the download
-            if response.status_code != 200:
-                try:
-                    data = json.loads(response.content)
-                    error_message = data.get("error") or data or "(no information available)"
-                except Exception:
-                    data = None
-                    error_message = "(no information available)"
+            record_response_time(client, response, start)
+            healthy = response.status_code < 500
 
-                # TODO
-                logging.exception(
-                    f"Download failed with status {response.status_code} {response.reason}:\n"
-                    f"{error_message}"
-                )
-                client.files_failed += 1
-                # if response.status_code == 401:
-                #     cls = Errors.AuthorizationFailed
-                # else:
-                #     cls = Errors.DownloadFailed
-                # raise cls(
-                #     f"Download failed with status {response.status_code} {response.reason}:\n{error_message}"
-                # )
+            if response.status_code == 206 and not is_range_continuation(response, offset):
+                response.close()
+                raise DownloadFailed(f"Server returned an unexpected range for offset {offset}")
 
+            if response.status_code == 416 and offset:
+                # the partial file does not match the export - start over right away, without
+                # asking for a range
+                response.close()
+                remove_part_file(part_filename)
+                logging.warning("Server rejected resuming the download - restarting download")
+                continue
+
+            # write file to disk if response.status_code is 200 (or 206 when resuming),
+            # otherwise log error and either retry, exit or skip the download
+            if response.status_code not in (200, 206):
+                if not client.retry_policy.is_retryable(response.status_code):
+                    # client errors do not go away by asking again
+                    handle_error_response(client, response, part_filename)
+                    return False
+                handle_server_error(response, part_filename, raise_on_failure)
+                server_error = True
             else:
-                total_bytes = int(response.headers.get("content-length") or 0)
-                cur_bytes = 0
-                if not total_bytes:
-                    with open(filename, "wb") as fp:
-                        content = response.content
-                        cur_bytes = len(content)
-                        total_bytes = cur_bytes
-                        fp.write(content)
-
-                else:
-                    # skip download if remote file is smaller than 300b
-                    if total_bytes < 300:
-                        logging.warning(
-                            "File is smaller than 300 bytes (empty video clip) - skipping download"
-                        )
-                        client.files_skipped += 1
-                        return
-
-                    with open(filename, "wb") as fp:
-                        for chunk in response.iter_content(None):
-                            cur_bytes += len(chunk)
-                            fp.write(chunk)
-                            # TODO
-                            # done = int(50 * cur_bytes / total_bytes)
-                            # sys.stdout.write("\r[%s%s] %sps" % ('=' * done, ' ' * (50-done),
-                            #   format_bytes(cur_bytes//(time.monotonic() - start))))
-                            # print('')
-
-                elapsed = time.monotonic() - start
-                logging.info(
-                    f"Download successful after {int(elapsed)}s ({format_bytes(cur_bytes)}, "
-                    f"{format_bytes(int(cur_bytes // elapsed))}ps)"
+                written = write_response(client, response, part_filename, offset)
+                if written is None:
+                    if on_empty is not None:
+                        on_empty()
+                    return False  # empty video clip, nothing to keep
+
+                offset, cur_bytes, sha256 = written
+                os.replace(part_filename, filename)
+
+                record_success(
+                    client,
+                    filename,
+                    segment,
+                    offset,
+                    cur_bytes,
+                    sha256,
+                    time.monotonic() - start,
+                    event_ids,
                 )
-                client.files_downloaded += 1
-                client.bytes_downloaded += cur_bytes
+                return True
 
         except requests.exceptions.RequestException as request_exception:
-            # clean up
-            if os.path.exists(filename):
-                os.remove(filename)
+            if isinstance(request_exception, (requests.Timeout, requests.ConnectionError)):
+                client.export_limiter.record_failure(start)
+                healthy = False
+            # keep the partial file, the next attempt continues where this one stopped
             logging.exception(f"Download failed: {request_exception}")
             exit_code = 5
+            server_error = False
         except DownloadFailed:
             # clean up
-            if os.path.exists(filename):
-                os.remove(filename)
+            remove_part_file(part_filename)
             logging.exception(
                 f"Download failed with status {response.status_code} {response.reason}"
             )
             exit_code = 4
-        else:
-            return
+            server_error = False
+        finally:
+            prefetched = None
+            client.export_limiter.release()
+            client.circuit_breaker.record(healthy)
 
-        logging.warning(f"Retrying in {retry_delay} second(s)...")
+        attempts += 1
+        retry_delay = client.retry_policy.next_delay(attempts)
+        if retry_delay is None:
+            break
+        logging.warning(f"Retrying in {retry_delay:.1f} second(s)...")
         time.sleep(retry_delay)
 
+    # clean up
+    remove_part_file(part_filename)
+
+    # let the caller retry the time range in shorter segments
+    if raise_on_failure:
+        raise SegmentFailed(f"Download failed {attempts} times")
+
+    if server_error:
+        # like any other error response, the file is counted as failed and skipped
+        client.increment("files_failed")
+        return False
+
+    give_up_download(client, exit_code)
+    return False
+
+
+# wait while the console is unhealthy, and until it accepts another simultaneous download - a
+# prefetched request already holds a slot, which is released after the attempt
+def wait_for_slot(client: Any, prefetched: Optional["Future[requests.Response]"]) -> None:
+    if prefetched is None:
+        client.circuit_breaker.wait()
+        client.export_limiter.acquire()
+
+
+# update the statistics and the catalog after a file has been downloaded completely
+def record_success(
+    client: Any,
+    filename: str,
+    segment: Optional[Tuple[str, int, int]],
+    offset: int,
+    cur_bytes: int,
+    sha256: Optional[str],
+    elapsed: float,
+    event_ids: Sequence[str] = (),
+) -> None:
+    if client.catalog is not None and segment is not None:
+        camera_id, segment_start, segment_end = segment
+        client.catalog.add(
+            filename,
+            camera_id,
+            segment_start,
+            segment_end,
+            offset + cur_bytes,
+            sha256,
+            elapsed,
+            event_ids,
+        )
+    logging.info(
+        f"Download successful after {int(elapsed)}s ({format_bytes(cur_bytes)}, "
+        f"{format_bytes(int(cur_bytes // elapsed))}ps)"
+    )
+    client.increment("files_downloaded")
+    client.increment("bytes_downloaded", offset + cur_bytes)
+
+
+# either exit, or continue with the next file if argument --ignore-failed-downloads is present
+def give_up_download(client: Any, exit_code: int) -> None:
     if not client.ignore_failed_downloads:
         logging.info(
             "To skip failed downloads and continue with next file, add argument"
@@ -168,4 +217,206 @@ def download_file(client: Any, query: str, filename: str) -> None:
         logging.info(
             "Argument '--ignore-failed-downloads' is present, continue downloading files..."
         )
-        client.files_skipped += 1
+        client.increment("files_skipped")
+
+
+# report the health of the console to the (adaptive) concurrency limiter,
+# using the time until the response headers arrived as time-to-first-byte
+def record_response_time(client: Any, response: requests.Response, start: float) -> None:
+    if response.status_code >= 500:
+        client.export_limiter.record_failure(start)
+    elif response.status_code in (200, 206):
+        client.export_limiter.record_success(response.elapsed.total_seconds(), start)
+
+
+def remove_part_file(part_filename: str) -> None:
+    if os.path.exists(part_filename):
+        os.remove(part_filename)
+
+
+# whether the file is in the catalog or (for files that are not) exists on disk - the catalog is
+# asked first, so that the file system (often a network mount) is only checked for new files
+def is_archived(client: Any, filename: str) -> bool:
+    if client.catalog is not None and filename in client.catalog:
+        return True
+    return os.path.exists(filename)
+
+
+# send the request for a file ahead of time, so that the console prepares the export while
+# the previous file is still downloading - the returned future holds a slot of the export limiter
+# until it is passed to download_file (or discard_prefetched)
+def prefetch_file(
+    executor: Executor, client: Any, query: str, filename: str
+) -> Optional["Future[requests.Response]"]:
+    if bool(client.skip_existing_files) and is_archived(client, filename):
+        return None  # will be skipped anyway
+
+    # no new requests while the console is unhealthy
+    if client.circuit_breaker.is_open():
+        return None
+
+    # never wait for a slot here - the slots may all be held by prefetched requests that are
+    # only released once this thread gets to download them
+    if not client.export_limiter.try_acquire():
+        return None
+
+    uri = f"{client.session.authority}{client.session.base_path}{query}"
+    return executor.submit(request_file, client, uri, {})
+
+
+# close a prefetched response that is not going to be used and give back its limiter slot
+def discard_prefetched(client: Any, prefetched: Optional["Future[requests.Response]"]) -> None:
+    if prefetched is None:
+        return
+    try:
+        prefetched.result().close()
+    except Exception:
+        pass
+    finally:
+        client.export_limiter.release()
+
+
+# GET request for the file, retried once with a fresh api token if the current one was rejected
+def request_file(client: Any, uri: str, headers: Dict[str, str]) -> requests.Response:
+    response = client.session.get(
+        uri, headers=headers, timeout=client.download_timeout, stream=True
+    )
+
+    if response.status_code == 401:
+        # invalid current api token - we special case this
+        # as we dont want to retry on consecutive auth failures
+        # TODO: refactor this
+        response.close()  # release the connection back to the pool
+        response = client.session.get(
+            uri,
+            force_token=True,
+            headers=headers,
+            timeout=client.download_timeout,
+            stream=True,
+        )
+
+    return response
+
+
+# a server error is retried, unless the caller requests the time range in shorter segments
+def handle_server_error(
+    response: requests.Response, part_filename: str, raise_on_failure: bool
+) -> None:
+    response.close()
+    if raise_on_failure:
+        remove_part_file(part_filename)
+        raise SegmentFailed(f"Export failed with status {response.status_code}")
+    logging.warning(f"Download failed with status {response.status_code} {response.reason}")
+
+
+def handle_error_response(client: Any, response: requests.Response, part_filename: str) -> None:
+    try:
+        data = json.loads(response.content)
+        error_message = data.get("error") or data or "(no information available)"
+    except Exception:
+        data = None
+        error_message = "(no information available)"
+
+    # TODO
+    logging.exception(
+        f"Download failed with status {response.status_code} {response.reason}:\n"
+        f"{error_message}"
+    )
+    client.increment("files_failed")
+    # if response.status_code == 401:
+    #     cls = Errors.AuthorizationFailed
+    # else:
+    #     cls = Errors.DownloadFailed
+    # raise cls(
+    #     f"Download failed with status {response.status_code} {response.reason}:\n{error_message}"
+    # )
+
+
+# write the response body to the partial file, appending to it if the response continues it;
+# returns the offset the body was written at, the number of bytes written and the SHA-256 hash
+# of the whole file (if it is recorded in a catalog), or None if the file was skipped because it
+# is an empty video clip
+def write_response(
+    client: Any, response: requests.Response, part_filename: str, offset: int
+) -> Optional[Tuple[int, int, Optional[str]]]:
+    if response.status_code == 206:
+        logging.info(f"Resuming download at {format_bytes(offset)}")
+        mode = "ab"
+    else:
+        if offset:
+            logging.info("Server does not support resuming - restarting download")
+        offset = 0
+        mode = "wb"
+
+    # without a content-length header, the size of the file is only known once it is complete
+    total_bytes = int(response.headers.get("content-length") or 0)
+    cur_bytes = 0
+
+    # skip download if remote file is smaller than 300b
+    if total_bytes and offset + total_bytes < 300:
+        logging.warning("File is smaller than 300 bytes (empty video clip) - skipping download")
+        client.increment("files_skipped")
+        response.close()
+        if os.path.exists(part_filename):
+            os.remove(part_filename)
+        return None
+
+    # the hash is computed while the file is written instead of reading it back afterwards
+    hasher = hashlib.sha256() if client.catalog is not None else None
+    if hasher is not None and offset:
+        hash_file(hasher, part_filename, client.download_chunk_size)
+
+    # stream the body to disk in chunks of bounded size, never holding the whole file in memory
+    with open(part_filename, mode) as fp:
+        # the raw body can only be read into the buffers if it is not content-encoded
+        if client.write_buffers and not response.headers.get("content-encoding"):
+            cur_bytes = write_behind(
+                response,
+                fp,
+                buffer_size=client.download_chunk_size,
+                buffer_count=client.write_buffers,
+                fsync_interval=client.fsync_interval,
+                preallocate_bytes=total_bytes if client.preallocate_files else 0,
+                hasher=hasher,
+            )
+        else:
+            for chunk in response.iter_content(client.download_chunk_size):
+                cur_bytes += len(chunk)
+                fp.write(chunk)
+                if hasher is not None:
+                    hasher.update(chunk)
+                # TODO
+                # done = int(50 * cur_bytes / total_bytes)
+                # sys.stdout.write("\r[%s%s] %sps" % ('=' * done, ' ' * (50-done),
+                #   format_bytes(cur_bytes//(time.monotonic() - start))))
+                # print('')
+
+    if cur_bytes < total_bytes:
+        raise requests.exceptions.ChunkedEncodingError(
+            f"Connection closed after {cur_bytes} of {total_bytes} bytes"
+        )
+
+    # without a content-length header, an empty video clip is only recognized once it is read
+    if not total_bytes and offset + cur_bytes < 300:
+        logging.warning("File is smaller than 300 bytes (empty video clip) - skipping download")
+        client.increment("files_skipped")
+        os.remove(part_filename)
+        return None
+
+    return offset, cur_bytes, hasher.hexdigest() if hasher is not None else None
+
+
+# hash the part of a file that was downloaded by a previous attempt
+def hash_file(hasher: Any, filename: str, chunk_size: int) -> None:
+    with open(filename, "rb") as fp:
+        for chunk in iter(lambda: fp.read(chunk_size), b""):
+            hasher.update(chunk)
+
+
+# check that a 206 Partial Content response continues exactly at the given offset
+def is_range_continuation(response: requests.Response, offset: int) -> bool:
+    # Content-Range: bytes <first>-<last>/<total>
+    content_range = response.headers.get("content-range", "")
+    unit, _, byte_range = content_range.partition(" ")
+    first = byte_range.split("-", 1)[0]
+    return unit == "bytes" and first.isdigit() and int(first) == offset
@@ -1,13 +1,32 @@
 import logging
 import time
 
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from datetime import timedelta
 from datetime import timezone
+from functools import partial
 from os import path
 from typing import Any
+from typing import Callable
+from typing import Deque
+from typing import Iterable
+from typing import Optional
+from typing import Tuple
+
+import requests
 
 from protect_archiver.dataclasses import Camera
+from protect_archiver.downloader.download_file import discard_prefetched
 from protect_archiver.downloader.download_file import download_file
+from protect_archiver.downloader.download_file import prefetch_file
+from protect_archiver.downloader.download_footage_split import download_footage_split
+from protect_archiver.errors import SegmentFailed
+from protect_archiver.timeline import RecordingTimeline
+from protect_archiver.timeline import get_recording_timeline
+from protect_archiver.timeline import timestamp_ms
 from protect_archiver.utils import build_download_dir
 from protect_archiver.utils import calculate_intervals
 from protect_archiver.utils import make_camera_name_fs_safe
@@ -20,59 +39,278 @@ def download_footage(
     camera: Camera,
     disable_alignment: bool = False,
     disable_splitting: bool = False,
+    timeline: Optional[RecordingTimeline] = None,
 ) -> None:
     # make camera name safe for use in file name
     camera_name_fs_safe = make_camera_name_fs_safe(camera)
 
     logging.info(f"Downloading footage for camera '{camera.name}' ({camera.id})")
 
+    # the time ranges the console has footage for, segments outside of them are not requested
+    if timeline is None:
+        timeline = get_recording_timeline(client, camera, start, end)
+
+    # let the planner choose the segment lengths and split segments that fail
+    if client.segment_planner is not None and not disable_splitting:
+        download_footage_adaptive(
+            client, start, end, camera, camera_name_fs_safe, disable_alignment, timeline
+        )
+        return
+
     # split requested time frame into chunks of 1 hour or less and download them one by one
-    for interval_start, interval_end in calculate_intervals(
-        start,
-        end,
-        disable_alignment,
-        disable_splitting,
-    ):
-        # wait n seconds before starting next download (if parameter is set)
-        if client.download_wait != 0 and client.files_downloaded == 0:
-            logging.debug(
-                "Command line argument '--wait-between-downloads' is set to"
-                f" {client.download_wait} second(s)... \n"
+    intervals = timeline.restrict(
+        calculate_intervals(start, end, disable_alignment, disable_splitting)
+    )
+
+    # the parts of split exports are requested at the same time already
+    if client.prefetch_depth and client.split_exports <= 1:
+        download_footage_prefetched(client, intervals, camera, camera_name_fs_safe)
+        return
+
+    for interval_start, interval_end in intervals:
+        download_footage_segment(client, interval_start, interval_end, camera, camera_name_fs_safe)
+
+
+# download the segments one by one, but request the next ones while the current one is still
+# streaming - the console needs a while to prepare each export, which is otherwise spent idle
+def download_footage_prefetched(
+    client: Any,
+    intervals: Iterable[Tuple[datetime, datetime]],
+    camera: Camera,
+    camera_name_fs_safe: str,
+) -> None:
+    pending: Deque[
+        Tuple[
+            str,
+            str,
+            Optional["Future[requests.Response]"],
+            Optional[Callable[[], None]],
+            Tuple[str, int, int],
+        ]
+    ] = deque()
+
+    with ThreadPoolExecutor(
+        max_workers=client.prefetch_depth, thread_name_prefix="prefetch"
+    ) as executor:
+        try:
+            for interval_start, interval_end in intervals:
+                if skip_empty_segment(client, camera, interval_start, interval_end):
+                    continue
+                query, filename = prepare_footage_segment(
+                    client, interval_start, interval_end, camera, camera_name_fs_safe
+                )
+                pending.append(
+                    (
+                        query,
+                        filename,
+                        prefetch_file(executor, client, query, filename),
+                        empty_segment_callback(client, camera, interval_start, interval_end),
+                        segment_key(camera, interval_start, interval_end),
+                    )
+                )
+
+                if len(pending) > client.prefetch_depth:
+                    query, filename, prefetched, on_empty, segment = pending.popleft()
+                    download_file(
+                        client, query, filename, prefetched, on_empty=on_empty, segment=segment
+                    )
+
+            while pending:
+                query, filename, prefetched, on_empty, segment = pending.popleft()
+                download_file(
+                    client, query, filename, prefetched, on_empty=on_empty, segment=segment
+                )
+        finally:
+            # a failed download leaves requests behind that are not going to be read
+            while pending:
+                discard_prefetched(client, pending.popleft()[2])
+
+
+# download segments of the length learned by the client's segment planner - a segment that
+# fails is split into shorter ones, which are then downloaded instead
+def download_footage_adaptive(
+    client: Any,
+    start: datetime,
+    end: datetime,
+    camera: Camera,
+    camera_name_fs_safe: str,
+    disable_alignment: bool = False,
+    timeline: Optional[RecordingTimeline] = None,
+) -> None:
+    planner = client.segment_planner
+
+    # segment boundaries are aligned to multiples of the segment length since midnight
+    anchor = (
+        start if disable_alignment else start.replace(hour=0, minute=0, second=0, microsecond=0)
+    )
+
+    segment_start = start
+    while segment_start < end:
+        length = planner.length(camera.id)
+        offset = int((segment_start - anchor).total_seconds() * 1000)
+        segment_end = min(anchor + timedelta(milliseconds=(offset // length + 1) * length), end)
+        duration = int((segment_end - segment_start).total_seconds() * 1000)
+
+        if timeline is not None and not timeline.overlaps(
+            timestamp_ms(segment_start), timestamp_ms(segment_end)
+        ):
+            segment_start = segment_end
+            continue  # no footage to download
+
+        # a failure of the shortest possible segment is handled like any other failed download
+        splittable = planner.can_split(camera.id, duration)
+
+        started_at = time.monotonic()
+        try:
+            downloaded = download_footage_segment(
+                client,
+                segment_start,
+                segment_end - timedelta(milliseconds=1),
+                camera,
+                camera_name_fs_safe,
+                raise_on_failure=splittable,
             )
-            time.sleep(int(client.download_wait))
+        except SegmentFailed:
+            planner.record_failure(camera.id, duration)
+            logging.warning(
+                f"Retrying time range {segment_start} - {segment_end} in shorter segments"
+            )
+            continue  # same start, shorter length
+        # skipped files say nothing about how fast the console exports the segment
+        if downloaded:
+            planner.record_success(camera.id, duration, time.monotonic() - started_at)
 
-        # start and end time of the video segment to be downloaded
-        js_timestamp_range_start = int(interval_start.timestamp() * 1e3)
-        js_timestamp_range_end = int(interval_end.timestamp() * 1e3)
+        segment_start = segment_end
 
-        # support selection between local time zone and UTC for file names
-        interval_start_tz = (
-            interval_start.astimezone(timezone.utc) if client.use_utc_filenames else interval_start
-        )
 
-        download_dir = build_download_dir(
-            use_subfolders=client.use_subfolders,
-            destination_path=client.destination_path,
-            interval_start_tz=interval_start_tz,
-            camera_name_fs_safe=camera_name_fs_safe,
+def download_footage_segment(
+    client: Any,
+    interval_start: datetime,
+    interval_end: datetime,
+    camera: Camera,
+    camera_name_fs_safe: Optional[str] = None,
+    raise_on_failure: bool = False,
+) -> bool:
+    if skip_empty_segment(client, camera, interval_start, interval_end):
+        return False
+    on_empty = empty_segment_callback(client, camera, interval_start, interval_end)
+
+    query, filename = prepare_footage_segment(
+        client, interval_start, interval_end, camera, camera_name_fs_safe
+    )
+
+    if client.split_exports > 1:
+        return download_footage_split(
+            client,
+            interval_start,
+            interval_end,
+            camera,
+            query,
+            filename,
+            client.split_exports,
+            raise_on_failure=raise_on_failure,
+            on_empty=on_empty,
         )
 
-        # file name for download
-        filename_timestamp = interval_start_tz.strftime("%Y-%m-%d - %H.%M.%S%z")
-        filename = f"{download_dir}/{camera_name_fs_safe} - {filename_timestamp}.mp4"
+    # download the file
+    return download_file(
+        client,
+        query,
+        filename,
+        raise_on_failure=raise_on_failure,
+        on_empty=on_empty,
+        segment=segment_key(camera, interval_start, interval_end),
+    )
+
+
+# skip segments that are known to have no footage, without asking the console to export them
+def skip_empty_segment(
+    client: Any, camera: Camera, interval_start: datetime, interval_end: datetime
+) -> bool:
+    if client.empty_segments is None:
+        return False
+    if segment_key(camera, interval_start, interval_end) not in client.empty_segments:
+        return False
+
+    logging.info(
+        f"Time range {interval_start} - {interval_end} is known to have no footage"
+        " - skipping download"
+    )
+    client.increment("files_skipped")
+    client.increment("requests_saved")
+    return True
+
+
+# remember the segment once the console exported it without any footage
+def empty_segment_callback(
+    client: Any, camera: Camera, interval_start: datetime, interval_end: datetime
+) -> Optional[Callable[[], None]]:
+    if client.empty_segments is None:
+        return None
+    return partial(client.empty_segments.add, segment_key(camera, interval_start, interval_end))
 
-        logging.info(
-            f"Downloading video for time range {interval_start} - {interval_end} to {filename}"
+
+def segment_key(
+    camera: Camera, interval_start: datetime, interval_end: datetime
+) -> Tuple[str, int, int]:
+    return (
+        camera.id,
+        int(interval_start.timestamp() * 1e3),
+        int(interval_end.timestamp() * 1e3),
+    )
+
+
+# target file name and export query of a segment
+def prepare_footage_segment(
+    client: Any,
+    interval_start: datetime,
+    interval_end: datetime,
+    camera: Camera,
+    camera_name_fs_safe: Optional[str] = None,
+) -> Tuple[str, str]:
+    # make camera name safe for use in file name
+    if camera_name_fs_safe is None:
+        camera_name_fs_safe = make_camera_name_fs_safe(camera)
+
+    # wait n seconds before starting next download (if parameter is set)
+    if client.download_wait != 0 and client.files_downloaded == 0:
+        logging.debug(
+            "Command line argument '--wait-between-downloads' is set to"
+            f" {client.download_wait} second(s)... \n"
         )
+        time.sleep(int(client.download_wait))
+
+    # start and end time of the video segment to be downloaded
+    js_timestamp_range_start = int(interval_start.timestamp() * 1e3)
+    js_timestamp_range_end = int(interval_end.timestamp() * 1e3)
+
+    # support selection between local time zone and UTC for file names
+    interval_start_tz = (
+        interval_start.astimezone(timezone.utc) if client.use_utc_filenames else interval_start
+    )
+
+    download_dir = build_download_dir(
+        use_subfolders=client.use_subfolders,
+        destination_path=client.destination_path,
+        interval_start_tz=interval_start_tz,
+        camera_name_fs_safe=camera_name_fs_safe,
+    )
+
+    # file name for download
+    filename_timestamp = interval_start_tz.strftime("%Y-%m-%d - %H.%M.%S%z")
+    filename = f"{download_dir}/{camera_name_fs_safe} - {filename_timestamp}.mp4"
+
+    logging.info(
+        f"Downloading video for time range {interval_start} - {interval_end} to {filename}"
+    )
 
-        # create file without content if argument --touch-files is present
-        # XXX(dcramer): would be nice to document why you'd ever want this
-        if bool(client.touch_files) and not path.exists(filename):
-            logging.debug(f"Argument '--touch-files' is present. Creating file at {filename}")
-            open(filename, "a").close()
+    # create file without content if argument --touch-files is present
+    # XXX(dcramer): would be nice to document why you'd ever want this
+    if bool(client.touch_files) and not path.exists(filename):
+        logging.debug(f"Argument '--touch-files' is present. Creating file at {filename}")
+        open(filename, "a").close()
 
-        # build video export query
-        video_export_query = f"/video/export?camera={camera.id}&start={js_timestamp_range_start}&end={js_timestamp_range_end}"
+    # build video export query
+    video_export_query = f"/video/export?camera={camera.id}&start={js_timestamp_range_start}&end={js_timestamp_range_end}"
 
-        # download the file
-        download_file(client, video_export_query, filename)
+    return video_export_query, filename
@@ -0,0 +1,74 @@
+import logging
+
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from datetime import datetime
+from typing import Any
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+from protect_archiver.config import Config
+from protect_archiver.dataclasses import Camera
+from protect_archiver.downloader.download_footage import download_footage_segment
+from protect_archiver.timeline import get_recording_timeline
+from protect_archiver.utils import calculate_intervals
+from protect_archiver.utils import interleave
+from protect_archiver.utils import make_camera_name_fs_safe
+
+
+def download_footage_concurrent(
+    client: Any,
+    start: datetime,
+    end: datetime,
+    camera_list: List[Camera],
+    disable_alignment: bool = False,
+    disable_splitting: bool = False,
+    concurrency: int = Config.CONCURRENCY,
+) -> None:
+    def camera_segments(camera: Camera) -> Iterator[Tuple[datetime, datetime, Camera, str]]:
+        camera_name_fs_safe = make_camera_name_fs_safe(camera)
+        timeline = get_recording_timeline(client, camera, start, end)
+        for interval_start, interval_end in timeline.restrict(
+            calculate_intervals(start, end, disable_alignment, disable_splitting)
+        ):
+            yield interval_start, interval_end, camera, camera_name_fs_safe
+
+    logging.info(
+        f"Downloading footage for {len(camera_list)} camera(s) using {concurrency} workers"
+    )
+
+    # (camera, interval) jobs, interleaved round-robin so that all cameras progress evenly
+    jobs = interleave(camera_segments(camera) for camera in camera_list)
+
+    error: Optional[BaseException] = None
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="download") as executor:
+        pending: Set[Future] = set()
+        for job in jobs:
+            pending.add(executor.submit(download_footage_segment, client, *job))
+
+            # only queue as many jobs as there are workers, so that jobs are scheduled lazily
+            # and a fatal error stops the download without working off a long backlog first
+            if len(pending) >= concurrency:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                error = error or _first_exception(done)
+                if error is not None:
+                    break
+
+        done, _ = wait(pending)
+        error = error or _first_exception(done)
+
+    if error is not None:
+        raise error
+
+
+def _first_exception(futures: Set[Future]) -> Optional[BaseException]:
+    for future in futures:
+        exception = future.exception()
+        if exception is not None:
+            return exception
+    return None
@@ -0,0 +1,123 @@
+import hashlib
+import logging
+import os
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Optional
+
+from protect_archiver.dataclasses import Camera
+from protect_archiver.downloader.download_file import download_file
+from protect_archiver.downloader.download_file import hash_file
+from protect_archiver.downloader.download_file import is_archived
+from protect_archiver.errors import Mp4Error
+from protect_archiver.mp4 import concatenate
+
+
+# download one video segment as several shorter exports at the same time and join them into a
+# single file - a single export is limited by how fast the console produces it, so this gets
+# one segment (e.g. the hour of an incident) faster if the connection has bandwidth to spare
+def download_footage_split(
+    client: Any,
+    interval_start: datetime,
+    interval_end: datetime,
+    camera: Camera,
+    video_export_query: str,
+    filename: str,
+    parts: int,
+    raise_on_failure: bool = False,
+    on_empty: Optional[Callable[[], None]] = None,
+) -> bool:
+    js_timestamp_range_start = int(interval_start.timestamp() * 1e3)
+    js_timestamp_range_end = int(interval_end.timestamp() * 1e3)
+    segment = (camera.id, js_timestamp_range_start, js_timestamp_range_end)
+
+    if bool(client.skip_existing_files) and is_archived(client, filename):
+        # let download_file log and count the skipped file
+        return download_file(client, video_export_query, filename)
+
+    # split the range (with an inclusive end) into parts of equal length
+    duration = js_timestamp_range_end + 1 - js_timestamp_range_start
+    bounds = [js_timestamp_range_start + duration * i // parts for i in range(parts + 1)]
+    part_filenames = [f"{filename}.{i + 1}-of-{parts}" for i in range(parts)]
+
+    logging.info(f"Downloading video in {parts} parts at the same time")
+    started_at = time.monotonic()
+    part_clients = [PartClient(client) for _ in part_filenames]
+    joined = False
+    try:
+        with ThreadPoolExecutor(max_workers=parts, thread_name_prefix="split") as executor:
+            futures = [
+                executor.submit(
+                    download_file,
+                    part_clients[i],
+                    f"/video/export?camera={camera.id}&start={bounds[i]}&end={bounds[i + 1] - 1}",
+                    part_filename,
+                    raise_on_failure=raise_on_failure,
+                )
+                for i, part_filename in enumerate(part_filenames)
+            ]
+            downloaded = [future.result() for future in futures]
+
+        if all(downloaded):
+            try:
+                concatenate(part_filenames, f"{filename}.part")
+            except Mp4Error as error:
+                logging.warning(f"Joining the parts failed ({error})")
+            else:
+                os.replace(f"{filename}.part", filename)
+                joined = True
+    finally:
+        # every part was counted as a file of its own - and if the parts are not joined, the
+        # segment is downloaded again, which counts its bytes, skips and failures once more
+        for part_client in part_clients:
+            for counter, amount in part_client.counts.items():
+                if counter == "files_downloaded" or not joined:
+                    client.increment(counter, -amount)
+        for part_filename in part_filenames + [f"{filename}.part"]:
+            if os.path.exists(part_filename):
+                os.remove(part_filename)
+
+    if joined:
+        client.increment("files_downloaded")
+        if client.catalog is not None:
+            hasher = hashlib.sha256()
+            hash_file(hasher, filename, client.download_chunk_size)
+            client.catalog.add(
+                filename,
+                *segment,
+                os.path.getsize(filename),
+                hasher.hexdigest(),
+                time.monotonic() - started_at,
+            )
+        return True
+
+    # a part without footage or a file that cannot be joined - fall back to a single export
+    logging.info("Downloading video as a single file instead")
+    return download_file(
+        client,
+        video_export_query,
+        filename,
+        raise_on_failure=raise_on_failure,
+        on_empty=on_empty,
+        segment=segment,
+    )
+
+
+# the client as seen by the download of one part - keeps track of what is counted for the part,
+# so that it can be taken back
+class PartClient:
+    def __init__(self, client: Any) -> None:
+        self.client = client
+        self.counts: Dict[str, int] = {}
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
+
+    def increment(self, counter: str, amount: int = 1) -> None:
+        self.counts[counter] = self.counts.get(counter, 0) + amount
+        self.client.increment(counter, amount)
@@ -5,6 +5,7 @@ from typing import Any
 
 from protect_archiver.dataclasses import Camera
 from protect_archiver.dataclasses import MotionEvent
+from protect_archiver.downloader.cut_motion_event import cut_motion_event
 from protect_archiver.downloader.download_file import download_file
 from protect_archiver.utils import build_download_dir
 from protect_archiver.utils import make_camera_name_fs_safe
@@ -37,9 +38,17 @@ def download_motion_event(
     # file name for download
     filename_timestamp = interval_start_tz.strftime("%Y-%m-%d - %H.%M.%S%z")
     filename = f"{download_dir}/{camera_name_fs_safe} - {filename_timestamp}.mp4"
+    # an event that starts on the hour gets the name of the hourly footage archived with it
+    if client.catalog is not None and client.catalog.is_footage(filename):
+        filename = f"{download_dir}/{camera_name_fs_safe} - {filename_timestamp} - event.mp4"
 
+    merged = (
+        f" (merged from {len(motion_event.event_ids)} events)"
+        if len(motion_event.event_ids) > 1
+        else ""
+    )
     logging.info(
-        f"Downloading motion event with ID '{motion_event.id[-4:]}' starting at"
+        f"Downloading motion event with ID '{motion_event.id[-4:]}'{merged} starting at"
         f" {motion_event.start.ctime()} ({int((motion_event.end - motion_event.start).total_seconds())}s"
         f" long) for camera '{camera.name}' ({camera.id}) to {filename}"
     )
@@ -49,8 +58,23 @@ def download_motion_event(
         f"/video/export?camera={camera.id}&start={js_timestamp_start}&end={js_timestamp_end}"
     )
 
-    # download the file
-    download_file(client, video_export_query, filename)
+    event_ids = motion_event.event_ids or (motion_event.id,)
+
+    # cut the clip out of the archived footage if argument --from-archive is present, and
+    # download it only if that is not possible
+    if not (
+        client.events_from_archive
+        and cut_motion_event(
+            client, camera, filename, js_timestamp_start, js_timestamp_end, event_ids
+        )
+    ):
+        download_file(
+            client,
+            video_export_query,
+            filename,
+            segment=(camera.id, js_timestamp_start, js_timestamp_end),
+            event_ids=event_ids,
+        )
 
     # download motion heatmap if enabled and event has heatmap available
     if download_motion_heatmaps and motion_event.heatmap_id:
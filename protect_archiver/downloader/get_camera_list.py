@@ -2,38 +2,81 @@
 import logging
 
 from datetime import datetime
+from datetime import timedelta
 from typing import Any
+from typing import Iterable
+from typing import Iterator
 from typing import List
+from typing import Optional
 
-import requests
-
+from protect_archiver.config import Config
+from protect_archiver.console_cache import ConsoleCache
 from protect_archiver.dataclasses import Camera
+from protect_archiver.json_stream import iter_json_array
 
 
-def get_camera_list(session: Any) -> List[Camera]:
-    cameras_uri = f"{session.authority}{session.base_path}/cameras"
+def get_camera_list(
+    session: Any, cache: Optional[ConsoleCache] = None, refresh: bool = False
+) -> List[Camera]:
+    # skip the request if the camera list of a recent run is cached
+    cached = cache.load() if cache is not None and not refresh else None
+    if cached is not None:
+        logging.info(f"Using camera list cached {int(cached['age'])}s ago")
+        return parse_camera_list(cached["cameras"], age=cached["age"])
 
-    response = (
-        requests.get(
-            cameras_uri,
-            cookies={"TOKEN": session.get_api_token()},
-            verify=session.verify_ssl,
-        )
-        if session.__class__.__name__ == "UniFiOSClient"
-        else requests.get(
-            cameras_uri,
-            headers={"Authorization": f"Bearer {session.get_api_token()}"},
-            verify=session.verify_ssl,
-        )
+    cameras: Optional[Iterable[Any]] = (
+        fetch_bootstrap_cameras(session, cache) if cache is not None else None
     )
+    if not cameras:
+        cameras = fetch_cameras(session)
+    if cameras is None:
+        return []
+    return parse_camera_list(cameras)
+
+
+# the cameras, parsed one by one while the response arrives
+def fetch_cameras(session: Any) -> Optional[Iterator[Any]]:
+    cameras_uri = f"{session.authority}{session.base_path}/cameras"
+
+    response = session.get(cameras_uri, stream=True)
 
     if response.status_code != 200:
+        response.close()
         print(f"Error while loading camera list: {response.status_code}")
-        return []
+        return None
 
     logging.info(f"Successfully retrieved data from {cameras_uri}")
-    cameras = response.json()
+    return iter_json_array(response.iter_content(Config.JSON_CHUNK_SIZE))
 
+
+# the cameras and the console metadata in a single request, stored in the cache
+def fetch_bootstrap_cameras(session: Any, cache: ConsoleCache) -> Optional[List[Any]]:
+    bootstrap_uri = f"{session.authority}{session.base_path}/bootstrap"
+
+    response = session.get(bootstrap_uri)
+
+    if response.status_code != 200:
+        logging.debug(f"Error while loading {bootstrap_uri}: {response.status_code}")
+        return None
+
+    try:
+        bootstrap = response.json()
+    except ValueError:
+        bootstrap = None
+    # consoles that leave the cameras out of the bootstrap data are asked for them separately
+    cameras = bootstrap.get("cameras") if isinstance(bootstrap, dict) else None
+    if not isinstance(cameras, list):
+        logging.debug(f"No camera list in the data of {bootstrap_uri}")
+        return None
+
+    logging.info(f"Successfully retrieved data from {bootstrap_uri}")
+    cache.store(cameras, bootstrap.get("nvr"))
+    return cameras
+
+
+# `age` is the number of seconds since the data was fetched - a camera may have recorded
+# since then, so its last recording is moved forward by that much
+def parse_camera_list(cameras: Iterable[Any], age: float = 0) -> List[Camera]:
     camera_list = []
     for camera in cameras:
         camera_data = Camera(id=camera["id"], name=camera["name"], recording_start=datetime.min)
@@ -41,6 +84,16 @@ def get_camera_list(session: Any) -> List[Camera]:
             camera_data.recording_start = datetime.utcfromtimestamp(
                 camera["stats"]["video"]["recordingStart"] / 1000
             )
+        if camera["stats"]["video"].get("recordingEnd"):
+            camera_data.recording_end = datetime.utcfromtimestamp(
+                camera["stats"]["video"]["recordingEnd"] / 1000
+            ) + timedelta(seconds=age)
+        recording_settings = camera.get("recordingSettings") or {}
+        camera_data.recording_mode = recording_settings.get("mode")
+        camera_data.recording_padding = (
+            recording_settings.get("prePaddingSecs") or 0,
+            recording_settings.get("postPaddingSecs") or 0,
+        )
         camera_list.append(camera_data)
 
     logging.info(
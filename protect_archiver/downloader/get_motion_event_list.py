@@ -1,20 +1,132 @@
 # get motion events list
+import heapq
 import logging
 
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Any
 from typing import Counter
+from typing import Deque
+from typing import Iterator
 from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
 
-import requests
-
+from protect_archiver.config import Config
 from protect_archiver.dataclasses import Camera
 from protect_archiver.dataclasses import MotionEvent
+from protect_archiver.json_stream import iter_json_array
 
 
+# the events are requested in windows of `window` seconds (and with `per_camera`, separately for
+# every camera), up to `workers` requests at a time - events are yielded ordered by their start
+# as soon as the requests of a window have completed, while the next windows are being fetched
 def get_motion_event_list(
-    session: Any, start: datetime, end: datetime, camera_list: List[Camera]
+    session: Any,
+    start: datetime,
+    end: datetime,
+    camera_list: List[Camera],
+    window: int = Config.EVENT_LIST_WINDOW,
+    per_camera: bool = Config.EVENT_LIST_PER_CAMERA,
+    workers: int = Config.EVENT_LIST_WORKERS,
+) -> Iterator[MotionEvent]:
+    camera_ids: List[Optional[str]] = (
+        [camera.id for camera in camera_list] if per_camera and camera_list else [None]
+    )
+    windows = event_list_windows(
+        int(start.timestamp()) * 1000, int(end.timestamp()) * 1000, window * 1000
+    )
+
+    event_count_by_camera: Counter[str] = Counter()
+    if len(windows) * len(camera_ids) == 1:
+        # a single request, its events are passed on one by one as they arrive
+        for motion_event in iter_motion_events(session, *windows[0], camera_ids[0]):
+            event_count_by_camera[motion_event.camera_id] += 1
+            yield motion_event
+        log_event_counts(event_count_by_camera, start, end, camera_list)
+        return
+
+    # events overlapping the border of two windows are returned for both of them
+    previous_ids: Set[str] = set()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="events") as executor:
+        pending: Deque[List[Future]] = deque()
+        in_flight = 0
+        for index, (window_start, window_end) in enumerate(windows):
+            pending.append(
+                [
+                    executor.submit(
+                        fetch_motion_events, session, window_start, window_end, camera_id
+                    )
+                    for camera_id in camera_ids
+                ]
+            )
+            in_flight += len(camera_ids)
+
+            # keep the workers busy with the next windows, but fetch no further ahead
+            while pending and (in_flight >= workers or index == len(windows) - 1):
+                futures = pending.popleft()
+                in_flight -= len(futures)
+                window_ids = set()
+                for motion_event in heapq.merge(
+                    *(future.result() for future in futures), key=lambda e: e.start
+                ):
+                    window_ids.add(motion_event.id)
+                    if motion_event.id in previous_ids:
+                        continue
+                    event_count_by_camera[motion_event.camera_id] += 1
+                    yield motion_event
+                previous_ids = window_ids
+
+    log_event_counts(event_count_by_camera, start, end, camera_list)
+
+
+def log_event_counts(
+    event_count_by_camera: Counter[str], start: datetime, end: datetime, camera_list: List[Camera]
+) -> None:
+    logging.info(
+        "Events found:\n{}".format(
+            "\n".join(
+                f"{event_count_by_camera[x]} motion"
+                f" event{'s' if event_count_by_camera[x] > 1 else ''} found for camera"
+                f" '{next((c.name for c in camera_list if c.id == x), x)}' ({x}) between {start} and"
+                f" {end}"
+                for x in event_count_by_camera
+            )
+        )
+    )
+
+    logging.info(
+        f"{sum(event_count_by_camera.values())} motion events found for all selected cameras"
+        f" between {start} and {end}"
+    )
+
+
+# split the time range (epoch milliseconds) into consecutive windows with an inclusive end
+def event_list_windows(start: int, end: int, length: int) -> List[Tuple[int, int]]:
+    if length <= 0:
+        return [(start, end)]
+    windows = []
+    while start < end:
+        windows.append((start, min(start + length, end + 1) - 1))
+        start += length
+    return windows or [(start, end)]
+
+
+# the events of one window (and camera, if given), sorted by their start
+def fetch_motion_events(
+    session: Any, start: int, end: int, camera_id: Optional[str] = None
 ) -> List[MotionEvent]:
+    return sorted(iter_motion_events(session, start, end, camera_id), key=lambda e: e.start)
+
+
+# the events of one request, parsed while the response arrives - neither the response body nor
+# the list of events is held in memory
+def iter_motion_events(
+    session: Any, start: int, end: int, camera_id: Optional[str] = None
+) -> Iterator[MotionEvent]:
     motion_events_uri = (
         # TODO: REMARK 2024-Jan-29 @danielfernau #388
         # TODO: The API has been updated and now uses 'type' multiple times instead of a list.
@@ -23,36 +135,27 @@ def get_motion_event_list(
         f"{session.authority}{session.base_path}/events?"
         "type=motion&type=smartDetectZone&type=smartDetectLine&type=smartAudioDetect&type=ring&"
         "type=doorAccess&smartDetectType=licensePlate&withoutDescriptions=true"
-        f"&start={int(start.timestamp()) * 1000}&end={int(end.timestamp()) * 1000}"
-        f"&start={int(start.timestamp()) * 1000}&end={int(end.timestamp()) * 1000}"
-    )
-
-    response = (
-        requests.get(
-            motion_events_uri,
-            cookies={"TOKEN": session.get_api_token()},
-            verify=session.verify_ssl,
-        )
-        if session.__class__.__name__ == "UniFiOSClient"
-        else requests.get(
-            motion_events_uri,
-            headers={"Authorization": f"Bearer {session.get_api_token()}"},
-            verify=session.verify_ssl,
-        )
+        f"&start={start}&end={end}"
     )
+    if camera_id is not None:
+        motion_events_uri += f"&cameras={camera_id}"
 
-    if response.status_code != 200:
-        print(f"Error while loading motion events list: {response.status_code}")
-        return []
+    response = session.get(motion_events_uri, stream=True)
 
-    logging.info(f"Successfully retrieved data from {motion_events_uri}")
-    # filter ongoing event with no end date https://github.com/danielfernau/unifi-protect-video-downloader/issues/65
-    motion_events = filter(lambda motion_event: motion_event["end"], response.json())
+    with response:
+        if response.status_code != 200:
+            print(f"Error while loading motion events list: {response.status_code}")
+            return
 
-    motion_event_list = []
-    for motion_event in motion_events:
-        motion_event_list.append(
-            MotionEvent(
+        logging.info(f"Successfully retrieved data from {motion_events_uri}")
+        for motion_event in iter_json_array(response.iter_content(Config.JSON_CHUNK_SIZE)):
+            # filter ongoing event with no end date https://github.com/danielfernau/unifi-protect-video-downloader/issues/65
+            if not motion_event["end"]:
+                continue
+            # the camera filter is not supported by all console versions
+            if camera_id is not None and motion_event["camera"] != camera_id:
+                continue
+            yield MotionEvent(
                 id=motion_event["id"],
                 start=datetime.fromtimestamp(motion_event["start"] / 1000),
                 end=datetime.fromtimestamp(motion_event["end"] / 1000),
@@ -60,26 +163,5 @@ def get_motion_event_list(
                 score=motion_event["score"],
                 thumbnail_id=motion_event["thumbnail"],
                 heatmap_id=motion_event["heatmap"],
+                type=motion_event.get("type"),
             )
-        )
-
-    # noinspection PyTypeHints
-    event_count_by_camera = Counter(e.camera_id for e in motion_event_list)
-    logging.info(
-        "Events found:\n{}".format(
-            "\n".join(
-                f"{event_count_by_camera[x]} motion"
-                f" event{'s' if event_count_by_camera[x] > 1 else ''} found for camera"
-                f" '{next(c.name for c in camera_list if c.id == x)}' ({x}) between {start} and"
-                f" {end}"
-                for x in event_count_by_camera
-            )
-        )
-    )
-
-    logging.info(
-        f"{len(motion_event_list)} motion events found for all selected cameras between {start} and"
-        f" {end}"
-    )
-
-    return motion_event_list
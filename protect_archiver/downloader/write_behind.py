@@ -0,0 +1,166 @@
+# write-behind pipeline for downloads: network reads and disk writes on separate threads
+import ctypes
+import logging
+import os
+import queue
+import threading
+
+from typing import IO
+from typing import Any
+from typing import Optional
+from typing import Tuple
+
+import requests
+
+from urllib3.exceptions import ProtocolError
+from urllib3.exceptions import ReadTimeoutError
+from urllib3.exceptions import SSLError
+
+
+# fallocate(2) mode that reserves disk space without changing the file size, so that the size
+# of a partial download still tells how many bytes have actually been written
+FALLOC_FL_KEEP_SIZE = 0x01
+
+_fallocate: Any = None
+
+
+class WriteBehindWriter:
+    """Writes buffers to a file on a background thread.
+
+    The reader fills buffers taken from a ring of ``buffer_count`` preallocated bytearrays
+    and submits them; the writer thread drains them to disk and hands them back for reuse.
+    A slow disk therefore only stalls the network reads once all buffers are full, and no
+    new buffer is allocated per chunk. With ``fsync_interval`` set, the file is synced to
+    disk every time that many bytes have been written, and once more when it is closed.
+    A ``hasher`` (e.g. from hashlib) is updated with every buffer on the writer thread.
+    """
+
+    def __init__(
+        self,
+        fp: IO[bytes],
+        buffer_size: int,
+        buffer_count: int,
+        fsync_interval: int = 0,
+        hasher: Any = None,
+    ) -> None:
+        self._fp = fp
+        self._hasher = hasher
+        self._fsync_interval = fsync_interval
+        self._unsynced = 0
+        self._error: Optional[BaseException] = None
+
+        self._free: "queue.Queue[bytearray]" = queue.Queue()
+        for _ in range(buffer_count):
+            self._free.put(bytearray(buffer_size))
+        self._filled: "queue.Queue[Optional[Tuple[bytearray, int]]]" = queue.Queue()
+
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    # get an empty buffer to read into, blocks while all buffers wait to be written
+    def acquire_buffer(self) -> bytearray:
+        buffer = self._free.get()
+        if self._error is not None:
+            self._free.put(buffer)
+            raise self._error
+        return buffer
+
+    def release_buffer(self, buffer: bytearray) -> None:
+        self._free.put(buffer)
+
+    # queue the first `length` bytes of the buffer for writing
+    def submit(self, buffer: bytearray, length: int) -> None:
+        self._filled.put((buffer, length))
+
+    # wait until all submitted buffers are written, raising any error of the writer thread
+    def close(self) -> None:
+        self._filled.put(None)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        if self._fsync_interval:
+            self._sync()
+
+    def _run(self) -> None:
+        while True:
+            item = self._filled.get()
+            if item is None:
+                return
+            buffer, length = item
+            if self._error is None:
+                try:
+                    self._fp.write(memoryview(buffer)[:length])
+                    if self._hasher is not None:
+                        self._hasher.update(memoryview(buffer)[:length])
+                    self._unsynced += length
+                    if self._fsync_interval and self._unsynced >= self._fsync_interval:
+                        self._sync()
+                except BaseException as error:
+                    self._error = error
+            # always hand the buffer back, so that the reader never waits forever
+            self._free.put(buffer)
+
+    def _sync(self) -> None:
+        self._fp.flush()
+        os.fsync(self._fp.fileno())
+        self._unsynced = 0
+
+
+# reserve disk space for the rest of the file - fewer, larger extents keep writes to network
+# storage sequential; returns False where fallocate(2) is not available
+def preallocate(fd: int, offset: int, length: int) -> bool:
+    global _fallocate
+    if _fallocate is None:
+        try:
+            _fallocate = ctypes.CDLL(None, use_errno=True).fallocate
+            _fallocate.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_int64, ctypes.c_int64]
+        except (OSError, AttributeError):
+            _fallocate = False
+    if not _fallocate:
+        return False
+    if _fallocate(fd, FALLOC_FL_KEEP_SIZE, offset, length) != 0:
+        logging.debug(f"Preallocating {length} bytes failed: {os.strerror(ctypes.get_errno())}")
+        return False
+    return True
+
+
+# stream the raw response body into the file through a write-behind writer,
+# returns the number of bytes written
+def write_behind(
+    response: requests.Response,
+    fp: IO[bytes],
+    buffer_size: int,
+    buffer_count: int,
+    fsync_interval: int = 0,
+    preallocate_bytes: int = 0,
+    hasher: Any = None,
+) -> int:
+    if preallocate_bytes:
+        preallocate(fp.fileno(), fp.tell(), preallocate_bytes)
+
+    writer = WriteBehindWriter(fp, buffer_size, buffer_count, fsync_interval, hasher)
+    cur_bytes = 0
+    try:
+        while True:
+            buffer = writer.acquire_buffer()
+            try:
+                length = response.raw.readinto(buffer)
+            except ProtocolError as error:
+                writer.release_buffer(buffer)
+                raise requests.exceptions.ChunkedEncodingError(error)
+            except ReadTimeoutError as error:
+                writer.release_buffer(buffer)
+                raise requests.exceptions.ConnectionError(error)
+            except SSLError as error:
+                writer.release_buffer(buffer)
+                raise requests.exceptions.SSLError(error)
+            if not length:
+                writer.release_buffer(buffer)
+                break
+            writer.submit(buffer, length)
+            cur_bytes += length
+    finally:
+        # whatever has been read is written, so that a retry can resume after it
+        writer.close()
+
+    return cur_bytes
@@ -34,6 +34,26 @@ class DownloadFailed(Error):
     pass
 
 
+class SegmentFailed(Error):
+    """Signifies that the console could not export a video segment.
+
+    Raised instead of giving up on the download when the caller can still split the
+    segment into shorter ones and request those instead.
+    """
+
+    pass
+
+
+class Mp4Error(Error):
+    """Raised when an MP4 file cannot be parsed or processed.
+
+    Covers malformed files as well as valid ones that use features which are not
+    supported, such as fragmented MP4.
+    """
+
+    pass
+
+
 class AuthorizationFailed(Error):
     """Represents failures in the authorization or authentication process.
 
@@ -0,0 +1,33 @@
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import Optional
+from typing import Sequence
+from typing import Set
+from typing import Tuple
+
+from protect_archiver.dataclasses import Camera
+from protect_archiver.dataclasses import MotionEvent
+
+
+# the events matching the filters, each with its camera from camera_list (None if it is not in
+# the list) - events are passed on one by one as they arrive from the event list
+def select_events(
+    events: Iterable[MotionEvent],
+    camera_list: Sequence[Camera],
+    camera_ids: Optional[Set[str]] = None,
+    min_score: Optional[int] = None,
+    types: Optional[Set[str]] = None,
+) -> Iterator[Tuple[MotionEvent, Optional[Camera]]]:
+    cameras_by_id: Dict[str, Camera] = {}
+    for camera in camera_list:
+        cameras_by_id.setdefault(camera.id, camera)
+
+    for event in events:
+        if camera_ids is not None and event.camera_id not in camera_ids:
+            continue
+        if min_score is not None and event.score < min_score:
+            continue
+        if types is not None and event.type not in types:
+            continue
+        yield event, cameras_by_id.get(event.camera_id)
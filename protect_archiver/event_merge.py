@@ -0,0 +1,84 @@
+from dataclasses import replace
+from datetime import timedelta
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import Optional
+from typing import Tuple
+
+from protect_archiver.config import Config
+from protect_archiver.dataclasses import Camera
+from protect_archiver.dataclasses import MotionEvent
+
+
+EventWithCamera = Tuple[MotionEvent, Optional[Camera]]
+
+
+# extend the event by pre_roll seconds before and post_roll seconds after it
+def pad_event(event: MotionEvent, pre_roll: float = 0, post_roll: float = 0) -> MotionEvent:
+    return replace(
+        event,
+        start=event.start - timedelta(seconds=pre_roll),
+        end=event.end + timedelta(seconds=post_roll),
+        event_ids=event.event_ids or (event.id,),
+    )
+
+
+# a single clip from two overlapping clips of the same camera, named after the first one - its
+# score is the highest of both, and it covers the events of both
+def merge_clips(first: MotionEvent, second: MotionEvent) -> MotionEvent:
+    return replace(
+        first,
+        start=min(first.start, second.start),
+        end=max(first.end, second.end),
+        score=max(first.score, second.score),
+        event_ids=first.event_ids + second.event_ids,
+    )
+
+
+# merge the events of each camera whose clips (the events with pre_roll and post_roll seconds
+# around them) overlap or are at most `gap` seconds apart into a single clip, so that the same
+# footage is not exported several times; with `gap` None, the clips are only padded
+#
+# The events are expected to be ordered by their start, like the ones of the event list: a clip
+# is passed on as soon as no later event can extend it any more. Events without a camera are
+# passed on as they are.
+def coalesce_events(
+    events: Iterable[EventWithCamera],
+    gap: Optional[float] = Config.EVENT_MERGE_GAP,
+    pre_roll: float = Config.EVENT_PRE_ROLL,
+    post_roll: float = Config.EVENT_POST_ROLL,
+) -> Iterator[EventWithCamera]:
+    open_clips: Dict[str, EventWithCamera] = {}
+    max_gap = timedelta(seconds=gap or 0)
+
+    for event, camera in events:
+        if camera is None:
+            yield event, camera
+            continue
+
+        clip = pad_event(event, pre_roll, post_roll)
+        if gap is None:
+            yield clip, camera
+            continue
+
+        # clips that no later event can extend any more
+        finished = sorted(
+            (item for item in open_clips.values() if item[0].end + max_gap < clip.start),
+            key=lambda item: item[0].start,
+        )
+        for item in finished:
+            del open_clips[item[0].camera_id]
+            yield item
+
+        # an open clip of the same camera ends at most `gap` before this one starts (the others
+        # have been passed on above), unless the events are not ordered
+        open_clip, _ = open_clips.get(event.camera_id, (None, None))
+        if open_clip is not None and clip.end + max_gap < open_clip.start:
+            yield clip, camera
+            continue
+        if open_clip is not None:
+            clip = merge_clips(open_clip, clip)
+        open_clips[event.camera_id] = (clip, camera)
+
+    yield from sorted(open_clips.values(), key=lambda item: item[0].start)
@@ -0,0 +1,156 @@
+import calendar
+import logging
+import os
+import time
+
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+from protect_archiver.catalog import Catalog
+from protect_archiver.catalog import CatalogRow
+from protect_archiver.errors import Mp4Error
+from protect_archiver.mp4 import read_duration
+
+
+# milliseconds a segment of calculate_intervals that starts after a full hour may end before the
+# next one, the video of an export does not last exactly as long as the requested time range
+SEGMENT_END_TOLERANCE = 5000
+
+EVENT_SUFFIX = " - event.mp4"
+
+
+# parse "<camera name> (<last 4 characters of camera id>) - YYYY-mm-dd - HH.MM.SS[+zzzz].mp4",
+# the names given to the files by download_footage and download_motion_event; returns (camera
+# name, camera id, start, end of the hour) in epoch milliseconds, or None for other files - the
+# segments of calculate_intervals run until the end of the hour, event clips are shorter
+def parse_filename(name: str) -> Optional[Tuple[str, str, int, int]]:
+    if not name.endswith(".mp4"):
+        return None
+    parts = name[:-4].rsplit(" - ", 2)
+    if len(parts) != 3 or not parts[0].endswith(")") or "(" not in parts[0]:
+        return None
+    camera_name, date, clock = parts
+    if len(date) != 10 or len(clock) not in (8, 13):
+        return None
+
+    try:
+        year, month, day = int(date[0:4]), int(date[5:7]), int(date[8:10])
+        hour, minute, second = int(clock[0:2]), int(clock[3:5]), int(clock[6:8])
+        if len(clock) == 13:
+            # UTC offset, e.g. +0100
+            offset = int(clock[9:11]) * 3600 + int(clock[11:13]) * 60
+            timestamp = calendar.timegm((year, month, day, hour, minute, second)) - (
+                offset if clock[8] == "+" else -offset
+            )
+        else:
+            # file names without an offset are in the local time zone
+            timestamp = int(time.mktime((year, month, day, hour, minute, second, 0, 0, -1)))
+    except (ValueError, OverflowError):
+        return None
+
+    start = timestamp * 1000
+    end = start + (3600 - minute * 60 - second) * 1000 - 1
+    camera_id = camera_name[camera_name.rfind("(") + 1 : -1]
+    return camera_name, camera_id, start, end
+
+
+# the end of a video file (epoch milliseconds, inclusive) and whether it is an event clip - a file
+# named after a full hour is a segment of calculate_intervals and recorded until the end of the
+# hour without opening it, like a file that cannot be read (cutting clips out of it copes with a
+# file that ends early, and the report flags it as undersized); any other file is opened, and its
+# duration tells whether it lasts (almost) until the next hour like a segment or is an event clip
+def file_extent(
+    filename: str, start: int, end_of_hour: int, event_name: bool = False
+) -> Tuple[int, bool]:
+    if end_of_hour + 1 - start == 3600 * 1000 and not event_name:
+        return end_of_hour, False
+    try:
+        duration = read_duration(filename)
+    except (Mp4Error, OSError):
+        return end_of_hour, event_name
+
+    end = start + max(round(duration * 1000), 1) - 1
+    return end, event_name or end < end_of_hour - SEGMENT_END_TOLERANCE
+
+
+# list one directory: its subdirectories and a catalog row for every downloaded video file
+def scan_directory(
+    root: str, relpath: str, camera_ids: Dict[str, str]
+) -> Tuple[List[str], List[CatalogRow]]:
+    subdirs = []
+    rows: List[CatalogRow] = []
+    try:
+        with os.scandir(os.path.join(root, relpath)) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(os.path.join(relpath, entry.name))
+                    continue
+                # event clips that would get the name of hourly footage end with " - event"
+                event_name = entry.name.endswith(EVENT_SUFFIX)
+                parsed = parse_filename(
+                    f"{entry.name[: -len(EVENT_SUFFIX)]}.mp4" if event_name else entry.name
+                )
+                if parsed is None:
+                    continue
+                camera_name, camera_id, start, end_of_hour = parsed
+                end, event_clip = file_extent(entry.path, start, end_of_hour, event_name)
+                stat = entry.stat(follow_symlinks=False)
+                rows.append(
+                    (
+                        os.path.join(relpath, entry.name),
+                        camera_ids.get(camera_name, camera_id),
+                        camera_name,
+                        start,
+                        end,
+                        stat.st_size,
+                        None,
+                        None,
+                        stat.st_mtime,
+                        event_clip,
+                    )
+                )
+    except OSError as error:
+        logging.warning(f"Skipping directory {os.path.join(root, relpath)}: {error}")
+    return subdirs, rows
+
+
+# walk the tree below root with `workers` directories listed at the same time - listing a
+# directory on a network file system mostly waits for the server, so the listings overlap
+# instead of running one after the other; rows are yielded as soon as a directory is done
+def scan_archive(
+    root: str, workers: int, camera_ids: Optional[Dict[str, str]] = None
+) -> Iterator[CatalogRow]:
+    camera_ids = camera_ids or {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="index") as executor:
+        pending: Set["Future[Tuple[List[str], List[CatalogRow]]]"] = {
+            executor.submit(scan_directory, root, "", camera_ids)
+        }
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                subdirs, rows = future.result()
+                for subdir in subdirs:
+                    pending.add(executor.submit(scan_directory, root, subdir, camera_ids))
+                yield from rows
+
+
+# add all video files below the catalog's root to the catalog, in a single transaction;
+# returns the number of files that were added
+def index_archive(catalog: Catalog, workers: int, rebuild: bool = False) -> int:
+    started_at = time.monotonic()
+    # files downloaded with the catalog enabled tell the full id of their camera
+    camera_ids = catalog.camera_ids()
+    added = catalog.load(scan_archive(catalog.root, workers, camera_ids), rebuild=rebuild)
+    logging.info(
+        f"Added {added} file(s) to catalog {catalog.filename}"
+        f" in {time.monotonic() - started_at:.1f}s"
+    )
+    return added
@@ -0,0 +1,91 @@
+import codecs
+import json
+
+from typing import Any
+from typing import Iterable
+from typing import Iterator
+
+
+WHITESPACE = " \t\n\r"
+
+
+class JSONBuffer:
+    """Decoded text of a JSON document that arrives in chunks of bytes.
+
+    Only the part that has not been parsed yet is kept, so that the memory used stays in the
+    order of a chunk and the largest single value, no matter how long the document is.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    # append the next chunk, returns False at the end of the document
+    def read(self) -> bool:
+        if self.eof:
+            return False
+        self.text = self.text[self.pos :]
+        self.pos = 0
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self.eof = True
+            self.text += self._utf8.decode(b"", final=True)
+        else:
+            self.text += self._utf8.decode(chunk)
+        return True
+
+    # the next character that is not whitespace, or "" at the end of the document
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.read():
+                return ""
+
+    def take(self) -> str:
+        char = self.peek()
+        self.pos += len(char)
+        return char
+
+    # the next JSON value, reading further chunks until it is complete
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if not self.read():
+                    raise
+                continue
+            # a number or literal at the end of the text may continue in the next chunk
+            if end < len(self.text) or not self.read():
+                self.pos = end
+                return value
+
+
+# the elements of a JSON array that arrives in chunks of bytes (e.g. from iter_content), each
+# one as soon as it is complete - the array itself is never held in memory
+def iter_json_array(chunks: Iterable[bytes]) -> Iterator[Any]:
+    buffer = JSONBuffer(chunks)
+    if buffer.take() != "[":
+        raise ValueError("Expected a JSON array")
+
+    if buffer.peek() == "]":
+        buffer.take()
+    else:
+        while True:
+            yield buffer.value()
+            separator = buffer.take()
+            if separator == "]":
+                break
+            if separator != ",":
+                raise ValueError(f"Expected ',' or ']' in JSON array, got {separator!r}")
+
+    if buffer.peek():
+        raise ValueError("Extra data after JSON array")
@@ -0,0 +1,137 @@
+import logging
+import threading
+import time
+
+from types import TracebackType
+from typing import Optional
+from typing import Type
+
+from protect_archiver.config import Config
+
+
+class ConcurrencyLimiter:
+    """Limits the number of simultaneous export requests against the Protect console.
+
+    The limit is shared by all download workers of a client. A limit of 0 disables
+    limiting. The limit can be changed at runtime; waiting workers are woken up when
+    it is raised.
+    """
+
+    def __init__(self, limit: int = 0) -> None:
+        self._limit = limit
+        self._active = 0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def set_limit(self, limit: int) -> None:
+        with self._condition:
+            self._limit = limit
+            self._condition.notify_all()
+
+    def acquire(self) -> None:
+        with self._condition:
+            while self._limit and self._active >= self._limit:
+                self._condition.wait()
+            self._active += 1
+
+    # take a slot only if one is free right now
+    def try_acquire(self) -> bool:
+        with self._condition:
+            if self._limit and self._active >= self._limit:
+                return False
+            self._active += 1
+            return True
+
+    def release(self) -> None:
+        with self._condition:
+            self._active -= 1
+            self._condition.notify()
+
+    # feedback about the outcome of a request started at the given time.monotonic() timestamp,
+    # ignored by the static limiter
+    def record_success(self, ttfb: float, started_at: float) -> None:
+        pass
+
+    def record_failure(self, started_at: float) -> None:
+        pass
+
+    def __enter__(self) -> "ConcurrencyLimiter":
+        self.acquire()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.release()
+
+
+class AdaptiveConcurrencyLimiter(ConcurrencyLimiter):
+    """Adjusts the export limit to the health of the Protect console (AIMD).
+
+    Starting at ``min_limit``, the limit grows by one after each full round of successful
+    requests (additive increase) as long as the time-to-first-byte stays within
+    ``latency_tolerance`` times the best one observed. A rising time-to-first-byte shrinks
+    the limit by one, timeouts and 5xx responses cut it by ``backoff_factor``
+    (multiplicative decrease). Failures of requests that were started before the last
+    decrease are ignored, so that a burst of failures only backs off once.
+    """
+
+    def __init__(
+        self,
+        max_limit: int,
+        min_limit: int = 1,
+        latency_tolerance: float = Config.ADAPTIVE_LATENCY_TOLERANCE,
+        backoff_factor: float = Config.ADAPTIVE_BACKOFF_FACTOR,
+    ) -> None:
+        super().__init__(min_limit)
+        self.min_limit = min_limit
+        self.max_limit = max(max_limit, min_limit)
+        self.latency_tolerance = latency_tolerance
+        self.backoff_factor = backoff_factor
+
+        self._window = float(min_limit)
+        self._best_ttfb: Optional[float] = None
+        self._last_decrease = float("-inf")
+
+    def record_success(self, ttfb: float, started_at: float) -> None:
+        with self._condition:
+            # the baseline slowly drifts upwards, so that a single exceptionally fast
+            # response does not make all later ones look like the console is overloaded
+            if self._best_ttfb is None:
+                self._best_ttfb = ttfb
+            else:
+                self._best_ttfb = min(ttfb, self._best_ttfb * 1.01)
+
+            # one second of slack ignores jitter on responses that are fast anyway
+            if ttfb <= self._best_ttfb * self.latency_tolerance + 1.0:
+                self._window = min(self._window + 1 / self._window, self.max_limit)
+                self._update_limit()
+            elif started_at > self._last_decrease:
+                # the console gets slower to respond - stop adding load before it fails
+                self._decrease(self._window - 1, f"time-to-first-byte rose to {ttfb:.1f}s")
+
+    def record_failure(self, started_at: float) -> None:
+        with self._condition:
+            if started_at > self._last_decrease:
+                self._decrease(self._window * self.backoff_factor, "request failed")
+
+    def _decrease(self, window: float, reason: str) -> None:
+        self._window = max(window, self.min_limit)
+        self._last_decrease = time.monotonic()
+        if int(self._window) < self._limit:
+            logging.info(f"Reducing concurrent exports to {int(self._window)} ({reason})")
+        self._update_limit()
+
+    def _update_limit(self) -> None:
+        self._limit = int(self._window)
+        self._condition.notify_all()
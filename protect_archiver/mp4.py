@@ -0,0 +1,718 @@
+# minimal reader and writer for progressive MP4 files (ISO base media file format), enough to
+# join the video files exported by the Protect console without re-encoding them
+import bisect
+import io
+import struct
+import sys
+
+from array import array
+from typing import IO
+from typing import Iterator
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from protect_archiver.errors import Mp4Error
+
+
+# boxes that only contain other boxes and are descended into while parsing
+CONTAINER_BOXES = {b"moov", b"trak", b"edts", b"mdia", b"minf", b"stbl"}
+
+# size of the mdat header written, always with a 64-bit size
+MDAT_HEADER_SIZE = 16
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class Box(NamedTuple):
+    type: bytes
+    offset: int  # of the box header
+    header_size: int
+    size: int  # including the header
+
+    @property
+    def payload_offset(self) -> int:
+        return self.offset + self.header_size
+
+    @property
+    def end(self) -> int:
+        return self.offset + self.size
+
+
+def iter_boxes(fp: IO[bytes], start: int, end: int) -> Iterator[Box]:
+    offset = start
+    while offset + 8 <= end:
+        fp.seek(offset)
+        size, box_type = struct.unpack(">I4s", fp.read(8))
+        header_size = 8
+        if size == 1:
+            (size,) = struct.unpack(">Q", fp.read(8))
+            header_size = 16
+        elif size == 0:
+            size = end - offset  # box extends to the end of the file
+        if size < header_size or offset + size > end:
+            raise Mp4Error(f"Invalid {box_type!r} box at offset {offset}")
+        yield Box(box_type, offset, header_size, size)
+        offset += size
+
+
+def make_box(box_type: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def make_full_box(box_type: bytes, version: int, flags: int, payload: bytes) -> bytes:
+    return make_box(box_type, struct.pack(">I", (version << 24) | flags) + payload)
+
+
+class SampleTable:
+    """Timing, size and location of the samples of a track, as stored in its ``stbl`` box.
+
+    Durations and composition offsets are kept run-length encoded like in the file;
+    chunk offsets are absolute file offsets.
+    """
+
+    def __init__(self) -> None:
+        self.durations: List[List[int]] = []  # [sample count, sample delta]
+        self.composition_offsets: Optional[List[List[int]]] = None  # [sample count, offset]
+        self.composition_version = 0
+        self.chunks: List[Tuple[int, int, int]] = []  # stsc: first chunk, samples, description
+        self.sizes = array("I")
+        self.chunk_offsets = array("Q")
+        self.sync_samples: Optional["array[int]"] = None  # None if every sample is a sync sample
+
+    @property
+    def sample_count(self) -> int:
+        return len(self.sizes)
+
+    @property
+    def duration(self) -> int:
+        return sum(count * delta for count, delta in self.durations)
+
+    # append the samples of another table, mapping its chunk offsets to their new location
+    def extend(self, other: "SampleTable", offset_map: "OffsetMap") -> None:
+        first_sample = self.sample_count
+        first_chunk = len(self.chunk_offsets)
+
+        append_runs(self.durations, other.durations)
+
+        if self.composition_offsets is not None or other.composition_offsets is not None:
+            if self.composition_offsets is None:
+                self.composition_offsets = [[first_sample, 0]] if first_sample else []
+            append_runs(
+                self.composition_offsets, other.composition_offsets or [[other.sample_count, 0]]
+            )
+            self.composition_version = max(self.composition_version, other.composition_version)
+
+        for chunk, samples_per_chunk, description in other.chunks:
+            if self.chunks and self.chunks[-1][1:] == (samples_per_chunk, description):
+                continue  # continues the run of the previous entry
+            self.chunks.append((first_chunk + chunk, samples_per_chunk, description))
+
+        self.sizes.extend(other.sizes)
+        self.chunk_offsets.extend(offset_map.map(offset) for offset in other.chunk_offsets)
+
+        if self.sync_samples is not None or other.sync_samples is not None:
+            if self.sync_samples is None:
+                self.sync_samples = array("I", range(1, first_sample + 1))
+            other_sync = (
+                other.sync_samples
+                if other.sync_samples is not None
+                else range(1, other.sample_count + 1)
+            )
+            self.sync_samples.extend(first_sample + sample for sample in other_sync)
+
+    # the decode time of every sample, in the timescale of the track
+    def decode_times(self) -> "array[int]":
+        times = array("Q")
+        time = 0
+        for count, delta in self.durations:
+            for _ in range(count):
+                times.append(time)
+                time += delta
+        if len(times) != self.sample_count:
+            raise Mp4Error("Inconsistent sample table")
+        return times
+
+    # the file offset and sample description of every sample
+    def sample_locations(self) -> Tuple["array[int]", "array[int]"]:
+        offsets = array("Q")
+        descriptions = array("I")
+        sample = 0
+        ends = [chunk for chunk, _, _ in self.chunks[1:]] + [len(self.chunk_offsets) + 1]
+        for (first_chunk, samples_per_chunk, description), end in zip(self.chunks, ends):
+            for chunk in range(first_chunk - 1, end - 1):
+                offset = self.chunk_offsets[chunk]
+                for size in self.sizes[sample : sample + samples_per_chunk]:
+                    offsets.append(offset)
+                    descriptions.append(description)
+                    offset += size
+                sample += samples_per_chunk
+        if len(offsets) != self.sample_count:
+            raise Mp4Error("Inconsistent sample table")
+        return offsets, descriptions
+
+    # the last sync sample at or before the given sample (0-based)
+    def sync_sample_before(self, sample: int) -> int:
+        if self.sync_samples is None:
+            return sample
+        index = bisect.bisect_right(self.sync_samples, sample + 1) - 1
+        return self.sync_samples[index] - 1 if index >= 0 else 0
+
+    # the samples from first to last (exclusive) as a table of their own, for which they are
+    # stored one after another from `offset` on - returns the table and the (offset, size)
+    # ranges of the file to copy there, in order
+    def slice(
+        self, first: int, last: int, offset: int
+    ) -> Tuple["SampleTable", List[Tuple[int, int]]]:
+        table = SampleTable()
+        table.durations = slice_runs(self.durations, first, last)
+        if self.composition_offsets is not None:
+            table.composition_offsets = slice_runs(self.composition_offsets, first, last)
+            table.composition_version = self.composition_version
+        table.sizes = self.sizes[first:last]
+        if self.sync_samples is not None:
+            table.sync_samples = array(
+                "I", (sample - first for sample in self.sync_samples if first < sample <= last)
+            )
+
+        # a chunk for every run of samples with the same description
+        offsets, descriptions = self.sample_locations()
+        ranges: List[Tuple[int, int]] = []
+        for sample in range(first, last):
+            size = self.sizes[sample]
+            if sample == first or descriptions[sample] != descriptions[sample - 1]:
+                table.chunk_offsets.append(offset)
+                table.chunks.append((len(table.chunk_offsets), 0, descriptions[sample]))
+            chunk, samples, description = table.chunks[-1]
+            table.chunks[-1] = (chunk, samples + 1, description)
+            if ranges and sum(ranges[-1]) == offsets[sample]:
+                ranges[-1] = (ranges[-1][0], ranges[-1][1] + size)
+            else:
+                ranges.append((offsets[sample], size))
+            offset += size
+        return table, ranges
+
+    @classmethod
+    def parse(cls, data: bytes, stbl: Box) -> "SampleTable":
+        table = cls()
+        boxes = {
+            box.type: box for box in iter_boxes(io.BytesIO(data), stbl.payload_offset, stbl.end)
+        }
+        for required in (b"stts", b"stsc", b"stsz"):
+            if required not in boxes:
+                raise Mp4Error(
+                    f"Missing {required!r} box, only progressive MP4 files are supported"
+                )
+
+        payload = full_box_payload(data, boxes[b"stts"])
+        table.durations = [list(entry) for entry in iter_entries(payload, ">II")]
+
+        if b"ctts" in boxes:
+            version = data[boxes[b"ctts"].payload_offset]
+            payload = full_box_payload(data, boxes[b"ctts"])
+            table.composition_offsets = [
+                list(entry) for entry in iter_entries(payload, ">Ii" if version else ">II")
+            ]
+            table.composition_version = version
+
+        payload = full_box_payload(data, boxes[b"stsc"])
+        table.chunks = [
+            (chunk, samples, desc) for chunk, samples, desc in iter_entries(payload, ">III")
+        ]
+
+        payload = full_box_payload(data, boxes[b"stsz"])
+        sample_size, sample_count = struct.unpack_from(">II", payload)
+        if sample_size:
+            table.sizes = array("I", [sample_size]) * sample_count
+        else:
+            table.sizes = read_array("I", payload[8:], sample_count)
+
+        if b"co64" in boxes:
+            payload = full_box_payload(data, boxes[b"co64"])
+            table.chunk_offsets = read_array("Q", payload[4:], struct.unpack_from(">I", payload)[0])
+        elif b"stco" in boxes:
+            payload = full_box_payload(data, boxes[b"stco"])
+            offsets = read_array("I", payload[4:], struct.unpack_from(">I", payload)[0])
+            table.chunk_offsets = array("Q", offsets)
+        else:
+            raise Mp4Error("Missing chunk offset box")
+
+        if b"stss" in boxes:
+            payload = full_box_payload(data, boxes[b"stss"])
+            table.sync_samples = read_array("I", payload[4:], struct.unpack_from(">I", payload)[0])
+
+        return table
+
+    # the stbl box with these samples, always using 64-bit chunk offsets
+    def build(self, sample_description: bytes) -> bytes:
+        boxes = [sample_description]
+        boxes.append(make_full_box(b"stts", 0, 0, pack_entries(self.durations, ">II")))
+        if self.composition_offsets is not None:
+            boxes.append(
+                make_full_box(
+                    b"ctts",
+                    self.composition_version,
+                    0,
+                    pack_entries(
+                        self.composition_offsets, ">Ii" if self.composition_version else ">II"
+                    ),
+                )
+            )
+        boxes.append(make_full_box(b"stsc", 0, 0, pack_entries(self.chunks, ">III")))
+        boxes.append(
+            make_full_box(
+                b"stsz", 0, 0, struct.pack(">II", 0, self.sample_count) + write_array(self.sizes)
+            )
+        )
+        boxes.append(
+            make_full_box(
+                b"co64",
+                0,
+                0,
+                struct.pack(">I", len(self.chunk_offsets)) + write_array(self.chunk_offsets),
+            )
+        )
+        if self.sync_samples is not None:
+            boxes.append(
+                make_full_box(
+                    b"stss",
+                    0,
+                    0,
+                    struct.pack(">I", len(self.sync_samples)) + write_array(self.sync_samples),
+                )
+            )
+        return make_box(b"stbl", b"".join(boxes))
+
+
+class Track:
+    def __init__(self, data: bytes, trak: Box) -> None:
+        self.trak = trak
+
+        tkhd = find_box(data, trak, b"tkhd")
+        mdhd = find_box(data, trak, b"mdia", b"mdhd")
+        hdlr = find_box(data, trak, b"mdia", b"hdlr")
+        stbl = find_box(data, trak, b"mdia", b"minf", b"stbl")
+        if tkhd is None or mdhd is None or hdlr is None or stbl is None:
+            raise Mp4Error("Incomplete track")
+
+        version = data[tkhd.payload_offset]
+        self.track_id = struct.unpack_from(
+            ">I", data, tkhd.payload_offset + (20 if version else 12)
+        )[0]
+        version = data[mdhd.payload_offset]
+        self.timescale = struct.unpack_from(
+            ">I", data, mdhd.payload_offset + (20 if version else 12)
+        )[0]
+        self.handler = data[hdlr.payload_offset + 8 : hdlr.payload_offset + 12]
+
+        stsd = next(
+            (
+                box
+                for box in iter_boxes(io.BytesIO(data), stbl.payload_offset, stbl.end)
+                if box.type == b"stsd"
+            ),
+            None,
+        )
+        if stsd is None:
+            raise Mp4Error("Missing sample description")
+        self.sample_description = data[stsd.offset : stsd.end]
+        self.samples = SampleTable.parse(data, stbl)
+
+
+class Movie:
+    """The structure of a progressive MP4 file: its header boxes, tracks and media data."""
+
+    def __init__(self, fp: IO[bytes]) -> None:
+        fp.seek(0, io.SEEK_END)
+        file_size = fp.tell()
+
+        self.ftyp = b""
+        self.moov = b""
+        self.mdat: List[Box] = []
+        for box in iter_boxes(fp, 0, file_size):
+            if box.type == b"ftyp":
+                fp.seek(box.offset)
+                self.ftyp = fp.read(box.size)
+            elif box.type == b"moov":
+                fp.seek(box.offset)
+                self.moov = fp.read(box.size)
+            elif box.type == b"mdat":
+                self.mdat.append(box)
+            elif box.type == b"moof":
+                raise Mp4Error("Fragmented MP4 files are not supported")
+
+        if not self.moov:
+            raise Mp4Error("Missing movie header")
+
+        root = Box(b"moov", 0, 8, len(self.moov))
+        if find_box(self.moov, root, b"mvex") is not None:
+            raise Mp4Error("Fragmented MP4 files are not supported")
+        mvhd = find_box(self.moov, root, b"mvhd")
+        if mvhd is None:
+            raise Mp4Error("Missing movie header")
+        version = self.moov[mvhd.payload_offset]
+        self.timescale = struct.unpack_from(
+            ">I", self.moov, mvhd.payload_offset + (20 if version else 12)
+        )[0]
+
+        self.tracks = [
+            Track(self.moov, box)
+            for box in iter_boxes(io.BytesIO(self.moov), root.payload_offset, root.end)
+            if box.type == b"trak"
+        ]
+
+    # the moov box for the given sample tables of the tracks, which replace the original ones
+    def build_moov(self, tables: Sequence[SampleTable]) -> bytes:
+        durations = {track.trak.offset: (track, table) for track, table in zip(self.tracks, tables)}
+        movie_duration = max(
+            (
+                table.duration * self.timescale // track.timescale
+                for track, table in durations.values()
+            ),
+            default=0,
+        )
+
+        def rebuild(box: Box) -> bytes:
+            if box.type == b"mvhd":
+                return patch_duration(self.moov, box, 16, 24, movie_duration)
+            if box.type == b"trak":
+                track, table = durations[box.offset]
+                media_duration = table.duration
+                track_duration = media_duration * self.timescale // track.timescale
+                return make_box(
+                    b"trak",
+                    b"".join(
+                        rebuild_track(child, track, table, track_duration)
+                        for child in children(box)
+                    ),
+                )
+            return self.moov[box.offset : box.end]
+
+        def rebuild_track(box: Box, track: Track, table: SampleTable, track_duration: int) -> bytes:
+            if box.type == b"tkhd":
+                return patch_duration(self.moov, box, 20, 28, track_duration)
+            if box.type == b"mdhd":
+                return patch_duration(self.moov, box, 16, 24, table.duration)
+            if box.type == b"edts":
+                elst = find_box(self.moov, box, b"elst")
+                edit_list = (
+                    patch_edit_list(self.moov, elst, track, table, self.timescale)
+                    if elst is not None
+                    else None
+                )
+                return make_box(b"edts", edit_list) if edit_list is not None else b""
+            if box.type == b"stbl":
+                return table.build(track.sample_description)
+            if box.type in CONTAINER_BOXES:
+                return make_box(
+                    box.type,
+                    b"".join(
+                        rebuild_track(child, track, table, track_duration)
+                        for child in children(box)
+                    ),
+                )
+            return self.moov[box.offset : box.end]
+
+        def children(box: Box) -> Iterator[Box]:
+            return iter_boxes(io.BytesIO(self.moov), box.payload_offset, box.end)
+
+        root = Box(b"moov", 0, 8, len(self.moov))
+        return make_box(b"moov", b"".join(rebuild(box) for box in children(root)))
+
+
+class OffsetMap:
+    """Maps file offsets within the mdat boxes of an input file to offsets in the output."""
+
+    def __init__(self, mdat: Sequence[Box], base: int) -> None:
+        self.starts = [box.payload_offset for box in mdat]
+        self.ranges: List[Tuple[int, int, int]] = []  # source start, source end, target start
+        for box in mdat:
+            self.ranges.append((box.payload_offset, box.end, base))
+            base += box.end - box.payload_offset
+        self.end = base
+
+    def map(self, offset: int) -> int:
+        index = bisect.bisect_right(self.starts, offset) - 1
+        if index < 0 or offset >= self.ranges[index][1]:
+            raise Mp4Error(f"Sample data at offset {offset} is outside of the media data")
+        start, _, target = self.ranges[index]
+        return target + offset - start
+
+
+# the duration of an MP4 file in seconds, from its movie header - only the headers of the boxes
+# and the mvhd box are read, not the sample tables
+def read_duration(filename: str) -> float:
+    with open(filename, "rb") as fp:
+        fp.seek(0, io.SEEK_END)
+        moov = next((box for box in iter_boxes(fp, 0, fp.tell()) if box.type == b"moov"), None)
+        if moov is None:
+            raise Mp4Error("Missing movie header")
+        mvhd = next(
+            (box for box in iter_boxes(fp, moov.payload_offset, moov.end) if box.type == b"mvhd"),
+            None,
+        )
+        if mvhd is None:
+            raise Mp4Error("Missing movie header")
+        fp.seek(mvhd.payload_offset)
+        payload = fp.read(min(mvhd.end - mvhd.payload_offset, 32))
+
+    try:
+        if payload[0] == 1:
+            timescale, duration = struct.unpack_from(">IQ", payload, 20)
+        else:
+            timescale, duration = struct.unpack_from(">II", payload, 12)
+    except (IndexError, struct.error):
+        raise Mp4Error("Truncated movie header") from None
+    if not timescale:
+        raise Mp4Error("Invalid movie header")
+    return float(duration / timescale)
+
+
+def concatenate(inputs: Sequence[str], output: str) -> None:
+    """Join MP4 files with the same tracks and codec settings into one, without re-encoding.
+
+    The samples of all files are played back one after another, in the order of ``inputs``.
+    The media data of the files is copied as is and the sample tables are merged, so the
+    files need to have been encoded with identical parameters - as the exports of the same
+    camera are.
+    """
+    if not inputs:
+        raise Mp4Error("Nothing to concatenate")
+
+    movies = []
+    for filename in inputs:
+        with open(filename, "rb") as fp:
+            movies.append(Movie(fp))
+
+    first = movies[0]
+    for movie in movies[1:]:
+        if len(movie.tracks) != len(first.tracks) or any(
+            track.handler != other.handler
+            or track.timescale != other.timescale
+            or track.sample_description != other.sample_description
+            for track, other in zip(first.tracks, movie.tracks)
+        ):
+            raise Mp4Error("The files to concatenate have different tracks or codec settings")
+
+    def merged_tables(base: int) -> Tuple[List[SampleTable], List[OffsetMap]]:
+        tables = [SampleTable() for _ in first.tracks]
+        offset_maps = []
+        for movie in movies:
+            offset_map = OffsetMap(movie.mdat, base)
+            offset_maps.append(offset_map)
+            for table, track in zip(tables, movie.tracks):
+                table.extend(track.samples, offset_map)
+            base = offset_map.end
+        return tables, offset_maps
+
+    # 64-bit chunk offsets make the size of the moov box independent of the offsets, so they
+    # can be calculated from the size of a first version of it
+    tables, _ = merged_tables(0)
+    header_size = len(first.ftyp) + len(first.build_moov(tables)) + MDAT_HEADER_SIZE
+    tables, offset_maps = merged_tables(header_size)
+    moov = first.build_moov(tables)
+
+    with open(output, "wb") as out:
+        out.write(first.ftyp)
+        out.write(moov)
+        out.write(
+            struct.pack(">I4sQ", 1, b"mdat", MDAT_HEADER_SIZE + offset_maps[-1].end - header_size)
+        )
+        for filename, movie in zip(inputs, movies):
+            with open(filename, "rb") as fp:
+                for box in movie.mdat:
+                    copy_range(fp, out, box.payload_offset, box.end - box.payload_offset)
+
+
+def cut(filename: str, output: str, start: float, end: float) -> Tuple[float, float]:
+    """Write the part of an MP4 file from ``start`` to ``end`` to ``output``, without re-encoding.
+
+    ``start`` and ``end`` are in seconds from the beginning of the file. Video can only be
+    decoded from a sync sample (a keyframe) on, so the part begins at the last one at or before
+    ``start``, and the other tracks are cut at the same time. The part ends early if the file
+    does. Returns the time range of the part, in seconds from the beginning of the file - a
+    ``start`` beyond the end of the file is an error.
+    """
+    with open(filename, "rb") as fp:
+        movie = Movie(fp)
+    if not movie.tracks:
+        raise Mp4Error("No tracks to cut")
+
+    # the first track with sync samples (the video) decides where the part begins
+    reference = next(
+        (track for track in movie.tracks if track.samples.sync_samples is not None),
+        movie.tracks[0],
+    )
+    times = reference.samples.decode_times()
+    if not times:
+        raise Mp4Error("No samples to cut")
+    first = max(bisect.bisect_right(times, round(start * reference.timescale)) - 1, 0)
+    first = reference.samples.sync_sample_before(first)
+    begin = times[first] / reference.timescale
+    if (
+        times[first] >= round(end * reference.timescale)
+        or round(start * reference.timescale) >= reference.samples.duration
+    ):
+        raise Mp4Error(f"Nothing to cut between {start}s and {end}s")
+
+    last = bisect.bisect_left(times, round(end * reference.timescale))
+    finish = (
+        times[last] if last < len(times) else reference.samples.duration
+    ) / reference.timescale
+
+    samples = []
+    for track in movie.tracks:
+        times = track.samples.decode_times()
+        samples.append(
+            (
+                (
+                    first
+                    if track is reference
+                    else bisect.bisect_left(times, round(begin * track.timescale))
+                ),
+                bisect.bisect_left(times, round(end * track.timescale)),
+            )
+        )
+
+    # the samples of each track are stored one after another, see concatenate() for why the
+    # header is built twice
+    def sliced_tables(base: int) -> Tuple[List[SampleTable], List[List[Tuple[int, int]]]]:
+        tables, ranges = [], []
+        for track, (first_sample, last_sample) in zip(movie.tracks, samples):
+            table, track_ranges = track.samples.slice(first_sample, last_sample, base)
+            tables.append(table)
+            ranges.append(track_ranges)
+            base += sum(table.sizes)
+        return tables, ranges
+
+    tables, _ = sliced_tables(0)
+    header_size = len(movie.ftyp) + len(movie.build_moov(tables)) + MDAT_HEADER_SIZE
+    tables, ranges = sliced_tables(header_size)
+    data_size = sum(sum(table.sizes) for table in tables)
+
+    with open(filename, "rb") as fp, open(output, "wb") as out:
+        out.write(movie.ftyp)
+        out.write(movie.build_moov(tables))
+        out.write(struct.pack(">I4sQ", 1, b"mdat", MDAT_HEADER_SIZE + data_size))
+        for track_ranges in ranges:
+            for offset, size in track_ranges:
+                copy_range(fp, out, offset, size)
+
+    return begin, finish
+
+
+def copy_range(src: IO[bytes], dst: IO[bytes], offset: int, length: int) -> None:
+    src.seek(offset)
+    while length > 0:
+        data = src.read(min(length, COPY_BUFFER_SIZE))
+        if not data:
+            raise Mp4Error("Unexpected end of file")
+        dst.write(data)
+        length -= len(data)
+
+
+def find_box(data: bytes, parent: Box, *path: bytes) -> Optional[Box]:
+    box: Optional[Box] = parent
+    for box_type in path:
+        assert box is not None
+        box = next(
+            (
+                child
+                for child in iter_boxes(io.BytesIO(data), box.payload_offset, box.end)
+                if child.type == box_type
+            ),
+            None,
+        )
+        if box is None:
+            return None
+    return box
+
+
+def full_box_payload(data: bytes, box: Box) -> bytes:
+    # skip version and flags
+    return data[box.payload_offset + 4 : box.end]
+
+
+def iter_entries(payload: bytes, entry_format: str) -> Iterator[Tuple[int, ...]]:
+    (entry_count,) = struct.unpack_from(">I", payload)
+    return struct.iter_unpack(
+        entry_format, payload[4 : 4 + entry_count * struct.calcsize(entry_format)]
+    )
+
+
+def pack_entries(entries: Sequence[Sequence[int]], entry_format: str) -> bytes:
+    return struct.pack(">I", len(entries)) + b"".join(
+        struct.pack(entry_format, *entry) for entry in entries
+    )
+
+
+def append_runs(runs: List[List[int]], other: Sequence[Sequence[int]]) -> None:
+    for count, value in other:
+        if runs and runs[-1][1] == value:
+            runs[-1][0] += count
+        else:
+            runs.append([count, value])
+
+
+# the runs of values of the items from first to last (exclusive)
+def slice_runs(runs: Sequence[Sequence[int]], first: int, last: int) -> List[List[int]]:
+    sliced: List[List[int]] = []
+    position = 0
+    for count, value in runs:
+        overlap = min(position + count, last) - max(position, first)
+        if overlap > 0:
+            append_runs(sliced, [[overlap, value]])
+        position += count
+        if position >= last:
+            break
+    return sliced
+
+
+def read_array(typecode: str, payload: bytes, count: int) -> "array[int]":
+    values = array(typecode)
+    values.frombytes(payload[: count * values.itemsize])
+    if len(values) != count:
+        raise Mp4Error("Truncated sample table")
+    if sys.byteorder == "little":
+        values.byteswap()  # stored big-endian
+    return values
+
+
+def write_array(values: "array[int]") -> bytes:
+    if sys.byteorder == "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+# copy of a mvhd, tkhd or mdhd box with a new duration, which is stored at a different offset
+# in version 0 and version 1 (64-bit) boxes
+def patch_duration(data: bytes, box: Box, offset_v0: int, offset_v1: int, duration: int) -> bytes:
+    payload = bytearray(data[box.payload_offset : box.end])
+    if payload[0] == 1:
+        struct.pack_into(">Q", payload, offset_v1, duration)
+    elif duration <= 0xFFFFFFFF:
+        struct.pack_into(">I", payload, offset_v0, duration)
+    else:
+        raise Mp4Error(f"Duration {duration} does not fit into a version 0 {box.type!r} box")
+    return make_box(box.type, bytes(payload))
+
+
+# an edit list with a single entry is extended to the new length of the track, anything more
+# complex is dropped - the samples are then played back as they are
+def patch_edit_list(
+    data: bytes, box: Box, track: Track, table: SampleTable, timescale: int
+) -> Optional[bytes]:
+    version = data[box.payload_offset]
+    entry_format = ">QqI" if version else ">IiI"
+    entries = list(iter_entries(full_box_payload(data, box), entry_format))
+    if len(entries) != 1:
+        return None
+
+    segment_duration, media_time, rate = entries[0]
+    segment_duration += (table.duration - track.samples.duration) * timescale // track.timescale
+    return make_full_box(
+        b"elst", version, 0, pack_entries([(segment_duration, media_time, rate)], entry_format)
+    )
@@ -0,0 +1,122 @@
+import json
+import logging
+import os
+import threading
+
+from typing import Dict
+from typing import Optional
+
+from protect_archiver.config import Config
+
+
+class SegmentPlanner:
+    """Learns the length of the video segments to request from the console, per camera.
+
+    Every camera starts with ``default_length`` seconds. When a segment cannot be exported
+    even after retrying, its length is halved (down to ``min_length``) and the time range is
+    requested again in shorter segments - the shorter length is then kept for the camera.
+    After ``grow_after`` consecutive segments that each took less than ``fast_ratio`` of the
+    time they cover to download, the length is doubled again, up to ``max_length``.
+
+    Lengths are always ``default_length`` multiplied or divided by a power of two, so that the
+    segment boundaries stay aligned to the full hours. The learned lengths are saved to
+    ``statefile`` and used as the starting point of later runs.
+    """
+
+    def __init__(
+        self,
+        statefile: Optional[str] = None,
+        default_length: int = Config.SEGMENT_LENGTH,
+        min_length: int = Config.MIN_SEGMENT_LENGTH,
+        max_length: int = Config.MAX_SEGMENT_LENGTH,
+        grow_after: int = Config.SEGMENT_GROW_AFTER,
+        fast_ratio: float = Config.SEGMENT_FAST_RATIO,
+    ) -> None:
+        self.statefile = statefile
+        # lengths are handled in milliseconds, like the timestamps of the export API
+        self.default_length = default_length * 1000
+        self.min_length = min_length * 1000
+        self.max_length = max(max_length * 1000, self.default_length)
+        self.grow_after = grow_after
+        self.fast_ratio = fast_ratio
+
+        self._lock = threading.Lock()
+        self._lengths: Dict[str, int] = {}
+        self._fast_segments: Dict[str, int] = {}
+
+        if statefile is not None and os.path.isfile(statefile):
+            self._lengths = self.readstate(statefile)
+
+    def readstate(self, statefile: str) -> Dict[str, int]:
+        try:
+            with open(statefile) as fp:
+                lengths = json.load(fp)["cameras"]
+        except (ValueError, KeyError, TypeError):
+            logging.warning(f"Ignoring invalid segment length state in {statefile}")
+            return {}
+        return {camera_id: self._normalize(int(length)) for camera_id, length in lengths.items()}
+
+    def writestate(self) -> None:
+        if self.statefile is None:
+            return
+        # write to a temporary file and atomically replace the statefile with it
+        tmpfile = f"{self.statefile}.tmp"
+        with open(tmpfile, "w") as fp:
+            json.dump({"cameras": self._lengths}, fp)
+        os.replace(tmpfile, self.statefile)
+
+    # current segment length of the camera, in milliseconds
+    def length(self, camera_id: str) -> int:
+        with self._lock:
+            return self._lengths.get(camera_id, self.default_length)
+
+    def record_success(self, camera_id: str, length: int, elapsed: float) -> None:
+        with self._lock:
+            if elapsed * 1000 > length * self.fast_ratio:
+                self._fast_segments[camera_id] = 0
+                return
+
+            self._fast_segments[camera_id] = self._fast_segments.get(camera_id, 0) + 1
+            current = self._lengths.get(camera_id, self.default_length)
+            # only segments of the full length tell whether a longer one would be handled, too
+            if (
+                length >= current
+                and self._fast_segments[camera_id] >= self.grow_after
+                and current * 2 <= self.max_length
+            ):
+                self._fast_segments[camera_id] = 0
+                self._lengths[camera_id] = current * 2
+                logging.info(
+                    f"Increasing segment length of camera {camera_id} to {current * 2 / 1000:g}s"
+                )
+                self.writestate()
+
+    # whether a failed segment of the given length can be split into shorter ones
+    def can_split(self, camera_id: str, length: int) -> bool:
+        with self._lock:
+            return self._shrink(self._lengths.get(camera_id, self.default_length), length) < length
+
+    # shrink the segment length of the camera below the length of a segment that failed
+    def record_failure(self, camera_id: str, length: int) -> None:
+        with self._lock:
+            self._fast_segments[camera_id] = 0
+            current = self._lengths.get(camera_id, self.default_length)
+            shrunk = self._shrink(current, length)
+            if shrunk != current:
+                self._lengths[camera_id] = shrunk
+                logging.info(f"Reducing segment length of camera {camera_id} to {shrunk / 1000:g}s")
+                self.writestate()
+
+    def _shrink(self, current: int, length: int) -> int:
+        while current >= length and current // 2 >= self.min_length:
+            current //= 2
+        return current
+
+    def _normalize(self, length: int) -> int:
+        # round to the closest length that keeps the segments aligned
+        normalized = self.default_length
+        while normalized > length and normalized // 2 >= self.min_length:
+            normalized //= 2
+        while normalized * 2 <= min(length, self.max_length):
+            normalized *= 2
+        return normalized
@@ -0,0 +1,159 @@
+import statistics
+
+from dataclasses import dataclass
+from dataclasses import field
+from datetime import datetime
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+from protect_archiver.catalog import Catalog
+from protect_archiver.config import Config
+from protect_archiver.indexer import SEGMENT_END_TOLERANCE
+from protect_archiver.timeline import RecordingTimeline
+from protect_archiver.timeline import timestamp_ms
+from protect_archiver.utils import calculate_intervals
+
+
+@dataclass
+class CameraCoverage:
+    camera_id: str
+    camera_name: str
+    # the reported time range, epoch milliseconds with an exclusive end
+    start: int
+    end: int
+    covered: int = 0
+    files: int = 0
+    # time ranges without a (sufficiently large) file, with an exclusive end
+    gaps: List[Tuple[int, int]] = field(default_factory=list)
+    # path, start, end and size of files that are much smaller than the others of the camera
+    undersized: List[Tuple[str, int, int, int]] = field(default_factory=list)
+
+    @property
+    def coverage(self) -> float:
+        return self.covered / (self.end - self.start) if self.end > self.start else 1.0
+
+
+# how much of the time range the archived footage of a camera covers - a segment of the time
+# range, split and aligned like the ones calculate_intervals produces for a download, is credited
+# with the time the files overlap it, and the rest of the segment is a gap, except at the end of
+# the segment for up to SEGMENT_END_TOLERANCE (exports are a little shorter than their segment);
+# files with fewer bytes per second than `undersized_ratio` times the camera's median are
+# reported and do not count as coverage, event clips are left out
+def camera_coverage(
+    catalog: Catalog,
+    camera_id: str,
+    camera_name: str,
+    start: int,
+    end: int,
+    undersized_ratio: float = Config.UNDERSIZED_RATIO,
+) -> CameraCoverage:
+    report = CameraCoverage(camera_id, camera_name, start, end)
+    files = catalog.footage(camera_id, start, end - 1)
+    report.files = len(files)
+
+    # bytes per millisecond of recording
+    rates = [size / (file_end + 1 - file_start) for _, file_start, file_end, size in files]
+    min_rate = undersized_ratio * statistics.median(rates) if rates else 0
+
+    covering = []
+    for (path, file_start, file_end, size), rate in zip(files, rates):
+        if rate < min_rate or size == 0:
+            report.undersized.append((path, file_start, file_end, size))
+        else:
+            covering.append((file_start, file_end + 1))
+    coverage = RecordingTimeline(covering)
+
+    missing = []
+    for segment_start, segment_end in segments(start, end):
+        gaps = coverage.gaps(segment_start, segment_end)
+        if (
+            gaps
+            and gaps[-1][0] > segment_start
+            and segment_end - gaps[-1][0] <= SEGMENT_END_TOLERANCE
+        ):
+            gaps.pop()
+        report.covered += (
+            segment_end - segment_start - sum(gap_end - gap_start for gap_start, gap_end in gaps)
+        )
+        missing.extend(gaps)
+    report.gaps = RecordingTimeline(missing).ranges
+    return report
+
+
+# the segments of a download of the time range, as epoch milliseconds with an exclusive end
+def segments(start: int, end: int) -> List[Tuple[int, int]]:
+    if end <= start:
+        return []
+    return [
+        (round(segment_start.timestamp() * 1000), round(segment_end.timestamp() * 1000) + 1)
+        for segment_start, segment_end in calculate_intervals(
+            datetime.fromtimestamp(start / 1000), datetime.fromtimestamp(end / 1000)
+        )
+    ]
+
+
+# coverage of all cameras in the catalog (or the given ones) between start and end
+def archive_report(
+    catalog: Catalog,
+    start: datetime,
+    end: datetime,
+    camera_ids: Optional[Set[str]] = None,
+    undersized_ratio: float = Config.UNDERSIZED_RATIO,
+) -> List[CameraCoverage]:
+    cameras = catalog.cameras()
+    # files indexed from file names are only known by the end of their camera id, they are
+    # reported with the camera downloaded with the catalog enabled, if there is one
+    full_ids = {camera_id[-4:] for camera_id, _ in cameras if len(camera_id) > 4}
+    cameras = [
+        (camera_id, camera_name)
+        for camera_id, camera_name in cameras
+        if len(camera_id) > 4 or camera_id not in full_ids
+    ]
+    if camera_ids is not None:
+        suffixes = {camera_id[-4:] for camera_id in camera_ids}
+        cameras = [
+            (camera_id, camera_name)
+            for camera_id, camera_name in cameras
+            if camera_id in camera_ids or (len(camera_id) <= 4 and camera_id in suffixes)
+        ]
+
+    return [
+        camera_coverage(
+            catalog,
+            camera_id,
+            camera_name,
+            timestamp_ms(start),
+            timestamp_ms(end),
+            undersized_ratio,
+        )
+        for camera_id, camera_name in cameras
+    ]
+
+
+# the segments to download again to fill the gaps of the report, split and aligned like the
+# ones calculate_intervals produces for a download
+def redownload_plan(report: List[CameraCoverage]) -> List[Dict[str, Any]]:
+    plan = []
+    for camera in report:
+        for gap_start, gap_end in camera.gaps:
+            for interval_start, interval_end in calculate_intervals(
+                datetime.fromtimestamp(gap_start / 1000), datetime.fromtimestamp(gap_end / 1000)
+            ):
+                plan.append(
+                    {
+                        "camera": camera.camera_id,
+                        "name": camera.camera_name,
+                        "start": interval_start,
+                        "end": interval_end,
+                    }
+                )
+    return plan
+
+
+def format_duration(milliseconds: int) -> str:
+    minutes = milliseconds // 60000
+    return f"{minutes // 60}h {minutes % 60:02d}m"
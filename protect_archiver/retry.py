@@ -0,0 +1,150 @@
+import logging
+import random
+import threading
+import time
+
+from typing import Optional
+
+from protect_archiver.config import Config
+
+
+class RetryBudget:
+    """Limits the retries of all downloads to a share of the downloads.
+
+    Every download deposits ``ratio`` tokens and every retry withdraws one; the balance starts
+    at and is capped to ``max_tokens``. While the console fails every request, the workers
+    therefore stop retrying after a few attempts instead of multiplying the load on it.
+    """
+
+    def __init__(
+        self, ratio: float = Config.RETRY_BUDGET_RATIO, max_tokens: int = Config.RETRY_BUDGET_MAX
+    ) -> None:
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = float(max_tokens)
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._tokens = min(self._tokens + self.ratio, self.max_tokens)
+
+    def try_withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class RetryPolicy:
+    """Decides whether and when a failed download is retried.
+
+    Server errors (5xx, 408 and 429), timeouts and connection errors are retried up to
+    ``max_retries`` times, other client errors (4xx) are not. The delay grows exponentially from
+    ``base_delay`` up to ``max_delay`` seconds, with "equal jitter" - a random half of it - so
+    that workers failing at the same time do not retry in lockstep. Retries are also limited
+    by the shared ``budget``, if there is one.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = Config.MAX_RETRIES,
+        base_delay: float = Config.RETRY_BASE_DELAY,
+        max_delay: float = Config.RETRY_MAX_DELAY,
+        budget: Optional[RetryBudget] = None,
+    ) -> None:
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+
+    @staticmethod
+    def is_retryable(status_code: int) -> bool:
+        return status_code >= 500 or status_code in (408, 429)
+
+    # called once per download, before its first attempt
+    def record_download(self) -> None:
+        if self.budget is not None:
+            self.budget.deposit()
+
+    # seconds to wait before retrying after the given number of failed attempts,
+    # or None if the download is not retried again
+    def next_delay(self, attempts: int) -> Optional[float]:
+        if attempts >= self.max_retries:
+            return None
+        if self.budget is not None and not self.budget.try_withdraw():
+            logging.warning("Retry budget exhausted, not retrying")
+            return None
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+
+class CircuitBreaker:
+    """Pauses all downloads while the console is unhealthy.
+
+    After ``threshold`` failed requests in a row (server errors, timeouts and connection
+    errors), the circuit opens: new downloads wait for ``cooldown`` seconds, then a single one
+    is let through to probe the console. If it succeeds, the circuit closes and all downloads
+    continue; otherwise it stays open for twice as long as before (up to ``max_cooldown``).
+    A ``threshold`` of 0 disables the circuit breaker.
+    """
+
+    def __init__(
+        self,
+        threshold: int = Config.CIRCUIT_BREAKER_THRESHOLD,
+        cooldown: float = Config.CIRCUIT_BREAKER_COOLDOWN,
+        max_cooldown: float = Config.CIRCUIT_BREAKER_MAX_COOLDOWN,
+    ) -> None:
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._failures = 0
+        self._open_until: Optional[float] = None
+        self._open_for = cooldown
+        # the thread whose request probes the console while the circuit is open
+        self._probe: Optional[int] = None
+        self._condition = threading.Condition()
+
+    def is_open(self) -> bool:
+        return self._open_until is not None
+
+    # block while the circuit is open, returns once the caller may send a request
+    def wait(self) -> None:
+        if not self.threshold:
+            return
+        with self._condition:
+            while self._open_until is not None:
+                remaining = self._open_until - time.monotonic()
+                if remaining <= 0 and self._probe is None:
+                    self._probe = threading.get_ident()  # this request probes the console
+                    return
+                self._condition.wait(timeout=remaining if remaining > 0 else None)
+
+    # outcome of a request sent after wait() - True if the console responded normally, False if
+    # it failed and None if the request was not completed for other reasons
+    def record(self, healthy: Optional[bool]) -> None:
+        if not self.threshold:
+            return
+        with self._condition:
+            probing = self._probe == threading.get_ident()
+            if probing:
+                self._probe = None
+            if healthy:
+                if self._open_until is not None:
+                    logging.info("The Protect console recovered, resuming downloads")
+                self._failures = 0
+                self._open_until = None
+                self._open_for = self.cooldown
+                self._probe = None
+            elif healthy is False:
+                self._failures += 1
+                # failures of requests sent before the circuit opened do not reopen it
+                if probing or (self._open_until is None and self._failures >= self.threshold):
+                    if probing:
+                        self._open_for = min(self._open_for * 2, self.max_cooldown)
+                    logging.warning(
+                        f"The Protect console failed {self._failures} request(s) in a row,"
+                        f" pausing downloads for {self._open_for:.0f} second(s)"
+                    )
+                    self._open_until = time.monotonic() + self._open_for
+            self._condition.notify_all()
@@ -0,0 +1,87 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+
+from protect_archiver.config import Config
+
+
+class EmptySegmentCache:
+    """Remembers video segments that the console exported without any footage.
+
+    Segments are identified by camera id and the start and end timestamps (in milliseconds)
+    of the export. Entries expire after ``ttl`` seconds, so that footage that shows up late
+    (e.g. from a camera that was offline) is eventually downloaded.
+
+    New entries are appended to ``statefile`` as one JSON object per line, so that adding one
+    never rewrites the whole file. Expired entries, and an incomplete last entry of a process
+    that was killed while writing it, are dropped when the file is loaded.
+    """
+
+    def __init__(
+        self, statefile: Optional[str] = None, ttl: int = Config.EMPTY_SEGMENT_TTL
+    ) -> None:
+        self.statefile = statefile
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._segments: Dict[Tuple[str, int, int], float] = {}
+
+        if statefile is not None and os.path.isfile(statefile):
+            self.load()
+
+    def load(self) -> None:
+        assert self.statefile is not None
+        now = time.time()
+        expired = 0
+        torn = False
+        with open(self.statefile) as fp:
+            for line in fp:
+                # an incomplete last entry would be merged with the next one appended
+                torn = not line.endswith("\n")
+                try:
+                    entry = json.loads(line)
+                    key = (entry["camera"], int(entry["start"]), int(entry["end"]))
+                    recorded_at = float(entry["recorded"])
+                except (ValueError, KeyError, TypeError):
+                    # incomplete last entry of a process that was killed while writing it
+                    continue
+                if now - recorded_at < self.ttl:
+                    self._segments[key] = recorded_at
+                else:
+                    expired += 1
+
+        # compact the file, so that it does not grow forever
+        if expired or torn:
+            logging.debug(
+                f"Dropping {expired} expired and {int(torn)} incomplete entries"
+                f" from {self.statefile}"
+            )
+            tmpfile = f"{self.statefile}.tmp"
+            with open(tmpfile, "w") as fp:
+                for key, recorded_at in self._segments.items():
+                    fp.write(self._entry(key, recorded_at))
+            os.replace(tmpfile, self.statefile)
+
+    def __contains__(self, key: Tuple[str, int, int]) -> bool:
+        with self._lock:
+            recorded_at = self._segments.get(key)
+            return recorded_at is not None and time.time() - recorded_at < self.ttl
+
+    def add(self, key: Tuple[str, int, int]) -> None:
+        with self._lock:
+            recorded_at = time.time()
+            self._segments[key] = recorded_at
+            if self.statefile is not None:
+                with open(self.statefile, "a") as fp:
+                    fp.write(self._entry(key, recorded_at))
+
+    @staticmethod
+    def _entry(key: Tuple[str, int, int], recorded_at: float) -> str:
+        camera_id, start, end = key
+        entry = {"camera": camera_id, "start": start, "end": end, "recorded": recorded_at}
+        return json.dumps(entry) + "\n"
@@ -1,21 +1,46 @@
+import glob
 import json
 import logging
+import os
+import threading
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from datetime import timedelta
 from os import path
+from typing import Any
+from typing import Dict
+from typing import Optional
 
 import dateutil.parser
 
 from .client import ProtectClient
+from .config import Config
 from .downloader import Downloader
+from .timeline import get_recording_timeline
 from .utils import calculate_intervals
 from .utils import json_encode
 
 
 class ProtectSync:
-    def __init__(self, client: ProtectClient, destination_path: str, statefile: str) -> None:
+    def __init__(
+        self,
+        client: ProtectClient,
+        destination_path: str,
+        statefile: str,
+        compact_interval: int = Config.SYNC_COMPACT_INTERVAL,
+    ) -> None:
         self.client = client
         self.statefile = path.abspath(path.join(destination_path, statefile))
+        self.compact_interval = compact_interval
+        self._journal_entries: Dict[str, int] = {}
+        self._stop = threading.Event()
+        self._resume_from_catalog = True
+
+    # append-only log of the checkpoints of one camera written since the last compaction -
+    # every camera has its own journal, so that parallel workers never write to the same file
+    def journalfile(self, camera_id: str) -> str:
+        return f"{self.statefile}.{camera_id}.journal"
 
     def readstate(self) -> dict:
         if path.isfile(self.statefile):
@@ -24,11 +49,87 @@ class ProtectSync:
         else:
             state = {"cameras": {}}
 
+        # replay checkpoints that have not been compacted into the statefile yet
+        for journalfile in sorted(glob.glob(f"{glob.escape(self.statefile)}.*.journal")):
+            entry = self.readjournal(journalfile)
+            if entry is not None:
+                state["cameras"][entry["camera"]] = {
+                    "last": entry["last"],
+                    "name": entry["name"],
+                }
+
         return state
 
+    @staticmethod
+    def readjournal(journalfile: str) -> Optional[dict]:
+        entry = None
+        with open(journalfile) as fp:
+            for line in fp:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # incomplete entry of a process that was killed while writing it
+                    continue
+        return entry
+
+    @staticmethod
+    def truncate_torn_entry(journalfile: str) -> None:
+        # cut off an incomplete last entry, so that the next entry is not appended to it
+        with open(journalfile, "rb+") as fp:
+            content = fp.read()
+            if content and not content.endswith(b"\n"):
+                fp.truncate(content.rfind(b"\n") + 1)
+
     def writestate(self, state: dict) -> None:
-        with open(self.statefile, "w") as fp:
-            json.dump(state, fp, default=json_encode)
+        # write to a temporary file and atomically replace the statefile with it,
+        # so that the statefile is never left truncated if the process gets killed
+        self._replace(self.statefile, json.dumps(state, default=json_encode))
+
+    def checkpoint(self, state: dict, camera: Any, last: datetime) -> None:
+        state["cameras"][camera.id] = {
+            "last": last,
+            "name": camera.name,
+        }
+
+        # commit the progress to disk before the next segment is requested
+        entry = {"camera": camera.id, "last": last, "name": camera.name}
+        journalfile = self.journalfile(camera.id)
+        if camera.id not in self._journal_entries and path.exists(journalfile):
+            self.truncate_torn_entry(journalfile)
+        with open(journalfile, "a") as fp:
+            fp.write(json.dumps(entry, default=json_encode) + "\n")
+            fp.flush()
+            os.fsync(fp.fileno())
+        self._journal_entries[camera.id] = self._journal_entries.get(camera.id, 0) + 1
+
+        if self._journal_entries[camera.id] >= self.compact_interval:
+            self.compact_journal(camera.id)
+
+    def compact_journal(self, camera_id: str) -> None:
+        # shrink the journal of a camera to its latest entry
+        journalfile = self.journalfile(camera_id)
+        entry = self.readjournal(journalfile) if path.exists(journalfile) else None
+        if entry is not None:
+            self._replace(journalfile, json.dumps(entry) + "\n")
+        self._journal_entries[camera_id] = 0
+
+    def compact(self, state: dict) -> None:
+        # replaying the journals on top of the new statefile is harmless,
+        # so a crash between these two steps does not lose or corrupt anything
+        self.writestate(state)
+        for camera_id in state["cameras"]:
+            if path.exists(self.journalfile(camera_id)):
+                os.remove(self.journalfile(camera_id))
+            self._journal_entries[camera_id] = 0
+
+    @staticmethod
+    def _replace(filename: str, content: str) -> None:
+        tmpfile = f"{filename}.tmp"
+        with open(tmpfile, "w") as fp:
+            fp.write(content)
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(tmpfile, filename)
 
     def run(self, camera_list: list, ignore_state: bool = False) -> None:
         # noinspection PyUnboundLocalVariable
@@ -36,37 +137,74 @@ class ProtectSync:
             f"Synchronizing video files from 'https://{self.client.address}:{self.client.port}"
         )
 
+        self._resume_from_catalog = not ignore_state
         if not ignore_state:
             state = self.readstate()
         else:
             state = {"cameras": {}}
-        for camera in camera_list:
-            try:
-                camera_state = state["cameras"].setdefault(camera.id, {})
-                start = (
-                    dateutil.parser.parse(camera_state["last"]).replace(
-                        minute=0, second=0, microsecond=0
-                    )
-                    if "last" in camera_state
-                    else camera.recording_start.replace(minute=0, second=0, microsecond=0)
+            for journalfile in glob.glob(f"{glob.escape(self.statefile)}.*.journal"):
+                os.remove(journalfile)
+
+        # sync all cameras in parallel - the number of simultaneous downloads is limited
+        # globally by the client, so that a slow or failing camera does not hold up the others
+        self._stop.clear()
+        executor = ThreadPoolExecutor(
+            max_workers=max(len(camera_list), 1), thread_name_prefix="sync"
+        )
+        try:
+            futures = [executor.submit(self.sync_camera, state, camera) for camera in camera_list]
+            for future in futures:
+                future.result()
+        except BaseException:
+            # let the workers finish their current segment, then stop
+            self._stop.set()
+            raise
+        finally:
+            executor.shutdown(wait=True)
+            self.compact(state)
+
+    # without a checkpoint, continue after the latest file of the camera in the catalog (e.g. one
+    # rebuilt from an existing archive), or start at the camera's first recording
+    def catalog_start(self, camera: Any) -> datetime:
+        last_end = (
+            self.client.catalog.last_end(camera.id)
+            if self.client.catalog is not None and self._resume_from_catalog
+            else None
+        )
+        if last_end is not None:
+            return datetime.fromtimestamp((last_end + 1) / 1000).replace(
+                minute=0, second=0, microsecond=0
+            )
+        return camera.recording_start.replace(minute=0, second=0, microsecond=0)
+
+    def sync_camera(self, state: dict, camera: Any) -> None:
+        try:
+            camera_state = state["cameras"].setdefault(camera.id, {})
+            # resume right after the last segment that was downloaded successfully
+            start = (
+                (dateutil.parser.parse(camera_state["last"]) + timedelta(milliseconds=1)).replace(
+                    minute=0, second=0, microsecond=0
                 )
-                end = datetime.now().replace(minute=0, second=0, microsecond=0)
-                for interval_start, interval_end in calculate_intervals(start, end):
-                    Downloader.download_footage(
-                        self.client,
-                        interval_start,
-                        interval_end,
-                        camera,
-                        disable_alignment=False,
-                        disable_splitting=False,
-                    )
-                    state["cameras"][camera.id] = {
-                        "last": interval_end,
-                        "name": camera.name,
-                    }
-            except Exception:
-                logging.exception(
-                    f"Failed to sync camera {camera.name} - continuing to next device"
+                if "last" in camera_state
+                else self.catalog_start(camera)
+            )
+            end = datetime.now().replace(minute=0, second=0, microsecond=0)
+            # fetched once for the whole range, intervals without footage are skipped right away
+            timeline = get_recording_timeline(self.client, camera, start, end)
+            for interval_start, interval_end in calculate_intervals(start, end):
+                if self._stop.is_set():
+                    return
+                Downloader.download_footage(
+                    self.client,
+                    interval_start,
+                    interval_end,
+                    camera,
+                    disable_alignment=False,
+                    disable_splitting=False,
+                    timeline=timeline,
                 )
-            finally:
-                self.writestate(state)
+                self.checkpoint(state, camera, interval_end)
+        except Exception:
+            logging.exception(f"Failed to sync camera {camera.name} - continuing to next device")
+        finally:
+            self.compact_journal(camera.id)
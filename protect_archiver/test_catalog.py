@@ -0,0 +1,84 @@
+import os
+import sqlite3
+
+from .catalog import Catalog
+
+
+def test_catalog_records_files(test_output_dest: str) -> None:
+    catalog = Catalog(os.path.join(test_output_dest, "catalog.sqlite3"), test_output_dest)
+    filename = os.path.join(test_output_dest, "2020/01/08/Exterior (raId)/Exterior (raId) - 1.mp4")
+    catalog.add(filename, "exteriorCameraId", 0, 3599999, 320, "ab" * 32, 1.5)
+    catalog.add(os.path.join(test_output_dest, "2.mp4"), "exteriorCameraId", 3600000, 7199999, 0)
+    catalog.close()
+
+    catalog = Catalog(os.path.join(test_output_dest, "catalog.sqlite3"), test_output_dest)
+    assert filename in catalog
+    assert os.path.join(test_output_dest, "3.mp4") not in catalog
+    assert catalog.last_end("exteriorCameraId") == 7199999
+    assert catalog.last_end("testCameraId") is None
+    assert catalog.files("exteriorCameraId", 3599999, 3600000) == [
+        ("2020/01/08/Exterior (raId)/Exterior (raId) - 1.mp4", 0, 3599999, 320),
+        ("2.mp4", 3600000, 7199999, 0),
+    ]
+
+    catalog.remove(filename)
+    assert filename not in catalog
+
+
+def test_catalog_records_event_ids(test_output_dest: str) -> None:
+    catalog = Catalog(os.path.join(test_output_dest, "catalog.sqlite3"), test_output_dest)
+    clip = os.path.join(test_output_dest, "Exterior (raId) - clip.mp4")
+    catalog.add(clip, "exteriorCameraId", 0, 20000, 320, event_ids=("e2", "e1"))
+    catalog.add(os.path.join(test_output_dest, "other.mp4"), "exteriorCameraId", 0, 5000, 10)
+
+    assert catalog.event_ids(clip) == ["e1", "e2"]
+    assert catalog.event_files("e2") == ["Exterior (raId) - clip.mp4"]
+    # an event clip found by the indexer, without event ids
+    catalog.load(
+        [
+            (
+                "indexed.mp4",
+                "exteriorCameraId",
+                "Exterior (raId)",
+                0,
+                9999,
+                10,
+                None,
+                None,
+                None,
+                True,
+            )
+        ]
+    )
+    assert catalog.footage("exteriorCameraId", 0, 5000) == [("other.mp4", 0, 5000, 10)]
+
+    # downloading the clip again replaces the event ids
+    catalog.add(clip, "exteriorCameraId", 0, 30000, 480, event_ids=("e2", "e3"))
+    assert catalog.event_ids(clip) == ["e2", "e3"]
+    assert catalog.event_files("e1") == []
+
+    catalog.remove(clip)
+    assert catalog.event_files("e2") == []
+
+
+def test_catalog_marks_event_clips_of_older_catalogs(test_output_dest: str) -> None:
+    filename = os.path.join(test_output_dest, "catalog.sqlite3")
+    db = sqlite3.connect(filename)
+    db.executescript(
+        """
+        CREATE TABLE files (
+            path TEXT PRIMARY KEY, camera_id TEXT NOT NULL, camera_name TEXT NOT NULL,
+            start INTEGER NOT NULL, end INTEGER NOT NULL, size INTEGER NOT NULL, sha256 TEXT,
+            download_duration REAL, downloaded_at REAL
+        );
+        CREATE TABLE file_events (path TEXT NOT NULL, event_id TEXT NOT NULL);
+        INSERT INTO files VALUES ('hour.mp4', 'cameraA', 'A', 0, 3599999, 10, NULL, NULL, NULL);
+        INSERT INTO files VALUES ('clip.mp4', 'cameraA', 'A', 5000, 9999, 10, NULL, NULL, NULL);
+        INSERT INTO file_events VALUES ('clip.mp4', 'e1');
+        """
+    )
+    db.close()
+
+    catalog = Catalog(filename, test_output_dest)
+    rows = catalog._db.execute("SELECT path, event_clip FROM files ORDER BY path").fetchall()
+    assert rows == [("clip.mp4", 1), ("hour.mp4", 0)]
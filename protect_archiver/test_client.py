@@ -1,12 +1,32 @@
+import hashlib
+import json
 import os
+import threading
+import time
+import urllib.parse
 
 from datetime import datetime
+from datetime import timedelta
 from datetime import timezone
 from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
 
 import pytest
 
+from responses import matchers
+
+from protect_archiver.client import ProtectClient
+from protect_archiver.config import Config
+from protect_archiver.dataclasses import Camera
+from protect_archiver.dataclasses import MotionEvent
 from protect_archiver.downloader import Downloader
+from protect_archiver.downloader.cut_motion_event import plan_clip
+from protect_archiver.downloader.get_motion_event_list import get_motion_event_list
+from protect_archiver.planner import SegmentPlanner
+from protect_archiver.test_mp4 import make_mp4
+from protect_archiver.test_mp4 import read_samples
 
 
 @pytest.fixture(autouse=True)
@@ -39,6 +59,8 @@ def test_get_camera_list(client: Any) -> None:
     assert results[0].id == "exteriorCameraId"
     assert results[0].name == "Exterior"
     assert results[0].recording_start == datetime(2020, 1, 8, 23, 26, 9, 586000)
+    assert results[0].recording_end == datetime(2020, 2, 8, 0, 37, 15, 69000)
+    assert results[0].recording_mode == "always"
 
     assert results[1].id == "testCameraId"
     assert results[1].name == "Test"
@@ -49,6 +71,84 @@ def test_get_camera_list(client: Any) -> None:
     assert results[2].recording_start == datetime.min
 
 
+def test_get_camera_list_is_cached(
+    responses: Any, sample_bootstrap_json: Any, test_output_dest: Any, monkeypatch: Any
+) -> None:
+    bootstrap = responses.add(
+        responses.GET,
+        "https://unifi:443/proxy/protect/api/bootstrap",
+        json=sample_bootstrap_json,
+    )
+    cache_dir = os.path.join(test_output_dest, "cache")
+
+    def get_camera_list(**kwargs: Any) -> Any:
+        client = ProtectClient(
+            destination_path=test_output_dest,
+            password="test",
+            camera_cache_ttl=60,
+            cache_dir=cache_dir,
+            **kwargs,
+        )
+        return client.get_camera_list()
+
+    assert [camera.id for camera in get_camera_list()][0] == "exteriorCameraId"
+    assert bootstrap.call_count == 1
+    with open(os.path.join(cache_dir, "unifi-443.json")) as fp:
+        assert json.load(fp)["nvr"]["name"] == "Home"
+
+    # a later run neither logs in nor requests the camera list
+    calls = len(responses.calls)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 30)
+    cameras = get_camera_list()
+    assert len(responses.calls) == calls
+    assert cameras[0].name == "Exterior"
+    # the camera may have recorded since the list was cached
+    assert cameras[0].recording_end > datetime(2020, 2, 8, 0, 37, 15, 69000) + timedelta(seconds=29)
+
+    get_camera_list(refresh_camera_cache=True)
+    assert bootstrap.call_count == 2
+
+    # the refreshed list expires a minute after it was fetched
+    monkeypatch.setattr(time, "time", lambda: now + 91)
+    get_camera_list()
+    assert bootstrap.call_count == 3
+
+
+def test_get_camera_list_without_cameras_in_bootstrap(
+    responses: Any, sample_bootstrap_json: Any, test_output_dest: Any
+) -> None:
+    responses.add(
+        responses.GET,
+        "https://unifi:443/proxy/protect/api/bootstrap",
+        json={"nvr": sample_bootstrap_json["nvr"]},
+    )
+    responses.add(
+        responses.GET,
+        "https://unifi:443/proxy/protect/api/cameras",
+        json=sample_bootstrap_json["cameras"],
+    )
+    client = ProtectClient(
+        destination_path=test_output_dest,
+        password="test",
+        camera_cache_ttl=60,
+        cache_dir=os.path.join(test_output_dest, "cache"),
+    )
+
+    assert [camera.id for camera in client.get_camera_list()][0] == "exteriorCameraId"
+
+
+def test_http_session_is_shared(client: Any) -> None:
+    assert client.session.http_session is client.http_session
+    assert client.http_session.get_adapter("https://unifi")._pool_maxsize == Config.HTTP_POOL_SIZE
+
+    client.get_camera_list()
+
+    # the login cookie must not be stored in the shared session, the token is passed explicitly
+    assert len(client.http_session.cookies) == 0
+    assert client.session.get_api_token() == "token.token.token"
+
+
 def test_download_footage(
     responses: Any, client: Any, sample_camera: Any, test_output_dest: Any
 ) -> None:
@@ -94,3 +194,605 @@ def test_download_footage(
             "e1d02d3942f029bec370e7d12bd62bec347b373c66bccced3a1071fc69cef311"
             "d19e46501c94273a42fb72f694ddbf1fcb22c257970b206e981dab011915aa42"
         )
+
+
+def test_increment_is_thread_safe(client: Any) -> None:
+    def work() -> None:
+        for _ in range(1000):
+            client.increment("bytes_downloaded", 2)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert client.bytes_downloaded == 16000
+
+
+def test_download_footage_concurrent(
+    responses: Any, client: Any, sample_camera: Any, test_output_dest: Any
+) -> None:
+    other_camera = Camera(
+        id="testCameraId", name="Test", recording_start=datetime(2019, 10, 20, 18, 0, 0)
+    )
+    for camera_id in ("exteriorCameraId", "testCameraId"):
+        for start_ms, end_ms in ((1578524400000, 1578527999999), (1578528000000, 1578531599999)):
+            responses.add(
+                responses.GET,
+                f"https://unifi:443/proxy/protect/api/video/export?camera={camera_id}"
+                f"&start={start_ms}&end={end_ms}",
+                body=camera_id * 40,
+                headers={"Content-Type": "video/mp4", "Content-Length": str(len(camera_id) * 40)},
+            )
+
+    start = datetime(2020, 1, 8, 23, 0, 0, tzinfo=timezone.utc)
+    end = datetime(2020, 1, 9, 1, 0, 0, tzinfo=timezone.utc)
+
+    Downloader.download_footage_concurrent(
+        client, start, end, [sample_camera, other_camera], concurrency=3
+    )
+
+    assert client.files_downloaded == 4
+    assert sorted(os.listdir(test_output_dest)) == [
+        "Exterior (raId) - 2020-01-08 - 23.00.00+0000.mp4",
+        "Exterior (raId) - 2020-01-09 - 00.00.00+0000.mp4",
+        "Test (raId) - 2020-01-08 - 23.00.00+0000.mp4",
+        "Test (raId) - 2020-01-09 - 00.00.00+0000.mp4",
+    ]
+
+
+def test_download_footage_prefetched(
+    responses: Any, client: Any, sample_camera: Any, test_output_dest: Any
+) -> None:
+    client.prefetch_depth = 2
+    client.export_limiter.set_limit(3)
+    for start_ms in (1578524400000, 1578528000000, 1578531600000):
+        responses.add(
+            responses.GET,
+            f"https://unifi:443/proxy/protect/api/video/export?camera=exteriorCameraId"
+            f"&start={start_ms}&end={start_ms + 3599999}",
+            body=str(start_ms) * 40,
+            headers={"Content-Type": "video/mp4"},
+        )
+
+    start = datetime(2020, 1, 8, 23, 0, 0, tzinfo=timezone.utc)
+    end = datetime(2020, 1, 9, 2, 0, 0, tzinfo=timezone.utc)
+
+    Downloader.download_footage(client, start, end, sample_camera)
+
+    assert client.files_downloaded == 3
+    assert len(os.listdir(test_output_dest)) == 3
+    # every prefetched request gave back its slot
+    assert client.export_limiter.active == 0
+
+
+def test_download_footage_bisects_failing_segments(
+    responses: Any, sample_camera: Any, test_output_dest: Any, monkeypatch: Any
+) -> None:
+    monkeypatch.setattr("time.sleep", lambda seconds: None)
+    client = ProtectClient(
+        destination_path=test_output_dest, password="test", adaptive_segments=True
+    )
+    export_uri = "https://unifi:443/proxy/protect/api/video/export?camera=exteriorCameraId"
+
+    # the full hour always fails, both halves of it can be exported
+    responses.add(responses.GET, f"{export_uri}&start=1578524400000&end=1578527999999", status=500)
+    for start_ms in (1578524400000, 1578526200000):
+        responses.add(
+            responses.GET,
+            f"{export_uri}&start={start_ms}&end={start_ms + 1799999}",
+            body=str(start_ms) * 40,
+            headers={"Content-Type": "video/mp4"},
+        )
+
+    start = datetime(2020, 1, 8, 23, 0, 0, tzinfo=timezone.utc)
+    end = datetime(2020, 1, 9, 0, 0, 0, tzinfo=timezone.utc)
+
+    Downloader.download_footage(client, start, end, sample_camera)
+
+    assert sorted(os.listdir(test_output_dest)) == [
+        "Exterior (raId) - 2020-01-08 - 23.00.00+0000.mp4",
+        "Exterior (raId) - 2020-01-08 - 23.30.00+0000.mp4",
+        "segments.state",
+    ]
+    assert client.files_downloaded == 2
+    # the next run starts with the shorter segments right away
+    statefile = os.path.join(test_output_dest, "segments.state")
+    assert SegmentPlanner(statefile).length("exteriorCameraId") == 1800_000
+
+
+# prefetching does not bypass the split exports
+@pytest.mark.parametrize("prefetch_depth", [0, 1])
+def test_download_footage_split_exports(
+    responses: Any, client: Any, sample_camera: Any, test_output_dest: Any, prefetch_depth: int
+) -> None:
+    client.split_exports = 2
+    client.prefetch_depth = prefetch_depth
+    export_uri = "https://unifi:443/proxy/protect/api/video/export?camera=exteriorCameraId"
+    parts = [[b"a" * 400, b"b" * 300], [b"c" * 500]]
+    for (start_ms, end_ms), samples in zip(
+        ((1578524400000, 1578526199999), (1578526200000, 1578527999999)), parts
+    ):
+        make_mp4(os.path.join(test_output_dest, "part.mp4"), samples, [1])
+        with open(os.path.join(test_output_dest, "part.mp4"), "rb") as fp:
+            responses.add(
+                responses.GET,
+                f"{export_uri}&start={start_ms}&end={end_ms}",
+                body=fp.read(),
+                headers={"Content-Type": "video/mp4"},
+            )
+    os.remove(os.path.join(test_output_dest, "part.mp4"))
+
+    start = datetime(2020, 1, 8, 23, 0, 0, tzinfo=timezone.utc)
+    end = datetime(2020, 1, 9, 0, 0, 0, tzinfo=timezone.utc)
+
+    Downloader.download_footage(client, start, end, sample_camera)
+
+    filename = "Exterior (raId) - 2020-01-08 - 23.00.00+0000.mp4"
+    assert os.listdir(test_output_dest) == [filename]
+    assert read_samples(os.path.join(test_output_dest, filename)) == parts[0] + parts[1]
+    assert client.files_downloaded == 1
+
+
+def test_download_footage_split_exports_falls_back_to_single_export(
+    responses: Any, client: Any, sample_camera: Any, test_output_dest: Any
+) -> None:
+    client.split_exports = 2
+    export_uri = "https://unifi:443/proxy/protect/api/video/export?camera=exteriorCameraId"
+    # parts that are no MP4 files cannot be joined
+    for start_ms, end_ms in ((1578524400000, 1578526199999), (1578526200000, 1578527999999)):
+        responses.add(
+            responses.GET,
+            f"{export_uri}&start={start_ms}&end={end_ms}",
+            body=b"\1" * 400,
+            headers={"Content-Type": "video/mp4"},
+        )
+    responses.add(
+        responses.GET,
+        f"{export_uri}&start=1578524400000&end=1578527999999",
+        body=b"\2" * 1000,
+        headers={"Content-Type": "video/mp4"},
+    )
+
+    start = datetime(2020, 1, 8, 23, 0, 0, tzinfo=timezone.utc)
+    end = datetime(2020, 1, 9, 0, 0, 0, tzinfo=timezone.utc)
+
+    Downloader.download_footage(client, start, end, sample_camera)
+
+    assert os.listdir(test_output_dest) == ["Exterior (raId) - 2020-01-08 - 23.00.00+0000.mp4"]
+    assert client.files_downloaded == 1
+    assert client.bytes_downloaded == 1000
+
+
+def test_download_footage_split_exports_takes_back_failed_parts(
+    responses: Any, client: Any, sample_camera: Any, test_output_dest: Any
+) -> None:
+    client.split_exports = 2
+    client.ignore_failed_downloads = True
+    export_uri = "https://unifi:443/proxy/protect/api/video/export?camera=exteriorCameraId"
+    # a part that fails and a part without footage
+    responses.add(responses.GET, f"{export_uri}&start=1578524400000&end=1578526199999", status=404)
+    responses.add(
+        responses.GET,
+        f"{export_uri}&start=1578526200000&end=1578527999999",
+        body=b"\1" * 100,
+        headers={"Content-Type": "video/mp4"},
+    )
+    responses.add(
+        responses.GET,
+        f"{export_uri}&start=1578524400000&end=1578527999999",
+        body=b"\2" * 1000,
+        headers={"Content-Type": "video/mp4"},
+    )
+
+    start = datetime(2020, 1, 8, 23, 0, 0, tzinfo=timezone.utc)
+    end = datetime(2020, 1, 9, 0, 0, 0, tzinfo=timezone.utc)
+
+    Downloader.download_footage(client, start, end, sample_camera)
+
+    assert os.listdir(test_output_dest) == ["Exterior (raId) - 2020-01-08 - 23.00.00+0000.mp4"]
+    assert client.files_downloaded == 1
+    assert client.bytes_downloaded == 1000
+    assert client.files_failed == 0
+    assert client.files_skipped == 0
+
+
+def test_download_footage_remembers_empty_segments(
+    responses: Any, sample_camera: Any, test_output_dest: Any
+) -> None:
+    client = ProtectClient(destination_path=test_output_dest, password="test", empty_segment_ttl=60)
+    export = responses.add(
+        responses.GET,
+        "https://unifi:443/proxy/protect/api/video/export?camera=exteriorCameraId"
+        "&start=1578524400000&end=1578527999999",
+        body=b"\0" * 100,
+        headers={"Content-Type": "video/mp4"},
+    )
+    start = datetime(2020, 1, 8, 23, 0, 0, tzinfo=timezone.utc)
+    end = datetime(2020, 1, 9, 0, 0, 0, tzinfo=timezone.utc)
+
+    Downloader.download_footage(client, start, end, sample_camera)
+    assert export.call_count == 1
+
+    # a later run does not request the empty segment again
+    rerun_client = ProtectClient(
+        destination_path=test_output_dest, password="test", empty_segment_ttl=60
+    )
+    Downloader.download_footage(rerun_client, start, end, sample_camera)
+    assert export.call_count == 1
+    assert rerun_client.files_skipped == 1
+    assert rerun_client.requests_saved == 1
+
+
+def test_download_footage_is_recorded_in_catalog(
+    responses: Any, sample_camera: Any, test_output_dest: Any
+) -> None:
+    export = responses.add(
+        responses.GET,
+        "https://unifi:443/proxy/protect/api/video/export?camera=exteriorCameraId"
+        "&start=1578524400000&end=1578527999999",
+        body=b"\1" * 320,
+        headers={"Content-Type": "video/mp4"},
+    )
+    client = ProtectClient(destination_path=test_output_dest, password="test", use_catalog=True)
+    start = datetime(2020, 1, 8, 23, 0, 0, tzinfo=timezone.utc)
+    end = datetime(2020, 1, 9, 0, 0, 0, tzinfo=timezone.utc)
+
+    Downloader.download_footage(client, start, end, sample_camera)
+
+    assert client.catalog is not None
+    (row,) = client.catalog._db.execute("SELECT * FROM files").fetchall()
+    path, camera_id, camera_name, row_start, row_end, size, sha256, _, _, event_clip = row
+    assert path == "Exterior (raId) - 2020-01-08 - 23.00.00+0000.mp4"
+    assert (camera_id, camera_name) == ("exteriorCameraId", "Exterior (raId)")
+    assert (row_start, row_end, size) == (1578524400000, 1578527999999, 320)
+    assert sha256 == hashlib.sha256(b"\1" * 320).hexdigest()
+    assert not event_clip
+
+    # existing files are looked up in the catalog
+    rerun_client = ProtectClient(
+        destination_path=test_output_dest,
+        password="test",
+        use_catalog=True,
+        skip_existing_files=True,
+    )
+    Downloader.download_footage(rerun_client, start, end, sample_camera)
+    assert export.call_count == 1
+    assert rerun_client.files_skipped == 1
+
+
+def test_download_merged_motion_event_records_event_ids(
+    responses: Any, sample_camera: Any, test_output_dest: Any
+) -> None:
+    client = ProtectClient(
+        destination_path=test_output_dest,
+        password="test",
+        use_catalog=True,
+        use_subfolders=False,
+        use_utc_filenames=True,
+    )
+    start = datetime.fromtimestamp(1578524400, timezone.utc)
+    clip = MotionEvent(
+        id="event1",
+        start=start,
+        end=start + timedelta(seconds=20),
+        camera_id="exteriorCameraId",
+        score=90,
+        thumbnail_id="e-event1",
+        heatmap_id="e-event1",
+        event_ids=("event1", "event2"),
+    )
+    responses.add(
+        responses.GET,
+        "https://unifi:443/proxy/protect/api/video/export?camera=exteriorCameraId"
+        "&start=1578524400000&end=1578524420000",
+        body=b"\1" * 320,
+        headers={"Content-Type": "video/mp4"},
+    )
+
+    Downloader.download_motion_event(client, clip, sample_camera, False)
+
+    assert client.catalog is not None
+    assert client.catalog.event_files("event2") == [
+        "Exterior (raId) - 2020-01-08 - 23.00.00+0000.mp4"
+    ]
+
+
+# the archived file is recorded as it is, and as lasting longer than it does
+@pytest.mark.parametrize("archived_end", [999, 1999])
+def test_download_motion_event_cuts_archived_footage(
+    responses: Any, sample_camera: Any, test_output_dest: Any, archived_end: int
+) -> None:
+    client = ProtectClient(
+        destination_path=test_output_dest,
+        password="test",
+        events_from_archive=True,
+        use_subfolders=False,
+        use_utc_filenames=True,
+    )
+    base = 1578524400000
+    # one second of archived footage with 30 samples and a keyframe every 10 samples, and
+    # the export of the half second after it, which is not archived
+    archived = [bytes([i]) * (100 + i) for i in range(30)]
+    exported = [bytes([i]) * (200 + i) for i in range(15)]
+    make_mp4(os.path.join(test_output_dest, "archived.mp4"), archived, [1, 11, 21])
+    make_mp4(os.path.join(test_output_dest, "exported.mp4"), exported, [1])
+    assert client.catalog is not None
+    client.catalog.add(
+        os.path.join(test_output_dest, "archived.mp4"),
+        "exteriorCameraId",
+        base,
+        base + archived_end,
+        0,
+    )
+    with open(os.path.join(test_output_dest, "exported.mp4"), "rb") as fp:
+        responses.add(
+            responses.GET,
+            "https://unifi:443/proxy/protect/api/video/export?camera=exteriorCameraId"
+            f"&start={base + 1000}&end={base + 1499}",
+            body=fp.read(),
+            headers={"Content-Type": "video/mp4"},
+        )
+    start = datetime.fromtimestamp(base / 1000, timezone.utc)
+    event = MotionEvent(
+        id="event1",
+        start=start + timedelta(milliseconds=500),
+        end=start + timedelta(milliseconds=1499),
+        camera_id="exteriorCameraId",
+        score=90,
+        thumbnail_id="e-event1",
+        heatmap_id="e-event1",
+    )
+
+    Downloader.download_motion_event(client, event, sample_camera, False)
+
+    # the clip begins at the keyframe before its start (sample 15 is at 0.5s)
+    filename = os.path.join(test_output_dest, "Exterior (raId) - 2020-01-08 - 23.00.00+0000.mp4")
+    assert read_samples(filename) == archived[10:] + exported
+    assert client.files_cut == 1
+    assert client.files_downloaded == 0
+    assert client.catalog.event_ids(filename) == ["event1"]
+    assert sorted(os.listdir(test_output_dest)) == [
+        "Exterior (raId) - 2020-01-08 - 23.00.00+0000.mp4",
+        "archived.mp4",
+        Config.CATALOG_FILE,
+        "exported.mp4",
+    ]
+
+
+def test_download_motion_event_on_the_hour_keeps_archived_footage(
+    sample_camera: Any, test_output_dest: Any
+) -> None:
+    client = ProtectClient(
+        destination_path=test_output_dest,
+        password="test",
+        events_from_archive=True,
+        use_subfolders=False,
+        use_utc_filenames=True,
+    )
+    base = 1578524400000
+    archived = [bytes([i]) * (100 + i) for i in range(30)]
+    hourly = os.path.join(test_output_dest, "Exterior (raId) - 2020-01-08 - 23.00.00+0000.mp4")
+    make_mp4(hourly, archived, [1, 11, 21])
+    assert client.catalog is not None
+    client.catalog.add(hourly, "exteriorCameraId", base, base + 999, 0)
+    start = datetime.fromtimestamp(base / 1000, timezone.utc)
+    event = MotionEvent(
+        id="event1",
+        start=start,
+        end=start + timedelta(milliseconds=499),
+        camera_id="exteriorCameraId",
+        score=90,
+        thumbnail_id="e-event1",
+        heatmap_id="e-event1",
+    )
+
+    Downloader.download_motion_event(client, event, sample_camera, False)
+
+    clip = os.path.join(
+        test_output_dest, "Exterior (raId) - 2020-01-08 - 23.00.00+0000 - event.mp4"
+    )
+    assert read_samples(clip) == archived[:15]
+    assert read_samples(hourly) == archived
+    assert client.catalog.is_footage(hourly)
+    assert client.catalog.event_ids(clip) == ["event1"]
+
+
+def test_plan_clip_downloads_only_missing_ranges() -> None:
+    files = [("a.mp4", 0, 999), ("b.mp4", 500, 1999), ("c.mp4", 3000, 3999)]
+
+    assert plan_clip(files, 200, 3499) == [
+        ("a.mp4", 200, 999),
+        ("b.mp4", 1000, 1999),
+        (None, 2000, 2999),
+        ("c.mp4", 3000, 3499),
+    ]
+    assert plan_clip(files, 4000, 4999) == [(None, 4000, 4999)]
+
+
+def test_download_file_resumes_with_range_request(
+    responses: Any, client: Any, monkeypatch: Any, test_output_dest: Any
+) -> None:
+    monkeypatch.setattr("time.sleep", lambda seconds: None)
+    # a broken connection loses the incomplete chunk that was being read
+    client.download_chunk_size = 64
+    uri = "https://unifi:443/proxy/protect/api/video/export?camera=exteriorCameraId&start=0&end=1"
+    body = bytes(range(256)) * 2
+
+    # connection breaks after the first half of the file
+    responses.add(
+        responses.GET,
+        uri,
+        body=body[:256],
+        headers={"Content-Length": str(len(body))},
+        auto_calculate_content_length=False,
+    )
+    responses.add(
+        responses.GET,
+        uri,
+        body=body[256:],
+        status=206,
+        headers={"Content-Range": f"bytes 256-{len(body) - 1}/{len(body)}"},
+        match=[matchers.header_matcher({"Range": "bytes=256-"})],
+    )
+
+    filename = os.path.join(test_output_dest, "resumed.mp4")
+    Downloader.download_file(
+        client, "/video/export?camera=exteriorCameraId&start=0&end=1", filename
+    )
+
+    with open(filename, "rb") as fp:
+        assert fp.read() == body
+    assert not os.path.exists(f"{filename}.part")
+    assert client.files_downloaded == 1
+    assert client.bytes_downloaded == len(body)
+
+
+def test_download_file_restarts_when_range_is_rejected(
+    responses: Any, client: Any, monkeypatch: Any, test_output_dest: Any
+) -> None:
+    monkeypatch.setattr("time.sleep", lambda seconds: None)
+    client.download_chunk_size = 64
+    uri = "https://unifi:443/proxy/protect/api/video/export?camera=exteriorCameraId&start=0&end=1"
+    body = bytes(range(256)) * 2
+
+    # connection breaks after the first half of the file, the export has changed since
+    responses.add(
+        responses.GET,
+        uri,
+        body=body[:256],
+        headers={"Content-Length": str(len(body))},
+        auto_calculate_content_length=False,
+    )
+    responses.add(
+        responses.GET,
+        uri,
+        status=416,
+        match=[matchers.header_matcher({"Range": "bytes=256-"})],
+    )
+    responses.add(responses.GET, uri, body=body)
+
+    filename = os.path.join(test_output_dest, "restarted.mp4")
+    assert Downloader.download_file(
+        client, "/video/export?camera=exteriorCameraId&start=0&end=1", filename
+    )
+
+    with open(filename, "rb") as fp:
+        assert fp.read() == body
+    assert "Range" not in responses.calls[-1].request.headers
+    assert client.files_downloaded == 1
+    assert client.files_failed == 0
+
+
+def test_download_file_retries_server_errors_only(
+    responses: Any, client: Any, monkeypatch: Any, test_output_dest: Any
+) -> None:
+    delays: List[float] = []
+    monkeypatch.setattr("time.sleep", delays.append)
+    query = "/video/export?camera=exteriorCameraId&start=0&end=1"
+    uri = f"https://unifi:443/proxy/protect/api{query}"
+
+    # the console is restarting, then the export succeeds
+    responses.add(responses.GET, uri, status=503)
+    responses.add(responses.GET, uri, body=b"x" * 1000, headers={"Content-Type": "video/mp4"})
+    filename = os.path.join(test_output_dest, "retried.mp4")
+    assert Downloader.download_file(client, query, filename)
+    assert client.files_downloaded == 1
+    assert len(delays) == 1 and 1.5 <= delays[0] <= 3
+
+    # a client error is not retried
+    responses.replace(responses.GET, uri, status=404)
+    filename = os.path.join(test_output_dest, "missing.mp4")
+    assert not Downloader.download_file(client, query, filename)
+    assert client.files_failed == 1
+    assert len(delays) == 1
+    assert not os.path.exists(filename)
+
+
+def add_events_endpoint(responses: Any, events: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    queries: List[Dict[str, str]] = []
+
+    # returns the events overlapping the requested time range, like the console does
+    def callback(request: Any) -> Any:
+        query = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(request.url).query))
+        queries.append(query)
+        body = [
+            event
+            for event in events
+            if event["start"] <= int(query["end"])
+            and (event["end"] or event["start"]) >= int(query["start"])
+        ]
+        return 200, {}, json.dumps(body)
+
+    responses.add_callback(
+        responses.GET, "https://unifi:443/proxy/protect/api/events", callback=callback
+    )
+    return queries
+
+
+def make_event(event_id: str, camera: str, start: int, end: Optional[int]) -> Dict[str, Any]:
+    return {
+        "id": event_id,
+        "camera": camera,
+        "start": start,
+        "end": end,
+        "score": 50,
+        "thumbnail": f"e-{event_id}",
+        "heatmap": f"e-{event_id}",
+    }
+
+
+def test_get_motion_event_list_in_windows_per_camera(responses: Any, client: Any) -> None:
+    hour = 3600_000
+    base = 1578524400000  # 2020-01-08 23:00 UTC
+    queries = add_events_endpoint(
+        responses,
+        [
+            make_event("a1", "cameraA", base + 1000, base + 5000),
+            # spans the border of the first two windows
+            make_event("b1", "cameraB", base + hour - 1000, base + hour + 1000),
+            make_event("a2", "cameraA", base + hour + 500, base + hour + 2000),
+            make_event("b2", "cameraB", base + 2 * hour + 10, base + 2 * hour + 20),
+            make_event("a3", "cameraA", base + 2 * hour + 5, None),  # still ongoing
+        ],
+    )
+    cameras = [
+        Camera(id=camera_id, name=camera_id, recording_start=datetime.min)
+        for camera_id in ("cameraA", "cameraB")
+    ]
+    client.event_list_window = 3600
+    client.event_list_per_camera = True
+
+    start = datetime.fromtimestamp(base / 1000, timezone.utc)
+    events = list(client.get_motion_event_list(start, start + timedelta(hours=3), cameras))
+
+    assert [event.id for event in events] == ["a1", "b1", "a2", "b2"]
+    assert len(queries) == 6
+    assert {(q["start"], q["end"], q["cameras"]) for q in queries} == {
+        (str(base + i * hour), str(base + (i + 1) * hour - 1), camera_id)
+        for i in range(3)
+        for camera_id in ("cameraA", "cameraB")
+    }
+
+
+def test_get_motion_event_list_is_incremental(responses: Any, sample_camera: Any) -> None:
+    base = 1578524400000
+    queries = add_events_endpoint(
+        responses,
+        [
+            make_event(f"e{i}", "exteriorCameraId", base + i * 60_000, base + i * 60_000 + 10)
+            for i in range(24)
+        ],
+    )
+    start = datetime.fromtimestamp(base / 1000, timezone.utc)
+
+    session = ProtectClient(password="test").session
+    events = get_motion_event_list(
+        session, start, start + timedelta(days=1), [sample_camera], window=600, workers=1
+    )
+    # with a single worker, nothing beyond the first window has been requested yet
+    assert next(events).id == "e0"
+    assert len(queries) == 1
+    assert [event.id for event in events] == [f"e{i}" for i in range(1, 24)]
+    assert len(queries) == 144
@@ -0,0 +1,130 @@
+import os
+import threading
+import tracemalloc
+
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from typing import Any
+from typing import Iterator
+
+import pytest
+import requests
+
+from urllib3.exceptions import SSLError
+
+from protect_archiver.client import ProtectClient
+from protect_archiver.downloader import Downloader
+from protect_archiver.downloader.write_behind import preallocate
+from protect_archiver.downloader.write_behind import write_behind
+
+
+BODY_CHUNK = bytes(range(256)) * 4096  # 1 MiB
+BODY_CHUNKS = 64
+
+
+class ChunkedExportHandler(BaseHTTPRequestHandler):
+    """Stand-in for the console's export endpoint, sends a large body with or without length."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        if "with-length" in self.path:
+            self.send_header("Content-Length", str(len(BODY_CHUNK) * BODY_CHUNKS))
+            self.end_headers()
+            for _ in range(BODY_CHUNKS):
+                self.wfile.write(BODY_CHUNK)
+            return
+
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for _ in range(BODY_CHUNKS):
+            self.wfile.write(f"{len(BODY_CHUNK):x}\r\n".encode() + BODY_CHUNK + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+@pytest.fixture
+def export_server() -> Iterator[str]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ChunkedExportHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.fixture
+def local_client(export_server: str, test_output_dest: str) -> ProtectClient:
+    client = ProtectClient(
+        destination_path=test_output_dest, password="test", download_chunk_size=256 * 1024
+    )
+    client.session.authority = export_server
+    client.session._api_token = "token"
+    return client
+
+
+def test_download_without_content_length_is_streamed(
+    local_client: ProtectClient, test_output_dest: str
+) -> None:
+    filename = os.path.join(test_output_dest, "large.mp4")
+
+    tracemalloc.start()
+    try:
+        Downloader.download_file(local_client, "/video/export", filename)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert os.path.getsize(filename) == len(BODY_CHUNK) * BODY_CHUNKS
+    assert local_client.bytes_downloaded == len(BODY_CHUNK) * BODY_CHUNKS
+    # 64 MiB body, memory stays in the order of a few chunks
+    assert peak < 8 * 1024 * 1024
+
+
+@pytest.mark.parametrize("query", ["/video/export", "/video/export?with-length"])
+def test_download_with_write_behind(
+    local_client: ProtectClient, test_output_dest: str, query: str
+) -> None:
+    local_client.write_buffers = 4
+    local_client.fsync_interval = 16 * 1024 * 1024
+    local_client.preallocate_files = True
+    filename = os.path.join(test_output_dest, "large.mp4")
+
+    tracemalloc.start()
+    try:
+        Downloader.download_file(local_client, query, filename)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    with open(filename, "rb") as fp:
+        for _ in range(BODY_CHUNKS):
+            assert fp.read(len(BODY_CHUNK)) == BODY_CHUNK
+        assert fp.read() == b""
+    assert peak < 8 * 1024 * 1024
+
+
+# errors of the raw body are raised as the requests errors that download_file retries
+def test_write_behind_raises_ssl_errors_as_requests_errors(test_output_dest: str) -> None:
+    class BrokenRaw:
+        def readinto(self, buffer: Any) -> int:
+            raise SSLError("decryption failed or bad record mac")
+
+    response = requests.Response()
+    response.raw = BrokenRaw()
+    with open(os.path.join(test_output_dest, "broken.part"), "wb") as fp:
+        with pytest.raises(requests.exceptions.SSLError):
+            write_behind(response, fp, buffer_size=1024, buffer_count=2)
+
+
+def test_preallocate_keeps_file_size(test_output_dest: str) -> None:
+    filename = os.path.join(test_output_dest, "preallocated.part")
+    with open(filename, "wb") as fp:
+        fp.write(b"x" * 100)
+        fp.flush()
+        preallocate(fp.fileno(), 100, 1024 * 1024)
+
+    # the size must still reflect the bytes written, a resumed download continues after them
+    assert os.path.getsize(filename) == 100
@@ -0,0 +1,52 @@
+from datetime import datetime
+from typing import List
+
+from protect_archiver.dataclasses import Camera
+from protect_archiver.dataclasses import MotionEvent
+from protect_archiver.event_filter import select_events
+
+
+BASE = 1578524400000
+
+
+def make_events() -> List[MotionEvent]:
+    return [
+        MotionEvent(
+            id=f"event{i}",
+            start=datetime.fromtimestamp((BASE + i * 10_000) / 1000),
+            end=datetime.fromtimestamp((BASE + i * 10_000 + 5_001) / 1000),
+            camera_id=("cameraA", "cameraAB", "cameraB")[i % 3],
+            score=i * 10,
+            thumbnail_id=f"e-{i}",
+            heatmap_id=f"e-{i}",
+            type=("motion", "smartDetectZone")[i % 2],
+        )
+        for i in range(10)
+    ]
+
+
+CAMERAS = [
+    Camera(id="cameraAB", name="AB", recording_start=datetime.min),
+    Camera(id="cameraA", name="A", recording_start=datetime.min),
+]
+
+
+def test_select_events() -> None:
+    selected = [
+        (event.id, camera.name if camera is not None else None)
+        for event, camera in select_events(
+            make_events(), CAMERAS, camera_ids={"cameraA", "cameraB"}, min_score=20
+        )
+    ]
+    assert selected == [
+        ("event2", None),
+        ("event3", "A"),
+        ("event5", None),
+        ("event6", "A"),
+        ("event8", None),
+        ("event9", "A"),
+    ]
+
+    assert [
+        event.id for event, _ in select_events(make_events(), CAMERAS, types={"smartDetectZone"})
+    ] == ["event1", "event3", "event5", "event7", "event9"]
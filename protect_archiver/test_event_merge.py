@@ -0,0 +1,93 @@
+from datetime import datetime
+from datetime import timedelta
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from protect_archiver.dataclasses import Camera
+from protect_archiver.dataclasses import MotionEvent
+from protect_archiver.event_merge import coalesce_events
+
+
+BASE = datetime(2020, 1, 8, 23, 0, 0)
+CAMERAS = {
+    camera_id: Camera(id=camera_id, name=camera_id, recording_start=datetime.min)
+    for camera_id in ("cameraA", "cameraB")
+}
+
+
+def event(event_id: str, camera_id: str, start: int, end: int, score: int = 50) -> MotionEvent:
+    return MotionEvent(
+        id=event_id,
+        start=BASE + timedelta(seconds=start),
+        end=BASE + timedelta(seconds=end),
+        camera_id=camera_id,
+        score=score,
+        thumbnail_id=f"e-{event_id}",
+        heatmap_id=f"e-{event_id}",
+    )
+
+
+def clips(
+    events: List[MotionEvent], gap: Optional[float], pre_roll: float = 0, post_roll: float = 0
+) -> List[Tuple[str, int, int, Tuple[str, ...]]]:
+    return [
+        (
+            clip.camera_id,
+            int((clip.start - BASE).total_seconds()),
+            int((clip.end - BASE).total_seconds()),
+            clip.event_ids,
+        )
+        for clip, _ in coalesce_events(
+            ((e, CAMERAS.get(e.camera_id)) for e in events), gap, pre_roll, post_roll
+        )
+    ]
+
+
+def test_coalesce_overlapping_and_adjacent_events() -> None:
+    events = [
+        event("a1", "cameraA", 0, 10),
+        event("a2", "cameraA", 5, 8, score=90),  # inside a1
+        event("b1", "cameraB", 6, 12),
+        event("a3", "cameraA", 13, 20),  # 3s after a1
+        event("a4", "cameraA", 40, 45),
+        event("b2", "cameraB", 50, 55),
+    ]
+
+    assert clips(events, gap=5) == [
+        ("cameraA", 0, 20, ("a1", "a2", "a3")),
+        ("cameraB", 6, 12, ("b1",)),
+        ("cameraA", 40, 45, ("a4",)),
+        ("cameraB", 50, 55, ("b2",)),
+    ]
+
+    # the pre- and post-roll close the gap to a4 as well
+    assert [
+        clip for clip in clips(events, gap=5, pre_roll=10, post_roll=5) if clip[0] == "cameraA"
+    ] == [("cameraA", -10, 50, ("a1", "a2", "a3", "a4"))]
+
+
+def test_coalesce_keeps_highest_score() -> None:
+    events = [event("a1", "cameraA", 0, 10, score=20), event("a2", "cameraA", 5, 8, score=90)]
+    (clip, camera), *_ = coalesce_events((e, CAMERAS["cameraA"]) for e in events)
+    assert clip.id == "a1"
+    assert clip.score == 90
+    assert camera is CAMERAS["cameraA"]
+
+
+def test_coalesce_without_merging_pads_events() -> None:
+    events = [event("a1", "cameraA", 10, 20), event("a2", "cameraA", 15, 25)]
+    assert clips(events, gap=None, pre_roll=2, post_roll=3) == [
+        ("cameraA", 8, 23, ("a1",)),
+        ("cameraA", 13, 28, ("a2",)),
+    ]
+
+
+def test_coalesce_passes_on_events_without_camera() -> None:
+    events = [event("a1", "cameraA", 0, 10), event("c1", "cameraC", 5, 10)]
+    assert clips(events, gap=5) == [("cameraC", 5, 10, ()), ("cameraA", 0, 10, ("a1",))]
+
+
+def test_coalesce_unordered_events() -> None:
+    events = [event("a1", "cameraA", 100, 110), event("a0", "cameraA", 0, 10)]
+    assert clips(events, gap=5) == [("cameraA", 0, 10, ("a0",)), ("cameraA", 100, 110, ("a1",))]
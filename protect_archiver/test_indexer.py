@@ -0,0 +1,103 @@
+import os
+import time
+
+from .catalog import Catalog
+from .indexer import index_archive
+from .indexer import parse_filename
+from .test_mp4 import make_mp4
+
+
+def test_parse_filename() -> None:
+    assert parse_filename("Exterior (raId) - 2020-01-08 - 23.00.00+0000.mp4") == (
+        "Exterior (raId)",
+        "raId",
+        1578524400000,
+        1578527999999,
+    )
+    # the first segment of a download starts at the requested time, not at a full hour
+    assert parse_filename("Front Door (a1b2) - 2020-01-09 - 00.26.09+0100.mp4") == (
+        "Front Door (a1b2)",
+        "a1b2",
+        1578525969000,
+        1578527999999,
+    )
+    local = parse_filename("Exterior (raId) - 2020-01-08 - 23.00.00.mp4")
+    assert local is not None
+    assert local[2] == int(time.mktime((2020, 1, 8, 23, 0, 0, 0, 0, -1))) * 1000
+
+    assert parse_filename("Exterior (raId) - 2020-01-08 - 23.00.00+0000.pgm") is None
+    assert parse_filename("Exterior (raId) - 2020-01-08 - 23.00.00+0000.mp4.part") is None
+    assert parse_filename("Exterior - 2020-01-08 - 23.00.00+0000.mp4") is None
+    assert parse_filename("Exterior (raId) - 2020-01-08 - 2x.00.00+0000.mp4") is None
+
+
+def test_index_archive(test_output_dest: str) -> None:
+    day = os.path.join(test_output_dest, "2020", "01", "08")
+    for camera in ("Exterior (raId)", "Test (raId)"):
+        os.makedirs(os.path.join(day, camera))
+    for hour in range(22, 24):
+        with open(
+            os.path.join(
+                day, "Exterior (raId)", f"Exterior (raId) - 2020-01-08 - {hour}.00.00+0000.mp4"
+            ),
+            "wb",
+        ) as fp:
+            fp.write(b"\0" * hour)
+    open(os.path.join(day, "Test (raId)", "Test (raId) - 2020-01-08 - 23.00.00+0000.mp4.part"), "w")
+    open(os.path.join(day, "Test (raId)", "notes.txt"), "w")
+
+    catalog = Catalog(os.path.join(test_output_dest, "catalog.sqlite3"), test_output_dest)
+    # a file downloaded with the catalog enabled tells the full camera id
+    catalog.add(
+        os.path.join(day, "Exterior (raId)", "Exterior (raId) - 2020-01-08 - 23.00.00+0000.mp4"),
+        "exteriorCameraId",
+        1578524400000,
+        1578527999999,
+        23,
+        "ab" * 32,
+    )
+
+    assert index_archive(catalog, workers=4) == 1
+    assert catalog.files("exteriorCameraId", 0, 2**62) == [
+        (
+            "2020/01/08/Exterior (raId)/Exterior (raId) - 2020-01-08 - 22.00.00+0000.mp4",
+            1578520800000,
+            1578524399999,
+            22,
+        ),
+        (
+            "2020/01/08/Exterior (raId)/Exterior (raId) - 2020-01-08 - 23.00.00+0000.mp4",
+            1578524400000,
+            1578527999999,
+            23,
+        ),
+    ]
+    (row,) = catalog._db.execute("SELECT camera_id, sha256 FROM files WHERE size = 22").fetchall()
+    assert row == ("exteriorCameraId", None)
+
+    # indexing again only adds files that are not known yet
+    assert index_archive(catalog, workers=4) == 0
+    assert index_archive(catalog, workers=4, rebuild=True) == 2
+
+
+def test_index_archive_reads_durations(test_output_dest: str) -> None:
+    camera_dir = os.path.join(test_output_dest, "Exterior (raId)")
+    os.makedirs(camera_dir)
+    # 30 samples of 1/30 s: an hourly file cut short, which is not opened, a clip that starts in
+    # the hour and a clip that starts on the hour
+    for name in ("01.00.00+0000", "01.23.45+0000", "02.00.00+0000 - event"):
+        make_mp4(
+            os.path.join(camera_dir, f"Exterior (raId) - 2020-01-08 - {name}.mp4"),
+            [b"\0" * 100] * 30,
+            [1],
+        )
+
+    catalog = Catalog(os.path.join(test_output_dest, "catalog.sqlite3"), test_output_dest)
+    assert index_archive(catalog, workers=1) == 3
+
+    rows = catalog._db.execute("SELECT start, end, event_clip FROM files ORDER BY start").fetchall()
+    assert rows == [
+        (1578445200000, 1578448799999, 0),
+        (1578446625000, 1578446625999, 1),
+        (1578448800000, 1578448800999, 1),
+    ]
@@ -0,0 +1,59 @@
+import json
+import tracemalloc
+
+from typing import Iterator
+from typing import List
+
+import pytest
+
+from protect_archiver.json_stream import iter_json_array
+
+
+DOCUMENT = json.dumps(
+    [{"id": "ä1", "end": None, "nested": {"list": [1, 2.5, "ü"]}}, 12345, "text", True, [], {}],
+    ensure_ascii=False,
+    indent=2,
+).encode()
+
+
+def split(data: bytes, size: int) -> List[bytes]:
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, len(DOCUMENT)])
+def test_iter_json_array_across_chunks(size: int) -> None:
+    # chunks split numbers, strings and multi-byte characters
+    assert list(iter_json_array(split(DOCUMENT, size))) == json.loads(DOCUMENT)
+
+
+@pytest.mark.parametrize("document", [b"[]", b" [ ] \n"])
+def test_iter_json_array_empty(document: bytes) -> None:
+    assert list(iter_json_array(split(document, 1))) == []
+
+
+@pytest.mark.parametrize(
+    "document", [b"", b'{"a": 1}', b"[1, 2", b"[1 2]", b"[1, 2] 3", b'[{"a": }]']
+)
+def test_iter_json_array_invalid(document: bytes) -> None:
+    with pytest.raises(ValueError):
+        list(iter_json_array(split(document, 3)))
+
+
+def test_iter_json_array_memory_is_flat() -> None:
+    def chunks() -> Iterator[bytes]:
+        yield b"["
+        for i in range(50_000):
+            yield json.dumps({"id": str(i), "start": i, "end": i + 1}).encode()
+            yield b","
+        yield b"null]"
+
+    tracemalloc.start()
+    try:
+        count = sum(1 for _ in iter_json_array(chunks()))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert count == 50_001
+    # the whole array would take several megabytes
+    assert peak < 256 * 1024
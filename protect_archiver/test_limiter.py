@@ -0,0 +1,61 @@
+import threading
+import time
+
+from .limiter import AdaptiveConcurrencyLimiter
+from .limiter import ConcurrencyLimiter
+
+
+def test_concurrency_limiter_blocks_until_released() -> None:
+    limiter = ConcurrencyLimiter(1)
+    limiter.acquire()
+
+    acquired = threading.Event()
+
+    def worker() -> None:
+        with limiter:
+            acquired.set()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    assert not acquired.wait(0.05)
+
+    limiter.release()
+    assert acquired.wait(1)
+    thread.join()
+
+
+def test_adaptive_limiter_increases_while_healthy() -> None:
+    limiter = AdaptiveConcurrencyLimiter(max_limit=4)
+    assert limiter.limit == 1
+
+    for _ in range(20):
+        limiter.record_success(2.0, time.monotonic())
+
+    assert limiter.limit == 4
+
+
+def test_adaptive_limiter_backs_off_once_per_burst() -> None:
+    limiter = AdaptiveConcurrencyLimiter(max_limit=8)
+    for _ in range(40):
+        limiter.record_success(2.0, time.monotonic())
+    assert limiter.limit == 8
+
+    # requests that were all in flight when the console started failing
+    started_at = time.monotonic()
+    for _ in range(5):
+        limiter.record_failure(started_at)
+    assert limiter.limit == 4
+
+    # a request started after the back-off fails as well
+    limiter.record_failure(time.monotonic())
+    assert limiter.limit == 2
+
+
+def test_adaptive_limiter_backs_off_on_slow_responses() -> None:
+    limiter = AdaptiveConcurrencyLimiter(max_limit=8)
+    for _ in range(40):
+        limiter.record_success(2.0, time.monotonic())
+    assert limiter.limit == 8
+
+    limiter.record_success(30.0, time.monotonic())
+    assert limiter.limit == 7
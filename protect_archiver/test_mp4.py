@@ -0,0 +1,170 @@
+import os
+import struct
+
+from typing import List
+
+import pytest
+
+from .errors import Mp4Error
+from .mp4 import Movie
+from .mp4 import concatenate
+from .mp4 import cut
+from .mp4 import make_box
+from .mp4 import make_full_box
+
+
+def make_mp4(filename: str, samples: List[bytes], sync_samples: List[int]) -> None:
+    """Write a single-track MP4 file with one sample per chunk and the media data first."""
+    ftyp = make_box(b"ftyp", b"isom" + struct.pack(">I", 512) + b"isomiso2avc1mp41")
+    mdat = make_box(b"mdat", b"".join(samples))
+
+    offsets = []
+    offset = len(ftyp) + 8
+    for sample in samples:
+        offsets.append(offset)
+        offset += len(sample)
+
+    duration = 3000 * len(samples)
+    stbl = make_box(
+        b"stbl",
+        make_full_box(b"stsd", 0, 0, struct.pack(">I", 1) + make_box(b"avc1", b"\0" * 78))
+        + make_full_box(b"stts", 0, 0, struct.pack(">III", 1, len(samples), 3000))
+        + make_full_box(b"stsc", 0, 0, struct.pack(">IIII", 1, 1, 1, 1))
+        + make_full_box(
+            b"stsz",
+            0,
+            0,
+            struct.pack(f">II{len(samples)}I", 0, len(samples), *map(len, samples)),
+        )
+        + make_full_box(b"stco", 0, 0, struct.pack(f">I{len(offsets)}I", len(offsets), *offsets))
+        + make_full_box(
+            b"stss",
+            0,
+            0,
+            struct.pack(f">I{len(sync_samples)}I", len(sync_samples), *sync_samples),
+        ),
+    )
+    mdia = make_box(
+        b"mdia",
+        make_full_box(b"mdhd", 0, 0, struct.pack(">IIIIHH", 0, 0, 90000, duration, 0, 0))
+        + make_full_box(b"hdlr", 0, 0, struct.pack(">I4s12x", 0, b"vide") + b"\0")
+        + make_box(b"minf", stbl),
+    )
+    trak = make_box(
+        b"trak",
+        make_full_box(b"tkhd", 0, 3, struct.pack(">IIIII", 0, 0, 1, 0, duration // 90) + b"\0" * 60)
+        + make_box(
+            b"edts",
+            make_full_box(b"elst", 0, 0, struct.pack(">IIiI", 1, duration // 90, 0, 0x10000)),
+        )
+        + mdia,
+    )
+    moov = make_box(
+        b"moov",
+        make_full_box(b"mvhd", 0, 0, struct.pack(">IIII", 0, 0, 1000, duration // 90) + b"\0" * 80)
+        + trak,
+    )
+
+    with open(filename, "wb") as fp:
+        fp.write(ftyp + mdat + moov)
+
+
+def read_samples(filename: str) -> List[bytes]:
+    with open(filename, "rb") as fp:
+        table = Movie(fp).tracks[0].samples
+        offsets, _ = table.sample_locations()
+        samples = []
+        for offset, size in zip(offsets, table.sizes):
+            fp.seek(offset)
+            samples.append(fp.read(size))
+    return samples
+
+
+def test_concatenate_joins_samples(test_output_dest: str) -> None:
+    first = [bytes([i]) * (100 + i) for i in range(6)]
+    second = [bytes([i]) * (200 + i) for i in range(4)]
+    make_mp4(os.path.join(test_output_dest, "1.mp4"), first, [1, 4])
+    make_mp4(os.path.join(test_output_dest, "2.mp4"), second, [1, 3])
+    output = os.path.join(test_output_dest, "joined.mp4")
+
+    concatenate(
+        [os.path.join(test_output_dest, "1.mp4"), os.path.join(test_output_dest, "2.mp4")],
+        output,
+    )
+
+    assert read_samples(output) == first + second
+    with open(output, "rb") as fp:
+        movie = Movie(fp)
+    table = movie.tracks[0].samples
+    assert table.durations == [[10, 3000]]
+    assert list(table.sync_samples or []) == [1, 4, 7, 9]
+    assert table.chunks == [(1, 1, 1)]
+
+
+def test_concatenate_rejects_different_codecs(test_output_dest: str) -> None:
+    make_mp4(os.path.join(test_output_dest, "1.mp4"), [b"a" * 10], [1])
+    with open(os.path.join(test_output_dest, "2.mp4"), "wb") as fp:
+        fp.write(make_box(b"ftyp", b"isom") + make_box(b"mdat", b""))
+
+    with pytest.raises(Mp4Error):
+        concatenate(
+            [os.path.join(test_output_dest, "1.mp4"), os.path.join(test_output_dest, "2.mp4")],
+            os.path.join(test_output_dest, "joined.mp4"),
+        )
+
+
+def test_cut_starts_at_keyframe(test_output_dest: str) -> None:
+    samples = [bytes([i]) * (100 + i) for i in range(10)]
+    make_mp4(os.path.join(test_output_dest, "hour.mp4"), samples, [1, 5, 9])
+    output = os.path.join(test_output_dest, "clip.mp4")
+
+    # samples are 1/30 s long, the part from sample 6 to sample 8 begins at the keyframe 4
+    begin, end = cut(os.path.join(test_output_dest, "hour.mp4"), output, 6 / 30, 8 / 30)
+
+    assert (begin, end) == pytest.approx((4 / 30, 8 / 30))
+    assert read_samples(output) == samples[4:8]
+    with open(output, "rb") as fp:
+        movie = Movie(fp)
+    table = movie.tracks[0].samples
+    assert table.durations == [[4, 3000]]
+    assert list(table.sync_samples or []) == [1]
+    assert table.chunks == [(1, 4, 1)]
+
+
+def test_cut_joins_with_concatenate(test_output_dest: str) -> None:
+    first = [bytes([i]) * (100 + i) for i in range(6)]
+    second = [bytes([i]) * (200 + i) for i in range(6)]
+    make_mp4(os.path.join(test_output_dest, "1.mp4"), first, [1, 4])
+    make_mp4(os.path.join(test_output_dest, "2.mp4"), second, [1, 4])
+    parts = [os.path.join(test_output_dest, f"part{i}.mp4") for i in range(2)]
+
+    # a clip from the end of one file into the next one
+    cut(os.path.join(test_output_dest, "1.mp4"), parts[0], 4 / 30, 6 / 30)
+    cut(os.path.join(test_output_dest, "2.mp4"), parts[1], 0, 2 / 30)
+    concatenate(parts, os.path.join(test_output_dest, "clip.mp4"))
+
+    assert read_samples(os.path.join(test_output_dest, "clip.mp4")) == first[3:] + second[:2]
+
+
+def test_cut_ends_with_the_file(test_output_dest: str) -> None:
+    samples = [bytes([i]) * (100 + i) for i in range(10)]
+    make_mp4(os.path.join(test_output_dest, "short.mp4"), samples, [1, 5, 9])
+    output = os.path.join(test_output_dest, "clip.mp4")
+
+    # the file lasts 1/3 s
+    begin, end = cut(os.path.join(test_output_dest, "short.mp4"), output, 6 / 30, 20)
+
+    assert (begin, end) == pytest.approx((4 / 30, 10 / 30))
+    assert read_samples(output) == samples[4:]
+
+
+def test_cut_rejects_empty_range(test_output_dest: str) -> None:
+    make_mp4(os.path.join(test_output_dest, "hour.mp4"), [b"a" * 10] * 3, [1])
+
+    with pytest.raises(Mp4Error):
+        cut(
+            os.path.join(test_output_dest, "hour.mp4"),
+            os.path.join(test_output_dest, "clip.mp4"),
+            1,
+            2,
+        )
@@ -0,0 +1,43 @@
+import os
+
+from .planner import SegmentPlanner
+
+
+def test_planner_halves_failing_segments_down_to_minimum() -> None:
+    planner = SegmentPlanner(default_length=3600, min_length=600)
+    assert planner.length("a") == 3600_000
+
+    assert planner.can_split("a", 3600_000)
+    planner.record_failure("a", 3600_000)
+    assert planner.length("a") == 1800_000
+    # a partial segment shorter than the current length is split, too
+    planner.record_failure("a", 1000_000)
+    assert planner.length("a") == 900_000
+    # 450s would be below the minimum
+    assert not planner.can_split("a", 900_000)
+    assert planner.can_split("a", 1000_000)
+    assert planner.length("b") == 3600_000
+
+
+def test_planner_grows_after_fast_segments() -> None:
+    planner = SegmentPlanner(default_length=3600, max_length=7200, grow_after=2, fast_ratio=0.1)
+
+    planner.record_success("a", 3600_000, 10)
+    planner.record_success("a", 3600_000, 600)  # slow, starts counting again
+    planner.record_success("a", 3600_000, 10)
+    assert planner.length("a") == 3600_000
+    planner.record_success("a", 3600_000, 10)
+    assert planner.length("a") == 7200_000
+
+    # capped at the maximum length
+    for _ in range(4):
+        planner.record_success("a", 7200_000, 10)
+    assert planner.length("a") == 7200_000
+
+
+def test_planner_keeps_lengths_between_runs(test_output_dest: str) -> None:
+    statefile = os.path.join(test_output_dest, "segments.state")
+    planner = SegmentPlanner(statefile)
+    planner.record_failure("a", 3600_000)
+
+    assert SegmentPlanner(statefile).length("a") == 1800_000
@@ -0,0 +1,82 @@
+import os
+
+from datetime import datetime
+
+from .catalog import Catalog
+from .report import archive_report
+from .report import redownload_plan
+
+
+HOUR = 3600 * 1000
+
+
+def test_archive_report(test_output_dest: str) -> None:
+    start = datetime(2020, 1, 8, 0, 0)
+    day_start = int(start.timestamp() * 1000)
+    catalog = Catalog(os.path.join(test_output_dest, "catalog.sqlite3"), test_output_dest)
+    for hour in range(6):
+        if hour == 2:
+            continue  # missing
+        # the file of the fourth hour is almost empty
+        size = 1000 if hour == 3 else 1000000
+        catalog.add(
+            os.path.join(test_output_dest, f"Exterior (raId) - {hour}.mp4"),
+            "exteriorCameraId",
+            day_start + hour * HOUR,
+            # the video of an export is a little shorter than its segment
+            day_start + (hour + 1) * HOUR - 34,
+            size,
+        )
+    # event clips in the missing hour are no footage
+    catalog.add(
+        os.path.join(test_output_dest, "Exterior (raId) - clip.mp4"),
+        "exteriorCameraId",
+        day_start + 2 * HOUR + 60000,
+        day_start + 2 * HOUR + 80000,
+        20000,
+        event_ids=("event1",),
+    )
+    # a file that only covers the first 20 minutes of its hour
+    catalog.add(
+        os.path.join(test_output_dest, "Exterior (raId) - 7.mp4"),
+        "exteriorCameraId",
+        day_start + 7 * HOUR,
+        day_start + 7 * HOUR + HOUR // 3 - 1,
+        333333,
+    )
+    # indexed from a file name, which only contains the end of the camera id
+    catalog.load(
+        [
+            (
+                "Exterior (raId) - 6.mp4",
+                "raId",
+                "Exterior (raId)",
+                day_start + 6 * HOUR,
+                day_start + 7 * HOUR - 1,
+                1000000,
+                None,
+                None,
+                None,
+                False,
+            )
+        ]
+    )
+
+    (camera,) = archive_report(catalog, start, datetime(2020, 1, 8, 8, 0))
+
+    assert camera.camera_id == "exteriorCameraId"
+    assert camera.files == 7
+    assert camera.covered == 5 * HOUR + HOUR // 3
+    assert camera.gaps == [
+        (day_start + 2 * HOUR, day_start + 4 * HOUR),
+        (day_start + 7 * HOUR + HOUR // 3, day_start + 8 * HOUR),
+    ]
+    assert [path for path, _, _, _ in camera.undersized] == ["Exterior (raId) - 3.mp4"]
+
+    assert [(segment["start"], segment["end"]) for segment in redownload_plan([camera])] == [
+        (datetime(2020, 1, 8, 2, 0), datetime(2020, 1, 8, 2, 59, 59, 999000)),
+        (datetime(2020, 1, 8, 3, 0), datetime(2020, 1, 8, 3, 59, 59, 999000)),
+        (datetime(2020, 1, 8, 7, 20), datetime(2020, 1, 8, 7, 59, 59, 999000)),
+    ]
+
+    assert archive_report(catalog, start, datetime(2020, 1, 9), camera_ids={"testCameraId"}) == []
@@ -0,0 +1,104 @@
+import threading
+import time
+
+from protect_archiver.retry import CircuitBreaker
+from protect_archiver.retry import RetryBudget
+from protect_archiver.retry import RetryPolicy
+
+
+def test_retry_policy_backoff_with_jitter() -> None:
+    policy = RetryPolicy(max_retries=6, base_delay=2, max_delay=10)
+
+    for attempts, delay in ((1, 2), (2, 4), (3, 8), (4, 10), (5, 10)):
+        delays = {policy.next_delay(attempts) for _ in range(20)}
+        assert all(d is not None and delay / 2 <= d <= delay for d in delays)
+        assert len(delays) > 1  # workers failing together do not retry together
+
+    assert policy.next_delay(6) is None
+
+
+def test_retry_policy_status_classes() -> None:
+    assert RetryPolicy.is_retryable(500)
+    assert RetryPolicy.is_retryable(503)
+    assert RetryPolicy.is_retryable(429)
+    assert not RetryPolicy.is_retryable(404)
+    assert not RetryPolicy.is_retryable(416)
+
+
+def test_retry_budget_limits_retries_across_downloads() -> None:
+    policy = RetryPolicy(max_retries=100, budget=RetryBudget(ratio=0.5, max_tokens=2))
+
+    assert policy.next_delay(1) is not None
+    assert policy.next_delay(1) is not None
+    assert policy.next_delay(1) is None
+
+    # successful downloads earn new retries
+    policy.record_download()
+    policy.record_download()
+    assert policy.next_delay(1) is not None
+    assert policy.next_delay(1) is None
+
+
+def test_circuit_breaker_opens_probes_and_closes() -> None:
+    breaker = CircuitBreaker(threshold=2, cooldown=0.05, max_cooldown=1)
+
+    breaker.record(False)
+    assert not breaker.is_open()
+    breaker.record(False)
+    assert breaker.is_open()
+
+    # the first request after the cooldown probes the console, the others keep waiting
+    begin = time.monotonic()
+    breaker.wait()
+    assert time.monotonic() - begin >= 0.04
+
+    # a second worker waits while this one probes, and probes itself after the next cooldown
+    def probe() -> None:
+        breaker.wait()
+        breaker.record(True)
+
+    waiter = threading.Thread(target=probe, daemon=True)
+    waiter.start()
+    waiter.join(timeout=0.02)
+    assert waiter.is_alive()
+
+    # a failed probe pauses twice as long
+    breaker.record(False)
+    assert breaker.is_open()
+    assert breaker._open_for == 0.1
+
+    waiter.join(timeout=1)
+    assert not waiter.is_alive()
+    assert not breaker.is_open()
+
+
+def test_circuit_breaker_ignores_other_requests_while_probing() -> None:
+    breaker = CircuitBreaker(threshold=1, cooldown=0.01, max_cooldown=1)
+    breaker.record(False)
+    time.sleep(0.02)
+    breaker.wait()  # this thread probes the console
+
+    # a request that was sent before the circuit opened fails in another thread
+    straggler = threading.Thread(target=breaker.record, args=(False,))
+    straggler.start()
+    straggler.join()
+    assert breaker._open_for == 0.01
+
+    # no other request probes the console while the probe is under way
+    prober = threading.Thread(target=breaker.wait, daemon=True)
+    prober.start()
+    prober.join(timeout=0.05)
+    assert prober.is_alive()
+
+    breaker.record(True)
+    prober.join(timeout=1)
+    assert not prober.is_alive()
+    assert not breaker.is_open()
+
+
+def test_circuit_breaker_disabled() -> None:
+    breaker = CircuitBreaker(threshold=0)
+    for _ in range(10):
+        breaker.record(False)
+    assert not breaker.is_open()
+    breaker.wait()
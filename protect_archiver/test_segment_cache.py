@@ -0,0 +1,42 @@
+import os
+import time
+
+from typing import Any
+
+from .segment_cache import EmptySegmentCache
+
+
+def test_empty_segment_cache_is_persisted(test_output_dest: str) -> None:
+    statefile = os.path.join(test_output_dest, "empty-segments.state")
+    cache = EmptySegmentCache(statefile, ttl=60)
+    cache.add(("a", 0, 3599999))
+    with open(statefile, "a") as fp:
+        # killed while writing the next entry
+        fp.write('{"camera": "a", "sta')
+
+    cache = EmptySegmentCache(statefile, ttl=60)
+    assert ("a", 0, 3599999) in cache
+    assert ("a", 3600000, 7199999) not in cache
+    assert ("b", 0, 3599999) not in cache
+
+    # the entry added after the incomplete one is not merged with it
+    cache.add(("b", 0, 3599999))
+    cache = EmptySegmentCache(statefile, ttl=60)
+    assert ("a", 0, 3599999) in cache
+    assert ("b", 0, 3599999) in cache
+
+
+def test_empty_segment_cache_entries_expire(test_output_dest: str, monkeypatch: Any) -> None:
+    statefile = os.path.join(test_output_dest, "empty-segments.state")
+    cache = EmptySegmentCache(statefile, ttl=60)
+    cache.add(("a", 0, 3599999))
+    cache.add(("b", 0, 3599999))
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert ("a", 0, 3599999) not in cache
+
+    # expired entries are dropped from the file when it is loaded
+    cache = EmptySegmentCache(statefile, ttl=60)
+    assert ("b", 0, 3599999) not in cache
+    assert os.path.getsize(statefile) == 0
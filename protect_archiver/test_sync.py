@@ -0,0 +1,130 @@
+import json
+import os
+import threading
+
+from datetime import datetime
+from datetime import timedelta
+from typing import Any
+from typing import List
+
+import pytest
+
+from protect_archiver.client import ProtectClient
+from protect_archiver.dataclasses import Camera
+from protect_archiver.downloader import Downloader
+from protect_archiver.errors import ProtectError
+from protect_archiver.sync import ProtectSync
+
+
+@pytest.fixture
+def sync(client: Any, test_output_dest: str) -> ProtectSync:
+    return ProtectSync(client=client, destination_path=test_output_dest, statefile="sync.state")
+
+
+def test_readstate_replays_journal(sync: ProtectSync) -> None:
+    with open(sync.statefile, "w") as fp:
+        json.dump({"cameras": {"a": {"last": "2020-01-01T00:59:59.999000", "name": "A"}}}, fp)
+    with open(sync.journalfile("a"), "w") as fp:
+        fp.write('{"camera": "a", "last": "2020-01-01T01:59:59.999000", "name": "A"}\n')
+        # killed while writing the last entry
+        fp.write('{"camera": "a", "last": "2020-01-0')
+    with open(sync.journalfile("b"), "w") as fp:
+        fp.write('{"camera": "b", "last": "2020-01-01T04:59:59.999000", "name": "B"}\n')
+        fp.write('{"camera": "b", "last": "2020-01-01T05:59:59.999000", "name": "B"}\n')
+
+    assert sync.readstate() == {
+        "cameras": {
+            "a": {"last": "2020-01-01T01:59:59.999000", "name": "A"},
+            "b": {"last": "2020-01-01T05:59:59.999000", "name": "B"},
+        }
+    }
+
+
+def test_checkpoint_appends_after_torn_entry(sync: ProtectSync) -> None:
+    with open(sync.journalfile("a"), "w") as fp:
+        fp.write('{"camera": "a", "last": "2020-01-01T01:59:59.999000", "name": "A"}\n')
+        # killed while writing the last entry
+        fp.write('{"camera": "a", "last": "2020-01-0')
+
+    state = sync.readstate()
+    camera = Camera(id="a", name="A", recording_start=datetime(2020, 1, 1))
+    sync.checkpoint(state, camera, datetime(2020, 1, 1, 2, 59, 59, 999000))
+    assert sync.readstate()["cameras"]["a"]["last"] == "2020-01-01T02:59:59.999000"
+    sync.checkpoint(state, camera, datetime(2020, 1, 1, 3, 59, 59, 999000))
+
+    assert sync.readstate()["cameras"]["a"]["last"] == "2020-01-01T03:59:59.999000"
+    sync.compact_journal("a")
+    assert sync.readstate()["cameras"]["a"]["last"] == "2020-01-01T03:59:59.999000"
+
+
+def test_run_checkpoints_every_segment(sync: ProtectSync, monkeypatch: Any) -> None:
+    camera = Camera(id="a", name="A", recording_start=datetime(2020, 1, 1, 0, 30))
+    downloaded: List[datetime] = []
+
+    def download_footage(
+        client: Any, start: datetime, end: datetime, *args: Any, **kwargs: Any
+    ) -> None:
+        if len(downloaded) == 2:
+            # the state must already be on disk when the process dies during the third segment
+            last = sync.readstate()["cameras"]["a"]["last"]
+            assert last == (start - timedelta(milliseconds=1)).isoformat()
+            raise KeyboardInterrupt
+        downloaded.append(start)
+
+    monkeypatch.setattr(Downloader, "download_footage", download_footage)
+
+    with pytest.raises(KeyboardInterrupt):
+        sync.run([camera])
+
+    assert downloaded == [datetime(2020, 1, 1, 0, 0), datetime(2020, 1, 1, 1, 0)]
+    # the journals were compacted into the statefile on the way out
+    assert not os.path.exists(sync.journalfile("a"))
+    with open(sync.statefile) as fp:
+        assert json.load(fp)["cameras"]["a"]["last"] == "2020-01-01T01:59:59.999000"
+
+    # a restart resumes with the next segment
+    downloaded.clear()
+    with pytest.raises(KeyboardInterrupt):
+        sync.run([camera])
+    assert downloaded == [datetime(2020, 1, 1, 2, 0), datetime(2020, 1, 1, 3, 0)]
+
+
+def test_run_syncs_cameras_in_parallel(sync: ProtectSync, monkeypatch: Any) -> None:
+    cameras = [
+        Camera(id=camera_id, name=camera_id, recording_start=datetime.now() - timedelta(hours=3))
+        for camera_id in ("a", "b", "c")
+    ]
+    barrier = threading.Barrier(len(cameras), timeout=5)
+    downloaded: List[str] = []
+
+    def download_footage(
+        client: Any, start: datetime, end: datetime, camera: Camera, **kwargs: Any
+    ) -> None:
+        # all cameras have to be in progress at the same time, or the barrier times out
+        if camera.id not in downloaded:
+            barrier.wait()
+        if camera.id == "b":
+            raise ProtectError(4)
+        downloaded.append(camera.id)
+
+    monkeypatch.setattr(Downloader, "download_footage", download_footage)
+
+    sync.run(cameras)
+
+    # the failing camera does not affect the others
+    state = sync.readstate()
+    assert set(downloaded) == {"a", "c"}
+    assert "last" in state["cameras"]["a"] and "last" in state["cameras"]["c"]
+    assert "last" not in state["cameras"]["b"]
+
+
+def test_sync_resumes_after_catalog(test_output_dest: str) -> None:
+    client = ProtectClient(destination_path=test_output_dest, password="test", use_catalog=True)
+    sync = ProtectSync(client=client, destination_path=test_output_dest, statefile="sync.state")
+    camera = Camera(id="a", name="A", recording_start=datetime(2020, 1, 1, 0, 30))
+    assert sync.catalog_start(camera) == datetime(2020, 1, 1, 0, 0)
+
+    assert client.catalog is not None
+    last_end = int(datetime(2020, 1, 1, 2, 0).timestamp() * 1000) - 1
+    client.catalog.add(os.path.join(test_output_dest, "A (a) - 1.mp4"), "a", 0, last_end, 320)
+    assert sync.catalog_start(camera) == datetime(2020, 1, 1, 2, 0)
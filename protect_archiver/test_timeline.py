@@ -0,0 +1,87 @@
+from datetime import datetime
+from datetime import timezone
+from typing import Any
+from typing import List
+
+from .client import ProtectClient
+from .dataclasses import Camera
+from .dataclasses import MotionEvent
+from .timeline import RecordingTimeline
+from .timeline import get_recording_timeline
+from .utils import calculate_intervals
+
+
+def hours(intervals: Any) -> List[int]:
+    return [interval_start.hour for interval_start, _ in intervals]
+
+
+def test_timeline_drops_intervals_outside_of_recordings(test_output_dest: str) -> None:
+    client = ProtectClient(destination_path=test_output_dest, password="test")
+    camera = Camera(
+        id="a",
+        name="A",
+        recording_start=datetime(2020, 1, 1, 2, 30),
+        recording_end=datetime(2020, 1, 1, 5, 0),
+    )
+    start = datetime(2020, 1, 1, 0, 0, tzinfo=timezone.utc)
+    end = datetime(2020, 1, 1, 8, 0, tzinfo=timezone.utc)
+
+    timeline = get_recording_timeline(client, camera, start, end)
+
+    # the hour the recording started in is kept as a whole
+    assert hours(timeline.restrict(calculate_intervals(start, end))) == [2, 3, 4]
+
+
+def test_timeline_skips_motion_gaps(test_output_dest: str, monkeypatch: Any) -> None:
+    client = ProtectClient(
+        destination_path=test_output_dest, password="test", skip_motion_gaps=True
+    )
+    camera = Camera(
+        id="a",
+        name="A",
+        recording_start=datetime(2020, 1, 1),
+        recording_mode="motion",
+        recording_padding=(2, 2),
+    )
+
+    def event(camera_id: str, start: datetime, end: datetime) -> MotionEvent:
+        return MotionEvent("id", start, end, camera_id, 100, "thumbnail", "heatmap")
+
+    events = [
+        event(
+            "a",
+            datetime(2020, 1, 1, 1, 10, tzinfo=timezone.utc),
+            datetime(2020, 1, 1, 1, 11, tzinfo=timezone.utc),
+        ),
+        # the padding reaches into the next hour
+        event(
+            "a",
+            datetime(2020, 1, 1, 3, 50, tzinfo=timezone.utc),
+            datetime(2020, 1, 1, 3, 59, 59, tzinfo=timezone.utc),
+        ),
+        event(
+            "b",
+            datetime(2020, 1, 1, 6, 0, tzinfo=timezone.utc),
+            datetime(2020, 1, 1, 6, 1, tzinfo=timezone.utc),
+        ),
+    ]
+    monkeypatch.setattr(client, "get_motion_event_list", lambda start, end, cameras: events)
+    start = datetime(2020, 1, 1, 0, 0, tzinfo=timezone.utc)
+    end = datetime(2020, 1, 1, 8, 0, tzinfo=timezone.utc)
+
+    timeline = get_recording_timeline(client, camera, start, end)
+
+    assert hours(timeline.restrict(calculate_intervals(start, end))) == [1, 3, 4]
+
+    # cameras that record continuously are not affected
+    camera.recording_mode = "always"
+    timeline = get_recording_timeline(client, camera, start, end)
+    assert len(list(timeline.restrict(calculate_intervals(start, end)))) == 8
+
+
+def test_timeline_gaps() -> None:
+    timeline = RecordingTimeline([(10, 20), (15, 30), (40, 50)])
+    assert timeline.gaps(0, 60) == [(0, 10), (30, 40), (50, 60)]
+    assert timeline.gaps(12, 45) == [(30, 40)]
+    assert timeline.gaps(20, 30) == []
+    assert timeline.duration(12, 45) == 23
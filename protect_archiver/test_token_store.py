@@ -0,0 +1,134 @@
+import base64
+import json
+import os
+import stat
+import threading
+import time
+
+from typing import Any
+
+import pytest
+
+from .client.auth import TokenAuth
+from .client.token_store import TokenStore
+from .client.token_store import token_expiry
+from .client.unifi_os import UniFiOSClient
+
+
+def make_jwt(claims: Any) -> str:
+    payload = base64.urlsafe_b64encode(json.dumps(claims).encode()).rstrip(b"=").decode()
+    return f"eyJhbGciOiJIUzI1NiJ9.{payload}.signature"
+
+
+def test_token_expiry() -> None:
+    assert token_expiry(make_jwt({"exp": 1700000000})) == 1700000000
+    assert token_expiry(make_jwt({"sub": "user"})) is None
+    assert token_expiry("token.token.token") is None
+    assert token_expiry("opaque") is None
+
+
+def test_token_store(test_output_dest: str) -> None:
+    store = TokenStore(os.path.join(test_output_dest, "cache"), default_ttl=600, margin=60)
+    key = TokenStore.key("https://unifi:443", "ubnt")
+    token = make_jwt({"exp": time.time() + 3600})
+    store.store(key, token)
+    store.store(TokenStore.key("https://nvr:443", "ubnt"), "opaque")
+
+    assert stat.S_IMODE(os.stat(store.filename).st_mode) == 0o600
+    assert store.load(key) == token
+    assert store.load(TokenStore.key("https://nvr:443", "ubnt")) == "opaque"
+    assert store.load(TokenStore.key("https://unifi:443", "admin")) is None
+
+    # tokens are not handed out shortly before they expire
+    store.store(key, make_jwt({"exp": time.time() + 30}))
+    assert store.load(key) is None
+
+    store.remove(TokenStore.key("https://nvr:443", "ubnt"))
+    assert store.load(TokenStore.key("https://nvr:443", "ubnt")) is None
+
+    # malformed entries are treated as expired
+    for expires in (None, "soon", [1]):
+        with open(store.filename, "w") as fp:
+            json.dump({key: {"token": token, "expires": expires}}, fp)
+        assert store.load(key) is None
+
+
+def test_client_reuses_stored_token(test_output_dest: str, monkeypatch: Any) -> None:
+    store = TokenStore(os.path.join(test_output_dest, "cache"))
+    logins = []
+
+    def fetch_session_cookie_token(self: UniFiOSClient) -> str:
+        logins.append(self.username)
+        return f"token-{len(logins)}"
+
+    monkeypatch.setattr(UniFiOSClient, "fetch_session_cookie_token", fetch_session_cookie_token)
+
+    def make_client() -> UniFiOSClient:
+        return UniFiOSClient("https", "unifi", 443, "ubnt", "test", False, token_store=store)
+
+    assert make_client().get_api_token() == "token-1"
+    # a new process does not log in again
+    client = make_client()
+    assert client.get_api_token() == "token-1"
+    assert len(logins) == 1
+
+    # a rejected token is replaced, also for later runs
+    assert client.get_api_token(force=True) == "token-2"
+    assert make_client().get_api_token() == "token-2"
+    assert len(logins) == 2
+
+
+def test_rejected_token_is_refreshed_once(monkeypatch: Any) -> None:
+    logins = []
+
+    def fetch_session_cookie_token(self: UniFiOSClient) -> str:
+        logins.append(self.username)
+        time.sleep(0.05)  # login is slow, the other workers pile up behind it
+        return f"token-{len(logins)}"
+
+    monkeypatch.setattr(UniFiOSClient, "fetch_session_cookie_token", fetch_session_cookie_token)
+    client = UniFiOSClient("https", "unifi", 443, "ubnt", "test", False)
+    barrier = threading.Barrier(8)
+    tokens = []
+
+    def worker() -> None:
+        client.request_token()
+        barrier.wait()
+        # every worker got a 401 for the token it sent
+        tokens.append(client.request_token(force=True))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(logins) == 2
+    assert tokens == ["token-2"] * 8
+
+
+def test_token_is_refreshed_before_it_expires(monkeypatch: Any) -> None:
+    expires = time.time() + 3600
+    tokens = [make_jwt({"exp": expires, "n": 1}), make_jwt({"exp": expires + 3600, "n": 2})]
+    monkeypatch.setattr(UniFiOSClient, "fetch_session_cookie_token", lambda self: tokens.pop(0))
+    client = UniFiOSClient("https", "unifi", 443, "ubnt", "test", False)
+    client.refresh_margin = 300
+
+    first = client.get_api_token()
+    assert client.get_api_token() == first
+
+    monkeypatch.setattr(time, "time", lambda: expires - 200)
+    # while another thread refreshes the token, the current one is still used
+    with client._token_lock:
+        assert client.get_api_token() == first
+    second = client.get_api_token()
+    assert second != first
+    assert tokens == []
+
+
+def test_client_without_fetch_token_cannot_be_created() -> None:
+    class Client(TokenAuth):
+        pass
+
+    with pytest.raises(TypeError):
+        Client()  # type: ignore[abstract]
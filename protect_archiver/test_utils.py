@@ -3,6 +3,7 @@ from datetime import datetime
 import dateutil.parser
 
 from .utils import calculate_intervals
+from .utils import interleave
 
 
 def test_calculate_intervals_multiple_partial_no_alignment_1() -> None:
@@ -127,3 +128,8 @@ def test_calculate_intervals_5h_15m_next_day() -> None:
         (datetime(1970, 1, 2, 1, 0), datetime(1970, 1, 2, 1, 59, 59, 999000)),
         (datetime(1970, 1, 2, 2, 0), datetime(1970, 1, 2, 2, 44, 59, 999000)),
     ]
+
+
+def test_interleave() -> None:
+    result = list(interleave([["a1", "a2"], [], ["b1", "b2", "b3"], ["c1"]]))
+    assert result == ["a1", "b1", "c1", "a2", "b2", "b3"]
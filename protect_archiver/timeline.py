@@ -0,0 +1,131 @@
+import bisect
+import logging
+
+from datetime import datetime
+from datetime import timezone
+from typing import Any
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Tuple
+
+from protect_archiver.config import Config
+from protect_archiver.dataclasses import Camera
+
+
+# timestamps in epoch milliseconds, like the ones used by the API
+UNBOUNDED_START = 0
+UNBOUNDED_END = 2**63 - 1
+
+
+class RecordingTimeline:
+    """The time ranges in which a camera recorded footage.
+
+    Ranges are kept sorted and merged, as ``(start, end)`` pairs of epoch milliseconds
+    with an exclusive end.
+    """
+
+    def __init__(self, ranges: Iterable[Tuple[int, int]]) -> None:
+        self.ranges: List[Tuple[int, int]] = []
+        for start, end in sorted(ranges):
+            if start >= end:
+                continue
+            if self.ranges and start <= self.ranges[-1][1]:
+                self.ranges[-1] = (self.ranges[-1][0], max(end, self.ranges[-1][1]))
+            else:
+                self.ranges.append((start, end))
+        self._starts = [start for start, _ in self.ranges]
+
+    def intersect(self, other: "RecordingTimeline") -> "RecordingTimeline":
+        ranges = []
+        for start, end in other.ranges:
+            for own_start, own_end in self.ranges:
+                if own_start < end and start < own_end:
+                    ranges.append((max(start, own_start), min(end, own_end)))
+        return RecordingTimeline(ranges)
+
+    def overlaps(self, start: int, end: int) -> bool:
+        index = bisect.bisect_right(self._starts, end - 1) - 1
+        return index >= 0 and self.ranges[index][1] > start
+
+    # the time ranges between start and end (exclusive) that are not part of the timeline
+    def gaps(self, start: int, end: int) -> List[Tuple[int, int]]:
+        gaps = []
+        for range_start, range_end in self.ranges:
+            if range_end <= start:
+                continue
+            if range_start >= end:
+                break
+            if range_start > start:
+                gaps.append((start, range_start))
+            start = max(start, range_end)
+        if start < end:
+            gaps.append((start, end))
+        return gaps
+
+    # total length of the ranges between start and end (exclusive)
+    def duration(self, start: int, end: int) -> int:
+        return sum(
+            min(range_end, end) - max(range_start, start)
+            for range_start, range_end in self.ranges
+            if range_start < end and start < range_end
+        )
+
+    # drop the intervals without any footage - intervals are (start, end) pairs with an
+    # inclusive end; the others are kept as they are, so that the file names of the segments
+    # stay aligned no matter when the recording started
+    def restrict(
+        self, intervals: Iterable[Tuple[datetime, datetime]]
+    ) -> Iterator[Tuple[datetime, datetime]]:
+        dropped = 0
+        for interval_start, interval_end in intervals:
+            if not self.overlaps(timestamp_ms(interval_start), timestamp_ms(interval_end) + 1):
+                dropped += 1
+                continue
+            yield interval_start, interval_end
+        if dropped:
+            logging.info(f"Skipped {dropped} segment(s) without recorded footage")
+
+
+def timestamp_ms(value: datetime) -> int:
+    return int(value.timestamp() * 1000)
+
+
+# camera attributes like recording_start are naive UTC datetimes
+def utc_timestamp_ms(value: datetime) -> int:
+    return int(value.replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+# the footage the console has for a camera between start and end: everything between the
+# first and last recording, and for cameras that only record on motion, the motion events
+# (with the padding recorded around them) if argument --skip-motion-gaps is present
+def get_recording_timeline(
+    client: Any, camera: Camera, start: datetime, end: datetime
+) -> RecordingTimeline:
+    recording_start = (
+        utc_timestamp_ms(camera.recording_start)
+        if camera.recording_start != datetime.min
+        else UNBOUNDED_START
+    )
+    recording_end = (
+        utc_timestamp_ms(camera.recording_end)
+        if camera.recording_end is not None
+        else UNBOUNDED_END
+    )
+    timeline = RecordingTimeline([(recording_start, recording_end)])
+
+    if client.skip_motion_gaps and camera.recording_mode in Config.MOTION_RECORDING_MODES:
+        pre_padding, post_padding = camera.recording_padding
+        events = client.get_motion_event_list(start, end, [camera])
+        timeline = timeline.intersect(
+            RecordingTimeline(
+                (
+                    timestamp_ms(event.start) - pre_padding * 1000,
+                    timestamp_ms(event.end) + post_padding * 1000,
+                )
+                for event in events
+                if event.camera_id == camera.id
+            )
+        )
+
+    return timeline
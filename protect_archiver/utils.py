@@ -1,15 +1,21 @@
 import logging
 import os
 
+from collections import deque
 from datetime import datetime
 from datetime import timedelta
 from typing import Any
 from typing import Iterable
+from typing import Iterator
 from typing import Tuple
+from typing import TypeVar
 
 from protect_archiver.dataclasses import Camera
 
 
+T = TypeVar("T")
+
+
 def json_encode(obj: Any) -> Any:
     if isinstance(obj, datetime):
         return obj.isoformat()
@@ -92,6 +98,20 @@ def calculate_intervals(
         yield start, original_end - timedelta(milliseconds=1)
 
 
+# lazily merge the given iterables round-robin, e.g. to interleave the segments of several
+# cameras fairly: [a1, a2], [b1, b2, b3] -> a1, b1, a2, b2, b3
+def interleave(iterables: Iterable[Iterable[T]]) -> Iterator[T]:
+    iterators = deque(iter(iterable) for iterable in iterables)
+    while iterators:
+        iterator = iterators.popleft()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            continue
+        yield item
+        iterators.append(iterator)
+
+
 def format_bytes(size: int) -> str:
     # 2**10 = 1024
     power = 2**10
@@ -111,10 +131,23 @@ def make_camera_name_fs_safe(camera: Camera) -> str:
 
 
 def print_download_stats(client: Any) -> None:
-    files_total = client.files_downloaded + client.files_skipped + client.files_failed
+    files_total = (
+        client.files_downloaded + client.files_cut + client.files_skipped + client.files_failed
+    )
+    # segments known to be empty are skipped without sending a request
+    requests_saved = (
+        f" ({client.requests_saved} known to be empty, not requested)"
+        if client.requests_saved
+        else ""
+    )
+    # event clips cut out of the archived footage instead of being downloaded
+    cut_from_archive = (
+        f"{client.files_cut} files cut from archived footage, " if client.files_cut else ""
+    )
     print(
         f"{client.files_downloaded} files downloaded ({format_bytes(client.bytes_downloaded)}), "
-        f"{client.files_skipped} files skipped, "
+        f"{cut_from_archive}"
+        f"{client.files_skipped} files skipped{requests_saved}, "
         f"{client.files_failed} files failed, "
         f"{files_total} files total"
     )